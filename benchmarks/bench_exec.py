@@ -0,0 +1,43 @@
+"""
+Cost of small `exec` shell commands: a fresh /bin/sh per command
+(subprocess.run, the default) against a long-lived ShellPool worker.
+
+Run from the repository root:
+
+    python benchmarks/bench_exec.py [commands]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zai.runtime.shell_pool import ShellPool
+
+COMMANDS = ["echo ok", "test -d /tmp", "date +%s", "ls / | head -3"]
+
+
+def spawn(command):
+    subprocess.run(command, shell=True, capture_output=True, text=True)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    pool = ShellPool(1)
+    pool.run("true")  # start the worker outside the timing
+    print(f"{'command':<16} {'spawn':>12} {'pool':>12}")
+    for command in COMMANDS:
+        timings = []
+        for run in (spawn, pool.run):
+            start = time.perf_counter()
+            for _ in range(count):
+                run(command)
+            timings.append((time.perf_counter() - start) / count * 1e6)
+        print(f"{command:<16} {timings[0]:>9.0f} us {timings[1]:>9.0f} us")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
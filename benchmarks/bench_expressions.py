@@ -0,0 +1,119 @@
+"""
+Per-evaluation cost of zai expressions: tree-walking vs closure-compiled.
+
+"tree-walk" is the evaluator the interpreter used before expressions were
+compiled (string dispatch on node.data / node.type, both operands always
+evaluated, variables in Environment dicts). "closure" is the compiled
+`expr.evaluate(interp, frame)` with locals resolved to Frame slots.
+
+Run from the repository root:
+
+    python benchmarks/bench_expressions.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zai.core.compiler import compile_skill
+from zai.core.environment import Environment, Frame
+from zai.core.parser import get_parser
+
+
+EXPRESSIONS = [
+    'i < 20000',
+    'i + 1',
+    'context.total + i * 2',
+    'i > 5 && i != 7',
+    'done || i >= 10 && name == "chef"',
+    '"Order: " + name + " #" + i',
+]
+
+
+class _Interp:
+    """Just enough interpreter state for evaluation."""
+
+    def __init__(self):
+        self.env = Environment()
+        self.env.set_context("total", 3)
+
+
+def tree_walk(interp, node, env):
+    if node is None: return None
+    if not hasattr(node, 'data'):
+        if hasattr(node, 'type'):
+            if node.type == 'ESCAPED_STRING': return node.value[1:-1]
+            if node.type == 'MULTILINE_STRING': return node.value[3:-3]
+            if node.type == 'SIGNED_NUMBER': return float(node.value)
+            if node.type == 'IDENTIFIER':
+                if node.value == 'true': return True
+                if node.value == 'false': return False
+                try: return env.get_var(node.value)
+                except: return interp.env.get_context(node.value)
+        return node
+    if node.data == 'true': return True
+    if node.data == 'false': return False
+    if node.data in ['string', 'number', 'simple_expression', 'expression', 'boolean']:
+        return tree_walk(interp, node.children[0], env)
+    if node.data == 'context_var': return interp.env.get_context(node.children[1].value)
+    if node.data == 'binary_op':
+        l, op, r = tree_walk(interp, node.children[0], env), node.children[1].value, tree_walk(interp, node.children[2], env)
+        if l is None: l = 0
+        if r is None: r = 0
+        try:
+            if op == '+': return (l + r) if isinstance(l, (int, float)) else (str(l) + str(r))
+            if op == '-': return float(l) - float(r)
+            if op == '*': return float(l) * float(r)
+            if op == '/': return float(l) / float(r)
+            if op == '==': return str(l) == str(r)
+            if op == '!=': return str(l) != str(r)
+            if op == '>': return float(l) > float(r)
+            if op == '<': return float(l) < float(r)
+            if op == '>=': return float(l) >= float(r)
+            if op == '<=': return float(l) <= float(r)
+            if op == '&&': return bool(l) and bool(r)
+            if op == '||': return bool(l) or bool(r)
+        except: return False
+    return None
+
+
+LOCALS = {"i": 42.0, "name": "chef", "done": False}
+
+
+def compile_case(parser, text):
+    """Return (expression tree, compiled expression, skill layout) for text."""
+    decls = " ".join(f"var {name} = 0" for name in LOCALS)
+    tree = parser.parse(f"agent B skill Main() {{ {decls} var x = {text} }}", start='agent')
+    skill_tree = tree.children[-1]
+    skill = compile_skill(skill_tree)
+    node = skill_tree.children[2].children[-1].children[1]
+    return node, skill.body.stmts[-1].expr, skill.layout
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    parser = get_parser()
+    interp = _Interp()
+    env = Environment(parent=interp.env)
+    for name, value in LOCALS.items():
+        env.set_var(name, value)
+
+    print(f"{'expression':<36} {'tree-walk':>12} {'closure':>12} {'speedup':>8}")
+    for text in EXPRESSIONS:
+        node, expr, layout = compile_case(parser, text)
+        frame = Frame(layout, parent=interp.env)
+        for name, value in LOCALS.items():
+            frame.set_var(name, value)
+        assert tree_walk(interp, node, env) == expr.evaluate(interp, frame), text
+
+        before = timeit.timeit(lambda: tree_walk(interp, node, env), number=iterations)
+        after = timeit.timeit(lambda: expr.evaluate(interp, frame), number=iterations)
+        ns_before = before / iterations * 1e9
+        ns_after = after / iterations * 1e9
+        print(f"{text:<36} {ns_before:>9.0f} ns {ns_after:>9.0f} ns {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Per-hop notify -> wait latency in the restaurant multi-agent example.
+
+Runs examples/multi_agent/restaurant_v2.zai (manager -> waiter -> chef ->
+waiter -> manager, four hops per order) with each agent on its own thread,
+once per transport (and inbox watcher mode for files). exec is stubbed out
+so only message delivery is measured; a hop's latency is the time from the notify timestamp to the
+waiting agent accepting the message.
+
+Run from the repository root:
+
+    python benchmarks/bench_ipc_latency.py [orders]
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zai.core.ast_cache import parse_file
+from zai.core.interpreter import Interpreter
+from zai.runtime.ring import ShmTransport
+from zai.runtime.transport import FileTransport, SocketTransport
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "multi_agent")
+AGENTS = ["chef.zai", "waiter.zai", "restaurant_v2.zai"]  # the manager last
+
+
+class TimedInterpreter(Interpreter):
+    def __init__(self, *args, hops, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hops = hops
+        self.stopped = threading.Event()
+
+    def receive(self, target_source):
+        if self.stopped.is_set():
+            raise SystemExit  # ends the agent's thread quietly
+        return super().receive(target_source)
+
+    def accept_message(self, found_msg, node, env):
+        self.hops.append(time.time() - found_msg["timestamp"])
+        super().accept_message(found_msg, node, env)
+
+    def op_start(self, node, env):
+        pass  # every agent is already running on its own thread
+
+
+TRANSPORTS = {
+    "file/poll": lambda root: FileTransport(root, watch_mode="poll"),
+    "file/inotify": lambda root: FileTransport(root, watch_mode="inotify"),
+    "socket": lambda root: SocketTransport(root),
+    "shm": lambda root: ShmTransport(root),
+}
+
+
+def run(make_transport, orders):
+    hops = []
+    ipc_root = tempfile.mkdtemp(prefix="zai-bench-")
+    exec_bridge = MagicMock()
+    exec_bridge.handle.return_value = {}
+
+    agents = []
+    try:
+        for filename in AGENTS:
+            path = os.path.join(EXAMPLE, filename)
+            transport = make_transport(ipc_root)
+            interp = TimedInterpreter(parse_file(path), ai_bridge=MagicMock(), exec_bridge=exec_bridge,
+                                      base_path=EXAMPLE, source_file=path, hops=hops, wait_timeout=30,
+                                      transport=transport)
+            agents.append(interp)
+            interp.load()
+        *workers, manager = agents
+
+        # The chef only listens to the waiter and never sees the manager's
+        # SHUTDOWN; stop() below ends whichever worker is still waiting.
+        threads = [threading.Thread(target=worker.execute_skill, args=("Main", {}), daemon=True)
+                   for worker in workers]
+        for thread in threads:
+            thread.start()
+
+        start = time.perf_counter()
+        result = manager.execute_skill("Main", {"max_orders": orders})
+        elapsed = time.perf_counter() - start
+        for thread in threads:
+            thread.join(timeout=1)  # let the waiter finish shutting down
+        stop(manager, workers, threads)
+        assert result["status"] == "success", result
+    finally:
+        for interp in agents:
+            interp.transport.close()
+        shutil.rmtree(ipc_root, ignore_errors=True)
+    return hops, elapsed
+
+
+def stop(manager, workers, threads):
+    """Wake every worker still in a wait so it sees stopped and exits."""
+    for worker, thread in zip(workers, threads):
+        if thread.is_alive():
+            worker.stopped.set()
+            manager.transport.send(worker.agent_name, {
+                "source": "bench", "type": "STOP", "payload": "", "timestamp": time.time(),
+                "seq": 0, "response_seq": None})
+            thread.join(timeout=5)
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'transport':<13} {'hops':>5} {'mean':>10} {'p50':>10} {'max':>10} {'total':>9}")
+    for name, make_transport in TRANSPORTS.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            hops, elapsed = run(make_transport, orders)
+        ms = [h * 1000 for h in hops]
+        print(f"{name:<13} {len(ms):>5} {statistics.mean(ms):>7.2f} ms {statistics.median(ms):>7.2f} ms "
+              f"{max(ms):>7.2f} ms {elapsed:>7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Message throughput between two processes for each notify/wait transport.
+
+A sender process pushes N order messages to agent "Chef" as fast as the
+transport accepts them while this process drains them with the same
+receive / wait calls the interpreter's wait uses.
+
+Run from the repository root:
+
+    python benchmarks/bench_transport_throughput.py [messages]
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zai.runtime.ring import ShmTransport
+from zai.runtime.transport import FileTransport, SocketTransport
+
+TRANSPORTS = {
+    "file": lambda root: FileTransport(root, watch_mode="inotify"),
+    "socket": lambda root: SocketTransport(root),
+    "shm": lambda root: ShmTransport(root),
+}
+
+
+def from_waiter(header):
+    return header["source"] == "Waiter"
+
+
+def send_orders(kind, root, count):
+    transport = TRANSPORTS[kind](root)
+    for seq in range(1, count + 1):
+        transport.send("Chef", {"source": "Waiter", "type": "NEW_ORDER", "payload": f"order {seq}",
+                                "timestamp": time.time(), "seq": seq, "response_seq": None})
+    transport.close()
+
+
+def run(kind, count):
+    root = tempfile.mkdtemp(prefix="zai-bench-")
+    receiver = TRANSPORTS[kind](root)
+    receiver.register("Chef")
+    sender = multiprocessing.get_context("fork").Process(target=send_orders, args=(kind, root, count))
+    start = time.perf_counter()
+    sender.start()
+    received = 0
+    while received < count:
+        if receiver.receive("Chef", from_waiter) is None:
+            receiver.wait("Chef", 5)
+        else:
+            received += 1
+    elapsed = time.perf_counter() - start
+    sender.join()
+    receiver.close()
+    shutil.rmtree(root)
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"{'transport':<10} {'messages':>9} {'total':>9} {'msg/s':>10}")
+    for kind in TRANSPORTS:
+        elapsed = run(kind, count)
+        print(f"{kind:<10} {count:>9} {elapsed:>7.2f} s {count / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from zai.core import ast_cache
+from zai.core.parser import get_parser
+
+
+CODE = """
+agent Cached
+skill Main() { success 0 "OK" }
+"""
+
+
+class TestAstCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "main.zai")
+        with open(self.path, "w") as f:
+            f.write(CODE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_cache_entry_written_and_reused(self):
+        tree = ast_cache.parse_file(self.path, use_cache=True)
+        self.assertTrue(os.path.exists(ast_cache.cache_path(self.path, "start")))
+
+        with patch("zai.core.ast_cache.get_parser") as mock_parser:
+            cached = ast_cache.parse_file(self.path, use_cache=True)
+            mock_parser.assert_not_called()
+        self.assertEqual(cached, tree)
+
+    def test_edit_invalidates_entry(self):
+        ast_cache.parse_file(self.path, use_cache=True)
+        with open(self.path, "w") as f:
+            f.write(CODE.replace("Cached", "Edited"))
+        tree = ast_cache.parse_file(self.path, use_cache=True)
+        self.assertEqual(tree.children[0].children[0].value, "Edited")
+
+    def test_touch_without_edit_hits_by_hash(self):
+        ast_cache.parse_file(self.path, use_cache=True)
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        with patch("zai.core.ast_cache.get_parser") as mock_parser:
+            ast_cache.parse_file(self.path, use_cache=True)
+            mock_parser.assert_not_called()
+        # The entry now carries the new mtime: the next load skips the hash
+        with patch("zai.core.ast_cache._source_hash") as mock_hash:
+            self.assertIsNotNone(ast_cache.load(self.path, "start", os.stat(self.path)))
+            mock_hash.assert_not_called()
+
+    def test_disabled_cache_writes_nothing(self):
+        tree = ast_cache.parse_file(self.path, use_cache=False)
+        self.assertEqual(tree, get_parser().parse(CODE, start="start"))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, ast_cache.CACHE_DIRNAME)))
+
+
+if __name__ == "__main__":
+    unittest.main()
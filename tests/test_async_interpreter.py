@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from zai.core.async_interpreter import AsyncInterpreter
+from zai.core.interpreter import Interpreter
+from zai.core.parser import get_parser
+from zai.runtime.bridge import AsyncAIBridge, AsyncExecBridge
+from zai.runtime.default_bridge import DefaultAsyncExecBridge
+
+
+class SlowAIBridge(AsyncAIBridge):
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+
+    async def handle(self, prompt, extract_keys, system_prompt, context):
+        self.calls.append((prompt, system_prompt))
+        await asyncio.sleep(self.delay)
+        return {k: f"{k}:{prompt}" for k in extract_keys}
+
+
+class EchoExecBridge(AsyncExecBridge):
+    async def handle(self, cmd, filter_keys):
+        return {"stdout": cmd, "code": 0}
+
+
+AGENT = '''
+agent Chef
+context Kitchen { dish: "", total: 0, out: "" }
+skill Main() {
+    var i = 0
+    while i < 3 {
+        process "cook " + i { extract: ["dish"] }
+        i = i + 1
+        if i == 2 { break }
+    }
+    exec "plate" { filter: ["stdout"] }
+    context.out = context.stdout
+    invoke Finish()
+    success 0 "OK"
+}
+skill Finish() {
+    context.total = 1
+}
+'''
+
+
+class TestAsyncInterpreter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tree = get_parser().parse(AGENT, start='agent')
+
+    async def test_runs_compiled_skills(self):
+        ai = SlowAIBridge(delay=0)
+        interpreter = AsyncInterpreter(self.tree, ai_bridge=ai, exec_bridge=EchoExecBridge())
+        result = await interpreter.run()
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual([prompt for prompt, _ in ai.calls], ["cook 0.0", "cook 1.0"])
+        self.assertEqual(interpreter.env.get_context("dish"), "dish:cook 1.0")
+        self.assertEqual(interpreter.env.get_context("out"), "plate")
+
+    async def test_matches_sync_interpreter(self):
+        sync_ai = MagicMock()
+        sync_ai.handle.side_effect = lambda prompt, keys, system, context: {k: prompt for k in keys}
+        sync_exec = MagicMock()
+        sync_exec.handle.return_value = {"stdout": "plate"}
+        sync = Interpreter(self.tree, ai_bridge=sync_ai, exec_bridge=sync_exec)
+        expected = sync.run()
+
+        # Synchronous bridges are accepted too (run in a worker thread)
+        interpreter = AsyncInterpreter(self.tree, ai_bridge=sync_ai, exec_bridge=sync_exec)
+        self.assertEqual(await interpreter.run(), expected)
+        self.assertEqual(interpreter.env.context, sync.env.context)
+
+    async def test_sessions_run_concurrently(self):
+        ai = SlowAIBridge(delay=0.2)
+        sessions = [AsyncInterpreter(self.tree, ai_bridge=ai, exec_bridge=EchoExecBridge()) for _ in range(100)]
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(s.run() for s in sessions))
+        elapsed = time.perf_counter() - start
+
+        self.assertTrue(all(r["status"] == "success" for r in results))
+        self.assertEqual(len(ai.calls), 200)
+        # Two sequential 0.2s calls per session; serially this would take 40s
+        self.assertLess(elapsed, 5)
+
+    async def test_invoke_failure_propagates(self):
+        tree = get_parser().parse('''
+        agent A
+        skill Main() {
+            invoke Check()
+            success 0 "unreachable"
+        }
+        skill Check() {
+            process "check" { extract: ["ok"] }
+            fail 3 "bad"
+        }
+        ''', start='agent')
+        interpreter = AsyncInterpreter(tree, ai_bridge=SlowAIBridge(delay=0), exec_bridge=EchoExecBridge())
+        result = await interpreter.run()
+        self.assertEqual((result["status"], result["code"], result["message"]), ("fail", 3, "bad"))
+
+
+    async def test_parallel_process_group(self):
+        tree = get_parser().parse('''
+        agent Ops
+        skill Main() {
+            process "logs" { extract: ["a"], using: ["service"] }
+            process "metrics" { extract: ["b"], using: ["service"] }
+            process "kb" { extract: ["c"], using: ["service"] }
+            success 0 "OK"
+        }
+        ''', start='agent')
+        ai = SlowAIBridge(delay=0.2)
+        interpreter = AsyncInterpreter(tree, ai_bridge=ai, exec_bridge=EchoExecBridge(), parallel_process=True)
+
+        start = time.perf_counter()
+        result = await interpreter.run()
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual([interpreter.env.get_context(k) for k in "abc"], ["a:logs", "b:metrics", "c:kb"])
+        # One round trip instead of three
+        self.assertLess(elapsed, 0.5)
+
+
+class TestAsyncWait(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def _agent(self, code, **kwargs):
+        tree = get_parser().parse(code, start='agent')
+        return AsyncInterpreter(tree, ai_bridge=SlowAIBridge(delay=0), exec_bridge=EchoExecBridge(), **kwargs)
+
+    async def test_notify_and_wait_in_one_loop(self):
+        receiver = self._agent('''
+        agent Receiver
+        context C { got: "" }
+        skill Main() {
+            [code, payload] = wait Sender
+            context.got = code + ":" + payload
+            success 0 "Done"
+        }
+        ''')
+        sender = self._agent('''
+        agent Sender
+        skill Main() {
+            notify Receiver "HELLO" "World"
+            success 0 "Done"
+        }
+        ''')
+        receiver.transport.poll_interval = 0.01
+
+        results = await asyncio.gather(receiver.run(), sender.run())
+        self.assertEqual([r["status"] for r in results], ["success", "success"])
+        self.assertEqual(receiver.env.get_context("got"), "HELLO:World")
+
+    async def test_wait_timeout_does_not_block_loop(self):
+        agent = self._agent('''
+        agent Lonely
+        context C { got: "" }
+        skill Main() {
+            [code, payload] = wait Nobody
+            context.got = payload
+            success 0 "Done"
+        }
+        ''', wait_timeout=0.3)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while ticks < 1000:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await agent.run()
+        task.cancel()
+        self.assertEqual(agent.env.get_context("got"), "TIMEOUT")
+        self.assertGreater(ticks, 5)
+
+
+class TestDefaultAsyncExecBridge(unittest.IsolatedAsyncioTestCase):
+    async def test_shell_command(self):
+        result = await DefaultAsyncExecBridge().handle("echo hello", ["stdout", "code"])
+        self.assertEqual(result, {"stdout": "hello\n", "code": 0})
+
+    async def test_builtin_tool(self):
+        result = await DefaultAsyncExecBridge().handle(f"ls {json.dumps(os.getcwd())}", ["path"])
+        self.assertEqual(result, {"path": os.getcwd()})
+
+
+if __name__ == "__main__":
+    unittest.main()
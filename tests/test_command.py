@@ -0,0 +1,144 @@
+import asyncio
+import time
+import unittest
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from zai.core.interpreter import Interpreter
+from zai.core.parser import get_parser
+from zai.runtime.command import OutputBuffer, run_command, run_command_async
+from zai.runtime.default_bridge import DefaultAsyncExecBridge, DefaultExecBridge
+from zai.runtime.shell_pool import ShellPool
+
+
+class TestOutputBuffer(unittest.TestCase):
+    def test_keeps_head_and_tail(self):
+        buffer = OutputBuffer("stdout", 10)
+        for piece in (b"abc", b"defgh", b"ijklmnop"):
+            buffer.feed(piece)
+        self.assertEqual(buffer.text(), "abcde\n[... 6 bytes truncated ...]\nlmnop")
+
+    def test_lines_across_pieces(self):
+        lines = []
+        buffer = OutputBuffer("stderr", 100, lambda stream, line: lines.append((stream, line)))
+        for piece in (b"one\ntw", b"o\n", b"three"):
+            buffer.feed(piece)
+        self.assertEqual(lines, [("stderr", "one"), ("stderr", "two")])
+        buffer.close()
+        self.assertEqual(lines[-1], ("stderr", "three"))
+
+
+class RunnerCases:
+    def run_command(self, command, **kwargs):
+        raise NotImplementedError
+
+    def test_result(self):
+        self.assertEqual(self.run_command("echo out; echo err >&2; exit 2"),
+                         {"stdout": "out\n", "stderr": "err\n", "code": 2})
+
+    def test_timeout_kills_the_process_group(self):
+        start = time.perf_counter()
+        result = self.run_command("echo started; sleep 5 & sleep 5; echo never", timeout=0.3)
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertEqual(result["stdout"], "started\n")
+        self.assertEqual(result["error"], "Command timed out after 0.3s")
+        self.assertNotEqual(result["code"], 0)
+
+    def test_output_cap(self):
+        result = self.run_command("seq 1 100000", limit=64)
+        self.assertTrue(result["stdout"].startswith("1\n2\n3\n"))
+        self.assertTrue(result["stdout"].endswith("99999\n100000\n"))
+        self.assertIn("bytes truncated ...]", result["stdout"])
+        self.assertLess(len(result["stdout"]), 120)
+
+    def test_lines(self):
+        lines = []
+        self.run_command("echo a; echo b >&2; printf c", on_line=lambda stream, line: lines.append((stream, line)))
+        self.assertEqual(sorted(lines), [("stderr", "b"), ("stdout", "a"), ("stdout", "c")])
+
+    def test_lines_arrive_while_running(self):
+        seen = []
+        start = time.perf_counter()
+        self.run_command("echo first; sleep 0.3; echo second",
+                         on_line=lambda stream, line: seen.append((line, time.perf_counter() - start)))
+        self.assertLess(seen[0][1], 0.25)
+        self.assertGreaterEqual(seen[1][1], 0.25)
+
+
+class TestRunCommand(RunnerCases, unittest.TestCase):
+    def run_command(self, command, **kwargs):
+        return run_command(command, **kwargs)
+
+
+class TestRunCommandAsync(RunnerCases, unittest.TestCase):
+    def run_command(self, command, **kwargs):
+        return asyncio.run(run_command_async(command, **kwargs))
+
+
+class TestPooledCommand(RunnerCases, unittest.TestCase):
+    def setUp(self):
+        self.pool = ShellPool(1)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def run_command(self, command, **kwargs):
+        return self.pool.run(command, **kwargs)
+
+
+class TestExecStatements(unittest.TestCase):
+    GROUP = """
+        agent A
+        skill Main() {
+            parallel {
+                exec "sleep 0.3; echo one" { filter: ["stdout"] }
+                exec "sleep 0.3; echo two" { filter: ["code"] }
+                exec "sleep 0.3; echo three" { filter: ["stderr"] }
+            }
+            success 0 "OK"
+        }
+        """
+
+    def test_parallel_exec_group(self):
+        tree = get_parser().parse(self.GROUP, start='agent')
+        interp = Interpreter(tree, ai_bridge=MagicMock(), exec_bridge=DefaultExecBridge(concurrency=3),
+                             parallel_exec=True)
+        start = time.perf_counter()
+        interp.run()
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertEqual(interp.env.get_context("stdout"), "one\n")
+        self.assertEqual(interp.env.get_context("code"), 0)
+
+    def test_async_parallel_exec_group(self):
+        from zai.core.async_interpreter import AsyncInterpreter
+        tree = get_parser().parse(self.GROUP, start='agent')
+        interp = AsyncInterpreter(tree, ai_bridge=MagicMock(), exec_bridge=DefaultAsyncExecBridge(),
+                                  parallel_exec=True)
+        start = time.perf_counter()
+        asyncio.run(interp.run())
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertEqual(interp.env.get_context("stderr"), "")
+
+    def test_streamed_exec_echoes_lines(self):
+        tree = get_parser().parse("""
+        agent A
+        skill Main() {
+            exec "echo one; echo two >&2"
+            success 0 "OK"
+        }
+        """, start='agent')
+        interp = Interpreter(tree, ai_bridge=MagicMock(), exec_bridge=DefaultExecBridge(), stream=True)
+        with patch('sys.stdout', new=StringIO()) as out:
+            interp.run()
+        self.assertIn("[A] stdout: one\n", out.getvalue())
+        self.assertIn("[A] stderr: two\n", out.getvalue())
+        self.assertEqual(interp.env.get_context("stdout"), "one\n")
+
+    def test_timeout_from_config(self):
+        with patch('zai.runtime.command.get_float', return_value=0.2):
+            result = DefaultExecBridge().handle("sleep 3", [])
+        self.assertIn("timed out", result["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+from unittest.mock import MagicMock
+
+from zai.core import ir
+from zai.core.compiler import compile_skill, compile_expression, OPERATORS
+from zai.core.environment import Frame
+from zai.core.parser import get_parser
+
+
+class TestCompiler(unittest.TestCase):
+    def setUp(self):
+        self.parser = get_parser()
+
+    def skill(self, body):
+        tree = self.parser.parse(f"agent A skill Main() {{ {body} }}", start='agent')
+        return compile_skill(tree.children[-1])
+
+    def test_literals_are_preconverted(self):
+        body = self.skill('var s = "hi" var n = 3 var b = true var m = """multi"""').body
+        values = [stmt.expr.value for stmt in body.stmts]
+        self.assertEqual(values, ["hi", 3.0, True, "multi"])
+        self.assertTrue(all(isinstance(stmt.expr, ir.Const) for stmt in body.stmts))
+
+    def test_operators_are_prebound(self):
+        expr = self.skill('var x = a + 1 * b').body.stmts[0].expr
+        self.assertIsInstance(expr, ir.BinOp)
+        self.assertIs(expr.fn, OPERATORS['*'])
+        self.assertIs(expr.left.fn, OPERATORS['+'])
+        self.assertIsInstance(expr.left.left, ir.Name)
+
+    def test_statement_lowering(self):
+        skill = self.skill('''
+            context.x = 1
+            while x < 3 { x = x + 1 if x == 2 { break } }
+            process "Task" { extract: ["a", "b"] }
+            exec "ls" { filter: ["items"] }
+            [c, m] = wait Peer
+            invoke Other(k = 1)
+            fail 1 "bad"
+        ''')
+        kinds = [type(stmt) for stmt in skill.body.stmts]
+        self.assertEqual(kinds, [ir.SetContext, ir.While, ir.Process, ir.Exec, ir.Wait, ir.Invoke, ir.Fail])
+        self.assertEqual(skill.body.stmts[2].keys, ("a", "b"))
+        self.assertEqual(skill.body.stmts[3].keys, ("items",))
+        self.assertIsInstance(skill.body.stmts[1].body.stmts[1].then.stmts[0], ir.Break)
+        self.assertEqual(skill.body.stmts[5].args[0][0], "k")
+
+    def test_process_inputs(self):
+        skill = self.skill('''
+            process "Triage" { extract: ["cause"], using: ["logs", "service"] }
+            process "All" { extract: ["x"] }
+        ''')
+        declared, everything = skill.body.stmts
+        self.assertEqual((declared.keys, declared.inputs), (("cause",), ("logs", "service")))
+        self.assertIsNone(everything.inputs)
+
+    def test_independent_processes_are_grouped(self):
+        skill = self.skill('''
+            process "Logs" { extract: ["logs"], using: ["service"] }
+            process "Metrics" { extract: ["metrics"], using: ["service"] }
+            process context.logs { extract: ["cause"], using: ["service"] }
+            say "done"
+            process "Alone" { extract: ["x"] }
+        ''')
+        kinds = [type(stmt) for stmt in skill.body.stmts]
+        self.assertEqual(kinds, [ir.ProcessGroup, ir.Process, ir.Say, ir.Process])
+        self.assertEqual([p.keys for p in skill.body.stmts[0].processes], [("logs",), ("metrics",)])
+        # Reads a key the group extracts, so it starts after the group
+        self.assertEqual(skill.body.stmts[1].keys, ("cause",))
+
+    def test_process_inputs_are_reads(self):
+        skill = self.skill('''
+            process "Classify" { extract: ["severity"], using: ["logs"] }
+            process "Plan" { extract: ["action"], using: ["severity"] }
+        ''')
+        kinds = [type(stmt) for stmt in skill.body.stmts]
+        self.assertEqual(kinds, [ir.Process, ir.Process])
+
+    def test_undeclared_inputs_are_not_grouped(self):
+        skill = self.skill('''
+            process "Logs" { extract: ["logs"] }
+            process "Metrics" { extract: ["metrics"], using: ["service"] }
+            process "Summary" { extract: ["summary"] }
+            process Ops.brief { extract: ["brief"], using: ["service"] }
+        ''')
+        kinds = [type(stmt) for stmt in skill.body.stmts]
+        # Without `using` a call is sent the whole context; a persona item may
+        # read any key: each can only open a group
+        self.assertEqual(kinds, [ir.ProcessGroup, ir.Process, ir.Process])
+
+    def test_only_parallel_blocks_group_execs(self):
+        skill = self.skill('''
+            exec "mkdir out" { filter: ["code"] }
+            exec "ls out" { filter: ["stdout"] }
+            parallel {
+                exec "uptime" { filter: ["stdout"] }
+                exec "df -h"
+            }
+        ''')
+        kinds = [type(stmt) for stmt in skill.body.stmts]
+        # Consecutive execs may depend on each other through the filesystem
+        self.assertEqual(kinds, [ir.Exec, ir.Exec, ir.ExecGroup])
+        self.assertEqual([e.keys for e in skill.body.stmts[2].execs], [("stdout",), ()])
+
+    def test_closures_short_circuit(self):
+        interp = MagicMock()
+        interp.env.get_context.return_value = True
+        and_expr = self.skill('var x = false && context.flag').body.stmts[0].expr
+        or_expr = self.skill('var x = true || context.flag').body.stmts[0].expr
+        self.assertFalse(and_expr.evaluate(interp, None))
+        self.assertTrue(or_expr.evaluate(interp, None))
+        interp.env.get_context.assert_not_called()
+
+    def test_closures_match_operator_semantics(self):
+        interp = MagicMock()
+        interp.env.get_context.return_value = None
+        cases = {
+            '"a" + 1': "a1.0",
+            '1 + 2 * 3': 9.0,
+            'missing + 1': 1,
+            '"x" > 1': False,
+            '1 / 0': False,
+            '2 == 2': True,
+        }
+        for text, expected in cases.items():
+            skill = self.skill(f'var x = {text}')
+            expr = skill.body.stmts[0].expr
+            self.assertEqual(expr.evaluate(interp, Frame(skill.layout)), expected, text)
+
+    def test_locals_resolved_to_slots(self):
+        skill = self.skill('var a = 1 b = a + c [code, msg] = wait Peer')
+        layout = skill.layout
+        self.assertEqual(sorted(layout.values()), list(range(5)))
+        decl, assign, wait = skill.body.stmts
+        self.assertEqual((decl.slot, assign.slot), (layout["a"], layout["b"]))
+        self.assertEqual((assign.expr.left.slot, assign.expr.right.slot), (layout["a"], layout["c"]))
+        self.assertEqual((wait.code_slot, wait.msg_slot), (layout["code"], layout["msg"]))
+
+    def test_persona_names_are_dynamic(self):
+        tree = self.parser.parse('persona P { tone: mood }', start='persona_def')
+        self.assertIsNone(compile_expression(tree.children[1].children[1]).slot)
+
+    def test_persona_block_lowering(self):
+        tree = self.parser.parse(
+            'persona P { tone { "A" if context.f { "B" } else { "C" } } }', start='persona_def')
+        block = compile_expression(tree.children[1].children[1])
+        self.assertIsInstance(block, ir.PersonaBlock)
+        self.assertIsInstance(block.fragments[1], ir.PersonaIf)
+        self.assertIsInstance(block.fragments[1].cond, ir.ContextRef)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -30,7 +30,7 @@ class TestConstraints(unittest.TestCase):
         """
         parser = get_parser()
         tree = parser.parse(code, start='agent')
-        interpreter = Interpreter(tree)
+        interpreter = Interpreter(tree, ast_cache=False)
         
         try:
             with self.assertRaises(RuntimeError) as cm:
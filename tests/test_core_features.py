@@ -44,7 +44,7 @@ class TestCoreFeatures(unittest.TestCase):
         """
         parser = get_parser()
         tree = parser.parse(code, start='agent')
-        interpreter = Interpreter(tree)
+        interpreter = Interpreter(tree, ast_cache=False)
         
         # Should run without infinite recursion error
         try:
@@ -2,6 +2,8 @@ import unittest
 from unittest.mock import MagicMock, patch
 import os
 import json
+import threading
+import time
 from zai.runtime.default_bridge import DefaultAIBridge, DefaultExecBridge
 from zai.builtin import tools
 
@@ -22,6 +24,51 @@ class TestDefaultBridges(unittest.TestCase):
         self.assertEqual(result, {"mood": "happy"})
         mock_client.chat.completions.create.assert_called_once()
 
+    @patch('zai.runtime.default_bridge.OpenAI')
+    def test_ai_bridge_handle_many(self, mock_openai):
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+
+        def create(model, messages, response_format, timeout=None):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            content = json.dumps({"answer": messages[1]["content"].split("Task: ")[1].split("\n")[0]})
+            return MagicMock(choices=[MagicMock(message=MagicMock(content=content))])
+        mock_openai.return_value.chat.completions.create.side_effect = create
+
+        bridge = DefaultAIBridge(api_key="test_key", concurrency=3)
+        requests = [(f"q{i}", ["answer"], "system", {}) for i in range(6)]
+        results = bridge.handle_many(requests)
+
+        self.assertEqual(results, [{"answer": f"q{i}"} for i in range(6)])
+        self.assertEqual(peak[0], 3)
+
+    @patch('zai.runtime.default_bridge.OpenAI')
+    def test_ai_bridge_handle_stream(self, mock_openai):
+        pieces = ['{"mood": "hap', 'py", ', '"energy": ', '3, "extra": 1', '}']
+        delivered = []
+
+        def chunks():
+            for piece in pieces:
+                delivered.append(piece)
+                yield MagicMock(choices=[MagicMock(delta=MagicMock(content=piece))])
+            yield MagicMock(choices=[])  # usage-only chunk
+        mock_openai.return_value.chat.completions.create.return_value = chunks()
+
+        bridge = DefaultAIBridge(api_key="test_key")
+        reported = []
+        result = bridge.handle_stream("How are you?", ["mood", "energy"], "system", {},
+                                      lambda k, v: reported.append((k, v, len(delivered))))
+
+        self.assertEqual(result, {"mood": "happy", "energy": 3})
+        # mood is reported once its trailing comma arrives, before the rest
+        self.assertEqual(reported, [("mood", "happy", 2), ("energy", 3, 4)])
+        self.assertTrue(mock_openai.return_value.chat.completions.create.call_args.kwargs["stream"])
+
     def test_exec_bridge_builtin(self):
         bridge = DefaultExecBridge()
         # Test 'ls' builtin
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from zai.builtin import tools
+from zai.runtime import http
+from zai.runtime.default_bridge import DefaultAIBridge, DefaultAsyncAIBridge
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    peers = set()
+
+    def do_GET(self):
+        Handler.peers.add(self.client_address)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSharedClient(unittest.TestCase):
+    def setUp(self):
+        http.close_clients()
+
+    def tearDown(self):
+        http.close_clients()
+
+    def test_fetch_reuses_connections(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            Handler.peers.clear()
+            url = f"http://127.0.0.1:{server.server_port}/"
+            results = [tools.fetch(url) for _ in range(5)]
+        finally:
+            http.close_clients()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual([r["status"] for r in results], [200] * 5)
+        self.assertEqual(results[0]["body"], "ok")
+        # One TCP connection for all five requests
+        self.assertEqual(len(Handler.peers), 1)
+
+    def test_bridges_share_the_pool(self):
+        with patch('builtins.print'):
+            first = DefaultAIBridge(api_key="k", cache=False)
+            second = DefaultAIBridge(api_key="k", cache=False)
+        self.assertIs(first.client._client, http.get_client())
+        self.assertIs(second.client._client, http.get_client())
+
+    def test_async_client_per_loop(self):
+        bridge = DefaultAsyncAIBridge(api_key="k", cache=False)
+
+        async def clients():
+            try:
+                return bridge.client, bridge.client._client, http.get_async_client()
+            finally:
+                await http.aclose_client()
+
+        a_client, a_http, a_pool = asyncio.run(clients())
+        b_client, _, b_pool = asyncio.run(clients())
+        self.assertIs(a_http, a_pool)
+        self.assertIsNot(a_client, b_client)
+        self.assertIsNot(a_pool, b_pool)
+
+    def test_http2_modes(self):
+        with patch('zai.runtime.http.importlib.util.find_spec', return_value=object()):
+            self.assertTrue(http.http2_enabled("on"))
+            self.assertTrue(http.http2_enabled("auto"))
+        self.assertFalse(http.http2_enabled("off"))
+        with self.assertRaises(ValueError):
+            http.http2_enabled("maybe")
+
+    def test_http2_on_without_h2(self):
+        with patch('zai.runtime.http.importlib.util.find_spec', return_value=None):
+            self.assertFalse(http.http2_enabled("auto"))
+            with self.assertRaisesRegex(ValueError, "needs the h2 package"):
+                http.http2_enabled("on")
+
+
+if __name__ == '__main__':
+    unittest.main()
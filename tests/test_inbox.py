@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from zai.core.interpreter import Interpreter
+from zai.core.parser import get_parser
+from zai.runtime.inbox import InotifyWatcher, PollingWatcher, open_watcher
+from zai.runtime.transport import FileTransport
+
+
+def write_later(path, delay, content="{}"):
+    def write():
+        time.sleep(delay)
+        with open(path, "w") as f:
+            f.write(content)
+    thread = threading.Thread(target=write)
+    thread.start()
+    return thread
+
+
+class TestInboxWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_open_watcher_modes(self):
+        self.assertIsInstance(open_watcher(self.tmp, "poll"), PollingWatcher)
+        self.assertIsInstance(open_watcher(self.tmp, "inotify"), InotifyWatcher)
+        with self.assertRaises(ValueError):
+            open_watcher(self.tmp, "kqueue")
+
+    def test_inotify_wakes_on_write(self):
+        watcher = InotifyWatcher(self.tmp)
+        thread = write_later(os.path.join(self.tmp, "m.json"), 0.1)
+        start = time.perf_counter()
+        self.assertTrue(watcher.wait(5))
+        self.assertLess(time.perf_counter() - start, 1)
+        thread.join()
+        watcher.close()
+
+    def test_inotify_timeout(self):
+        watcher = InotifyWatcher(self.tmp)
+        self.assertFalse(watcher.wait(0.05))
+
+    def test_event_before_wait_is_kept(self):
+        watcher = InotifyWatcher(self.tmp)
+        with open(os.path.join(self.tmp, "early.json"), "w") as f:
+            f.write("{}")
+        self.assertTrue(watcher.wait(0))
+        self.assertFalse(watcher.wait(0))
+
+    def test_removed_directory(self):
+        watcher = InotifyWatcher(self.tmp)
+        shutil.rmtree(self.tmp)
+        self.assertTrue(watcher.wait(1))
+        self.assertFalse(watcher.alive)
+
+    def test_async_wait(self):
+        watcher = InotifyWatcher(self.tmp)
+
+        async def main():
+            thread = write_later(os.path.join(self.tmp, "m.json"), 0.1)
+            woke = await watcher.wait_async(5)
+            thread.join()
+            return woke
+
+        self.assertTrue(asyncio.run(main()))
+        self.assertFalse(asyncio.run(watcher.wait_async(0.05)))
+
+
+class TestWaitWakeup(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def test_wait_wakes_before_poll_interval(self):
+        tree = get_parser().parse('''
+        agent Receiver
+        context C { got: "" }
+        skill Main() {
+            [code, payload] = wait Sender
+            context.got = payload
+            success 0 "Done"
+        }
+        ''', start='agent')
+        transport = FileTransport(watch_mode="inotify", poll_interval=10)
+        interpreter = Interpreter(tree, ai_bridge=MagicMock(), exec_bridge=MagicMock(), wait_timeout=5, transport=transport)
+
+        os.makedirs(os.path.join(".zai_ipc", "Receiver"))
+        message = json.dumps({"source": "Sender", "type": "HELLO", "payload": "World", "seq": 1, "response_seq": None})
+        thread = write_later(os.path.join(".zai_ipc", "Receiver", "m.json"), 0.2, message)
+        start = time.perf_counter()
+        interpreter.run()
+        thread.join()
+
+        self.assertEqual(interpreter.env.get_context("got"), "World")
+        self.assertLess(time.perf_counter() - start, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import unittest
+
+from zai.runtime.json_stream import JsonObjectStream
+
+REPLY = json.dumps({
+    "root_cause": "disk full on /var",
+    "confidence": 0.92,
+    "steps": [{"cmd": "df -h"}, {"cmd": "du -sh /var/log"}],
+    "note": "quote \" brace } comma , done",
+    "requires_human": False,
+})
+
+
+class TestJsonObjectStream(unittest.TestCase):
+    def test_members_complete_in_order(self):
+        parser = JsonObjectStream()
+        seen = []
+        for i, ch in enumerate(REPLY):
+            for key, value in parser.feed(ch):
+                seen.append((key, value, i))
+        self.assertEqual([k for k, _, _ in seen], list(json.loads(REPLY)))
+        self.assertEqual(parser.result(), json.loads(REPLY))
+        # The first key is available long before the reply ends
+        self.assertLess(seen[0][2], len(REPLY) // 4)
+        self.assertTrue(parser.done)
+
+    def test_any_chunking(self):
+        for size in (1, 3, 7, 64):
+            parser = JsonObjectStream()
+            members = []
+            for i in range(0, len(REPLY), size):
+                members.extend(parser.feed(REPLY[i:i + size]))
+            self.assertEqual(dict(members), json.loads(REPLY))
+
+    def test_ignores_text_around_object(self):
+        parser = JsonObjectStream()
+        members = parser.feed('```json\n{"a": 1, ') + parser.feed('"b": "x"}\n```')
+        self.assertEqual(members, [("a", 1), ("b", "x")])
+
+    def test_no_object(self):
+        parser = JsonObjectStream()
+        parser.feed("I cannot help with that")
+        self.assertIsNone(parser.result())
+
+    def test_truncated_object(self):
+        parser = JsonObjectStream()
+        self.assertEqual(parser.feed('{"a": 1, "b": "unfinished'), [("a", 1)])
+        self.assertFalse(parser.done)
+        self.assertIsNone(parser.result())
+
+    def test_malformed_member_fails_the_result(self):
+        parser = JsonObjectStream()
+        members = parser.feed('{"a": 1, "b": tru') + parser.feed('e_ish, "c": 2}')
+        self.assertEqual(members, [("a", 1), ("c", 2)])
+        self.assertTrue(parser.done)
+        # The whole text is re-parsed, not the members that happened to parse
+        self.assertIsNone(parser.result())
+        self.assertEqual(parser.text, '{"a": 1, "b": true_ish, "c": 2}')
+
+
+if __name__ == '__main__':
+    unittest.main()
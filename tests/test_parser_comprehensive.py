@@ -1,6 +1,8 @@
+import os
+import tempfile
 import unittest
 from lark import Lark, Tree, Token
-from zai.core.parser import get_parser
+from zai.core.parser import get_parser, grammar_cache_path, LALR_GRAMMAR, _build_lalr
 
 class TestParserComprehensive(unittest.TestCase):
     def setUp(self):
@@ -109,5 +111,57 @@ class TestParserComprehensive(unittest.TestCase):
         self.assertEqual(tree.children[0].data, 'context_def')
         self.assertEqual(tree.children[1].data, 'import_stmt')
 
+    def test_lalr_matches_earley(self):
+        code = """
+        agent Modes
+        <<<
+        You help {{user}}.
+        >>>
+        context C { flag: true, n: 0 }
+        persona P { tone { if context.flag && n >= 1 { "A" } else { "B" } } }
+        skill Main() {
+            var x = 1 + 2 * 3 - n
+            var s = P.tone
+            while x > 0 && context.flag { x = x - 1 }
+            process "Task " + s { extract: ["k"] }
+            exec "ls" { filter: ["items"] }
+            success 0 "OK"
+        }
+        """
+        lalr = get_parser('lalr').lalr.parse(code, start='start')
+        earley = get_parser('earley').parse(code, start='start')
+        self.assertEqual(lalr, earley)
+
+    def test_lalr_falls_back_to_earley(self):
+        # A template_render used as a condition is only accepted by Earley
+        code = """
+        agent Fallback
+        skill Main() {
+            if tpl { a = 1 } { say "x" }
+            success 0 "OK"
+        }
+        """
+        tree = get_parser('lalr').parse(code, start='start')
+        if_stmt = tree.children[0].children[-1].children[2].children[0]
+        self.assertEqual(if_stmt.children[0].data, 'template_render')
+
+    def test_parser_is_memoized(self):
+        self.assertIs(get_parser(), get_parser())
+        self.assertIs(get_parser('earley'), get_parser('earley'))
+
+    def test_grammar_tables_cached_on_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = grammar_cache_path(LALR_GRAMMAR, tmp)
+            _build_lalr(tmp)
+            self.assertTrue(os.path.exists(path))
+            # A second build loads the serialized tables
+            parser = _build_lalr(tmp)
+            tree = parser.parse('context C { x: 1 }', start='config_file')
+            self.assertEqual(tree.children[0].data, 'context_def')
+
+    def test_unknown_parser_mode(self):
+        with self.assertRaises(ValueError):
+            get_parser('cyk')
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import MagicMock
+
+from zai.core.environment import Frame
+from zai.core.interpreter import Interpreter
+from zai.core.parser import get_parser
+
+AGENT = """
+agent A
+<<<
+You help {{user}}.
+>>>
+context C { formal: true, user: "Ann", topic: "tax" }
+persona Writer {
+    style { if context.formal { "Formal" } else { "Casual" } }
+    focus { "Stay on " + topic }
+}
+skill Main() {
+    success 0 "OK"
+}
+"""
+
+
+def loaded(code=AGENT):
+    tree = get_parser().parse(code, start='agent')
+    interp = Interpreter(tree, ai_bridge=MagicMock(), exec_bridge=MagicMock())
+    interp.load()
+    return interp
+
+
+class TestPersonaCache(unittest.TestCase):
+    def test_reused_until_a_dependency_is_written(self):
+        interp = loaded()
+        first = interp.build_system_prompt(interp.env)
+        self.assertIn("You help Ann.", first)
+        self.assertIn("[style]\nFormal", first)
+        self.assertEqual(interp.persona_cache.misses, 3)
+
+        interp.env.set_context("unrelated", 1)
+        self.assertEqual(interp.build_system_prompt(interp.env), first)
+        self.assertEqual((interp.persona_cache.hits, interp.persona_cache.misses), (3, 3))
+
+        interp.env.set_context("formal", False)
+        second = interp.build_system_prompt(interp.env)
+        self.assertIn("[style]\nCasual", second)
+        self.assertIn("You help Ann.", second)
+        # only the style item read `formal`
+        self.assertEqual((interp.persona_cache.hits, interp.persona_cache.misses), (5, 4))
+
+    def test_variables_shadowing_context(self):
+        interp = loaded()
+        frame = Frame({"topic": 0})
+        frame.parent = interp.env
+        self.assertIn("Stay on tax", interp.build_system_prompt(frame))
+
+        frame.values[0] = "rent"
+        self.assertIn("Stay on rent", interp.build_system_prompt(frame))
+        frame.values[0] = "rent"
+        interp.build_system_prompt(frame)
+        self.assertEqual(interp.persona_cache.misses, 4)
+
+    def test_persona_redefinition_renders_afresh(self):
+        interp = loaded()
+        interp.build_system_prompt(interp.env)
+        interp.visit_persona_def(get_parser().parse(
+            'agent A persona Writer { style { "Terse" } } skill Main() { success 0 "OK" }',
+            start='agent').children[2], interp.env)
+        self.assertIn("[style]\nTerse", interp.build_system_prompt(interp.env))
+
+    def test_process_calls_share_renders(self):
+        code = AGENT.replace('success 0 "OK"', '''
+            var i = 0
+            while i < 3 {
+                process "Draft" { extract: ["draft"] }
+                i = i + 1
+            }
+            context.formal = false
+            process "Draft" { extract: ["draft"] }
+            success 0 "OK"''')
+        interp = loaded(code)
+        interp.ai_bridge.handle.return_value = {"draft": "..."}
+        interp.execute_skill("Main", {})
+
+        prompts = [c.args[2] for c in interp.ai_bridge.handle.call_args_list]
+        self.assertEqual(len(set(prompts[:3])), 1)
+        self.assertIn("Casual", prompts[3])
+        self.assertEqual(interp.persona_cache.misses, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from zai.core.interpreter import Interpreter
+from zai.core.parser import get_parser
+from zai.runtime.default_bridge import DefaultAIBridge
+from zai.runtime.prompt import PrefixStats, SystemPrompt, TokenUsage, build_messages, common_prefix, select_context
+
+CONTEXT = {"service": "api", "severity": "critical", "logs": "ERROR disk full\n" * 500, "metrics": {"cpu": [0.9] * 400}}
+
+
+class TestSelectContext(unittest.TestCase):
+    def test_declared_inputs(self):
+        self.assertEqual(select_context(CONTEXT, ("service", "missing")), {"service": "api"})
+
+    def test_all_is_default(self):
+        self.assertIs(select_context(CONTEXT, mode="all"), CONTEXT)
+
+    def test_auto_keeps_small_and_mentioned_values(self):
+        selected = select_context(CONTEXT, mentions=("Find the root cause in the logs", "You are an SRE"),
+                                  mode="auto", large=200)
+        self.assertEqual(sorted(selected), ["logs", "service", "severity"])
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            select_context(CONTEXT, mode="smart")
+
+
+class TestBuildMessages(unittest.TestCase):
+    def test_compact_context(self):
+        messages = build_messages("Task", ["a"], "sys", {"k": {"n": [1, 2]}, "t": "é"})
+        self.assertIn('{"k":{"n":[1,2]},"t":"é"}', messages[1]["content"])
+
+
+class TestTokenUsage(unittest.TestCase):
+    def test_reported_and_estimated_counts(self):
+        usage = TokenUsage(log=False)
+        messages = [{"role": "system", "content": "s" * 40}, {"role": "user", "content": "u" * 60}]
+        usage.record(messages, MagicMock(prompt_tokens=30, completion_tokens=5))
+        call = usage.record(messages, completion="x" * 8)
+        self.assertEqual(call, {"prompt_chars": 100, "prompt_tokens": 25, "completion_tokens": 2, "estimated": True})
+        self.assertEqual(usage.totals(), {"calls": 2, "prompt_chars": 200, "prompt_tokens": 55, "completion_tokens": 7})
+
+
+class TestPrefixStats(unittest.TestCase):
+    def test_common_prefix(self):
+        self.assertEqual(common_prefix("abcdef", "abcxyz"), 3)
+        self.assertEqual(common_prefix("abc", "abc"), 3)
+        self.assertEqual(common_prefix("", "abc"), 0)
+        long = "x" * 1000
+        self.assertEqual(common_prefix(long + "a", long + "b"), 1000)
+        self.assertEqual(common_prefix(long, long + "tail"), 1000)
+
+    def test_reuse_against_recent_prompts(self):
+        stats = PrefixStats(window=2)
+        system = SystemPrompt("static\n\ndynamic A", "static")
+        self.assertEqual(stats.record(build_messages("Task", ["a"], system, {"k": 1})), 0)
+        reused = stats.record(build_messages("Task", ["a"], SystemPrompt("static\n\ndynamic B", "static"), {"k": 1}))
+        self.assertEqual(reused, len("system\0static\n\ndynamic "))
+        report = stats.report()
+        self.assertEqual((report["calls"], report["static_chars"], report["reused_chars"]), (2, 12, reused))
+
+    def test_static_persona_items_lead_the_system_prompt(self):
+        tree = get_parser().parse('''
+        agent A
+        context C { mood: "calm" }
+        persona P {
+            mood { "Mood: " + context.mood }
+            role { "You are a support engineer." }
+        }
+        persona Q {
+            rules { "Answer in English." }
+        }
+        skill Main() {
+            process "One" { extract: ["mood"] }
+            process "Two" { extract: ["mood"] }
+        }
+        ''', start='agent')
+        mock_ai = MagicMock()
+        mock_ai.handle.side_effect = [{"mood": "tense"}, {"mood": "calm"}]
+        Interpreter(tree, ai_bridge=mock_ai, exec_bridge=MagicMock()).run()
+
+        first, second = (c.args[2] for c in mock_ai.handle.call_args_list)
+        self.assertEqual(first.static, "--- Persona: P ---\n[role]\nYou are a support engineer.\n\n"
+                                       "--- Persona: Q ---\n[rules]\nAnswer in English.")
+        self.assertTrue(first.startswith(first.static))
+        self.assertEqual(first.static, second.static)
+        self.assertTrue(first.endswith("[mood]\nMood: calm"))
+        self.assertTrue(second.endswith("[mood]\nMood: tense"))
+
+
+class TestProcessInputs(unittest.TestCase):
+    @patch('zai.runtime.default_bridge.OpenAI')
+    def test_using_shrinks_prompt(self, mock_openai):
+        mock_openai.return_value.chat.completions.create.return_value = MagicMock(
+            usage=None, choices=[MagicMock(message=MagicMock(content=json.dumps({"cause": "disk"})))])
+        bridge = DefaultAIBridge(api_key="k", cache=False)
+        context = 'context C { service: "api", logs: "' + "ERROR disk full " * 500 + '" }'
+        for clause in ('', ', using: ["service"]'):
+            tree = get_parser().parse(f'''
+            agent A
+            {context}
+            skill Main() {{ process "Triage" {{ extract: ["cause"]{clause} }} }}
+            ''', start='agent')
+            Interpreter(tree, ai_bridge=bridge, exec_bridge=MagicMock()).run()
+
+        everything, declared = bridge.usage.recent
+        self.assertGreater(everything["prompt_chars"], 8000)
+        self.assertLess(declared["prompt_chars"], 500)
+        sent = mock_openai.return_value.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        self.assertIn('{"service":"api"}', sent)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import openai
+
+from zai.runtime.default_bridge import DefaultAIBridge, DefaultAsyncAIBridge, retry_after, retryable
+from zai.runtime.http import httpx
+from zai.runtime.resilience import CallMetrics, CallPolicy, TokenBucket, shared_bucket
+
+
+class Flaky(Exception):
+    pass
+
+
+def warmed(policy, latency=0.01, n=20):
+    for _ in range(n):
+        policy.metrics.observe(latency)
+    return policy
+
+
+def status_error(cls, status, headers=None):
+    request = httpx.Request("POST", "http://model.test/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls("failed", response=response, body=None)
+
+
+def completion(content):
+    return MagicMock(choices=[MagicMock(message=MagicMock(content=content))])
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=50, burst=2)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.02, delta=0.005)
+        self.assertAlmostEqual(bucket.reserve(), 0.04, delta=0.005)
+
+    def test_unlimited(self):
+        bucket = TokenBucket(rate=0)
+        self.assertEqual([bucket.reserve() for _ in range(100)], [0.0] * 100)
+
+    def test_shared_between_threads(self):
+        bucket = shared_bucket("test:threads", rate=100, burst=1)
+        self.assertIs(shared_bucket("test:threads", rate=100, burst=1), bucket)
+        start = time.perf_counter()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # one token up front, the other five at 100/s
+        self.assertGreaterEqual(time.perf_counter() - start, 0.045)
+
+
+class TestCallPolicy(unittest.TestCase):
+    def policy(self, **kwargs):
+        kwargs.setdefault("backoff", 0.001)
+        return CallPolicy(retryable=lambda exc: isinstance(exc, Flaky), **kwargs)
+
+    def test_retries_then_succeeds(self):
+        calls = []
+
+        def call(timeout):
+            calls.append(timeout)
+            if len(calls) < 3:
+                raise Flaky()
+            return "ok"
+
+        policy = self.policy(timeout=7.5)
+        self.assertEqual(policy.run(call), "ok")
+        self.assertEqual(calls, [7.5, 7.5, 7.5])
+        stats = policy.metrics.snapshot()
+        self.assertEqual((stats["calls"], stats["attempts"], stats["retries"], stats["failures"]), (1, 3, 2, 0))
+
+    def test_gives_up(self):
+        def call(timeout):
+            raise Flaky()
+
+        policy = self.policy(retries=2)
+        with self.assertRaises(Flaky):
+            policy.run(call)
+        self.assertEqual((policy.metrics.attempts, policy.metrics.failures), (3, 1))
+
+        with self.assertRaises(KeyError):
+            policy.run(lambda timeout: {}["missing"])
+        self.assertEqual(policy.metrics.retries, 2)  # not retryable
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = CallPolicy(backoff=1.0, backoff_max=4.0)
+        for attempt in range(6):
+            delays = [policy.delay(attempt, Flaky()) for _ in range(50)]
+            self.assertTrue(all(0 <= d <= min(4.0, 2 ** attempt) for d in delays))
+            self.assertGreater(len(set(delays)), 1)
+
+    def test_retry_after_hint(self):
+        policy = CallPolicy(backoff_max=5.0, retry_after=lambda exc: 2.0)
+        self.assertEqual(policy.delay(0, Flaky()), 2.0)
+        policy.retry_after = lambda exc: 60.0
+        self.assertEqual(policy.delay(0, Flaky()), 5.0)
+
+    def test_hedged_duplicate_wins(self):
+        calls = []
+
+        def call(timeout):
+            calls.append(time.perf_counter())
+            if len(calls) == 1:
+                time.sleep(0.5)
+                return "slow"
+            return "fast"
+
+        policy = warmed(self.policy(hedge_percentile=95))
+        start = time.perf_counter()
+        self.assertEqual(policy.run(call), "fast")
+        self.assertLess(time.perf_counter() - start, 0.3)
+        self.assertEqual((policy.metrics.hedges, policy.metrics.hedge_wins), (1, 1))
+
+    def test_hedge_takes_a_token(self):
+        def call(timeout):
+            time.sleep(0.2)
+            return "done"
+
+        # The first attempt takes the only token: no budget left to hedge
+        policy = warmed(self.policy(hedge_percentile=95, bucket=TokenBucket(rate=1, burst=1)))
+        self.assertEqual(policy.run(call), "done")
+        self.assertEqual((policy.metrics.hedges, policy.metrics.hedges_skipped), (0, 1))
+
+        # With budget for both, the hedge spends one
+        bucket = TokenBucket(rate=1, burst=2)
+        policy = warmed(self.policy(hedge_percentile=95, bucket=bucket))
+        policy.run(call)
+        self.assertEqual(policy.metrics.hedges, 1)
+        self.assertFalse(bucket.try_acquire())
+
+    def test_no_hedge_until_enough_samples(self):
+        policy = warmed(self.policy(hedge_percentile=95), n=5)
+        self.assertIsNone(policy.hedge_delay())
+        policy.run(lambda timeout: time.sleep(0.05))
+        self.assertEqual(policy.metrics.hedges, 0)
+
+    def test_async_hedge_cancels_loser(self):
+        cancelled = []
+
+        async def call(timeout):
+            if not cancelled:
+                cancelled.append(False)
+                try:
+                    await asyncio.sleep(1)
+                except asyncio.CancelledError:
+                    cancelled[0] = True
+                    raise
+                return "slow"
+            return "fast"
+
+        async def main():
+            policy = warmed(self.policy(hedge_percentile=95))
+            result = await policy.run_async(call)
+            await asyncio.sleep(0)
+            return policy, result
+
+        policy, result = asyncio.run(main())
+        self.assertEqual(result, "fast")
+        self.assertEqual(cancelled, [True])
+        self.assertEqual(policy.metrics.hedge_wins, 1)
+
+    def test_percentile(self):
+        metrics = CallMetrics()
+        for ms in range(1, 101):
+            metrics.observe(ms / 1000)
+        self.assertEqual(metrics.percentile(50), 0.05)
+        self.assertEqual(metrics.percentile(95), 0.095)
+        self.assertEqual(metrics.snapshot()["latency_p99"], 0.099)
+
+
+class TestBridgeResilience(unittest.TestCase):
+    def test_classification(self):
+        self.assertTrue(retryable(status_error(openai.RateLimitError, 429)))
+        self.assertTrue(retryable(status_error(openai.InternalServerError, 503)))
+        self.assertFalse(retryable(status_error(openai.BadRequestError, 400)))
+        self.assertEqual(retry_after(status_error(openai.RateLimitError, 429, {"retry-after": "1.5"})), 1.5)
+        self.assertIsNone(retry_after(ValueError()))
+
+    @patch('zai.runtime.default_bridge.OpenAI')
+    def test_rate_limited_call_is_retried(self, mock_openai):
+        create = mock_openai.return_value.chat.completions.create
+        create.side_effect = [status_error(openai.RateLimitError, 429, {"retry-after": "0"}),
+                              completion(json.dumps({"cause": "disk"}))]
+        bridge = DefaultAIBridge(api_key="k", cache=False,
+                                 policy=CallPolicy(timeout=9.0, retryable=retryable, retry_after=retry_after))
+
+        self.assertEqual(bridge.handle("Triage", ["cause"], "sys", {}), {"cause": "disk"})
+        self.assertEqual(create.call_args.kwargs["timeout"], 9.0)
+        self.assertEqual(mock_openai.call_args.kwargs["max_retries"], 0)
+        stats = bridge.metrics.snapshot()
+        self.assertEqual((stats["retries"], stats["rate_limited"]), (1, 1))
+
+    @patch('zai.runtime.default_bridge.OpenAI')
+    def test_malformed_reply_is_asked_again(self, mock_openai):
+        create = mock_openai.return_value.chat.completions.create
+        create.side_effect = [completion("Sure! The cause is disk."), completion(json.dumps({"cause": "disk"}))]
+        bridge = DefaultAIBridge(api_key="k", cache=False)
+
+        with patch('builtins.print'):
+            self.assertEqual(bridge.handle("Triage", ["cause"], "sys", {}), {"cause": "disk"})
+        self.assertEqual(bridge.metrics.malformed, 1)
+
+    @patch('zai.runtime.default_bridge.AsyncOpenAI')
+    def test_async_timeout_is_retried(self, mock_openai):
+        replies = [openai.APITimeoutError(request=httpx.Request("POST", "http://model.test")),
+                   completion(json.dumps({"cause": "disk"}))]
+
+        async def create(**kwargs):
+            reply = replies.pop(0)
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+        mock_openai.return_value.chat.completions.create.side_effect = create
+        bridge = DefaultAsyncAIBridge(api_key="k", cache=False,
+                                      policy=CallPolicy(backoff=0.001, retryable=retryable))
+
+        result = asyncio.run(bridge.handle("Triage", ["cause"], "sys", {}))
+        self.assertEqual(result, {"cause": "disk"})
+        self.assertEqual((bridge.metrics.timeouts, bridge.metrics.retries), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from zai.runtime.default_bridge import DefaultAIBridge
+from zai.runtime.response_cache import (
+    MemoryResponseCache, SQLiteResponseCache, cache_key, open_response_cache)
+
+
+class CacheCases:
+    def make_cache(self, **kwargs):
+        raise NotImplementedError
+
+    def test_roundtrip_and_counters(self):
+        cache = self.make_cache()
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", {"answer": "42"})
+        self.assertEqual(cache.get("k"), {"answer": "42"})
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_returns_copies(self):
+        cache = self.make_cache()
+        cache.put("k", {"items": [1]})
+        cache.get("k")["items"].append(2)
+        self.assertEqual(cache.get("k"), {"items": [1]})
+
+    def test_lru_eviction(self):
+        cache = self.make_cache(max_entries=2)
+        cache.put("a", {"v": 1})
+        time.sleep(0.001)
+        cache.put("b", {"v": 2})
+        time.sleep(0.001)
+        cache.get("a")  # b is now least recently used
+        time.sleep(0.001)
+        cache.put("c", {"v": 3})
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"v": 1})
+        self.assertEqual(cache.get("c"), {"v": 3})
+        self.assertEqual(cache.evictions, 1)
+
+    def test_ttl(self):
+        cache = self.make_cache(ttl=0.05)
+        cache.put("k", {"v": 1})
+        self.assertIsNotNone(cache.get("k"))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("k"))
+
+    def test_max_bytes(self):
+        cache = self.make_cache(max_bytes=30)
+        cache.put("big", {"v": "x" * 100})
+        self.assertIsNone(cache.get("big"))
+        cache.put("a", {"v": "x" * 10})
+        time.sleep(0.001)
+        cache.put("b", {"v": "y" * 10})
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("b"))
+
+
+class TestMemoryResponseCache(CacheCases, unittest.TestCase):
+    def make_cache(self, **kwargs):
+        return MemoryResponseCache(**kwargs)
+
+
+class TestSQLiteResponseCache(CacheCases, unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "responses.sqlite3")
+        self.caches = []
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+        shutil.rmtree(self.dir)
+
+    def make_cache(self, **kwargs):
+        cache = SQLiteResponseCache(self.path, **kwargs)
+        self.caches.append(cache)
+        return cache
+
+    def test_shared_between_instances(self):
+        self.make_cache().put("k", {"v": 1})
+        self.assertEqual(self.make_cache().get("k"), {"v": 1})
+
+
+class TestCacheKey(unittest.TestCase):
+    def test_stable_across_dict_order(self):
+        a = cache_key("m", 0.0, "p", ["x"], "s", {"a": 1, "b": {"c": 2, "d": 3}})
+        b = cache_key("m", 0.0, "p", ["x"], "s", {"b": {"d": 3, "c": 2}, "a": 1})
+        self.assertEqual(a, b)
+
+    def test_every_input_matters(self):
+        base = ("m", 0.0, "p", ["x"], "s", {"a": 1})
+        keys = {cache_key(*base)}
+        for i, changed in enumerate(("m2", 0.5, "p2", ["y"], "s2", {"a": 2})):
+            args = list(base)
+            args[i] = changed
+            keys.add(cache_key(*args))
+        self.assertEqual(len(keys), 7)
+
+
+class TestOpenResponseCache(unittest.TestCase):
+    def test_kinds(self):
+        self.assertIsNone(open_response_cache("off"))
+        self.assertIsInstance(open_response_cache("memory"), MemoryResponseCache)
+        with self.assertRaises(ValueError):
+            open_response_cache("redis")
+
+
+class TestCachedBridge(unittest.TestCase):
+    @patch('zai.runtime.default_bridge.OpenAI')
+    def test_identical_process_calls_hit_cache(self, mock_openai):
+        create = mock_openai.return_value.chat.completions.create
+        create.return_value = MagicMock(choices=[MagicMock(message=MagicMock(content=json.dumps({"cause": "disk"})))])
+        bridge = DefaultAIBridge(api_key="k", cache=MemoryResponseCache())
+
+        for _ in range(3):
+            self.assertEqual(bridge.handle("Triage", ["cause"], "sys", {"alert": "A1"}), {"cause": "disk"})
+        bridge.handle("Triage", ["cause"], "sys", {"alert": "A2"})
+
+        self.assertEqual(create.call_count, 2)
+        self.assertEqual((bridge.cache.hits, bridge.cache.misses), (2, 2))
+
+    @patch('zai.runtime.default_bridge.OpenAI')
+    def test_unparsable_response_not_cached(self, mock_openai):
+        create = mock_openai.return_value.chat.completions.create
+        create.return_value = MagicMock(choices=[MagicMock(message=MagicMock(content="not json"))])
+        bridge = DefaultAIBridge(api_key="k", cache=MemoryResponseCache())
+        with patch('builtins.print'):
+            bridge.handle("Triage", ["cause"], "sys", {})
+            bridge.handle("Triage", ["cause"], "sys", {})
+        # each call asks once more before giving up
+        self.assertEqual(create.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from zai.core.interpreter import Interpreter
+from zai.runtime.scheduler import Scheduler
+
+WORKER = '''
+agent Worker
+skill Main() {
+    [code, payload] = wait Manager
+    notify Manager "DONE" "worked on " + payload
+    success 0 "Worker done"
+}
+'''
+
+MANAGER = '''
+agent Manager
+use "worker.zai"
+context C { reply: "" }
+skill Main() {
+    start Worker
+    notify Worker "JOB" "soup"
+    [code, payload] = wait Worker
+    context.reply = payload
+    if code != "DONE" { fail 1 "Unexpected reply" }
+    success 0 "Manager done"
+}
+'''
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        for name, code in (("worker.zai", WORKER), ("manager.zai", MANAGER)):
+            with open(name, "w") as f:
+                f.write(code)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def _scheduler(self):
+        return Scheduler(ai_bridge=MagicMock(), exec_bridge=MagicMock(), wait_timeout=5, ast_cache=False)
+
+    def test_start_runs_agent_in_process(self):
+        scheduler = self._scheduler()
+        with patch("subprocess.Popen") as popen:
+            result = scheduler.run("manager.zai")
+
+        popen.assert_not_called()
+        self.assertEqual(result["status"], "success", result)
+        self.assertEqual(set(scheduler.results), {"Manager", "Worker"})
+        self.assertEqual(scheduler.results["Worker"]["message"], "Worker done")
+
+    def test_shared_trees_and_bridges(self):
+        scheduler = self._scheduler()
+        first = scheduler.create_interpreter("worker.zai")
+        second = scheduler.create_interpreter(os.path.join(self.tmp, "worker.zai"))
+        self.assertIs(first.tree, second.tree)
+        self.assertIs(first.ai_bridge, second.ai_bridge)
+        self.assertIs(first.scheduler, scheduler)
+
+    def test_unknown_agent(self):
+        with self.assertRaises(ValueError):
+            self._scheduler().run("manager.zai", agent_name="Nobody")
+
+    def test_start_without_scheduler_spawns_process(self):
+        interpreter = Interpreter(Scheduler(ast_cache=False).load_tree("manager.zai"),
+                                  ai_bridge=MagicMock(), exec_bridge=MagicMock(),
+                                  source_file=os.path.abspath("manager.zai"))
+        with patch("subprocess.Popen") as popen:
+            interpreter.load()
+            interpreter.op_start(MagicMock(target="Worker"), None)
+        popen.assert_called_once()
+        self.assertIn(os.path.abspath("worker.zai"), popen.call_args[0][0])
+
+    def test_spawned_process_inherits_runtime_flags(self):
+        interpreter = Interpreter(Scheduler(ast_cache=False).load_tree("manager.zai"),
+                                  ai_bridge=MagicMock(), exec_bridge=MagicMock(),
+                                  source_file=os.path.abspath("manager.zai"), ast_cache=False,
+                                  parallel_process=True, stream=True, parallel_exec=False)
+        with patch("subprocess.Popen") as popen:
+            interpreter.load()
+            interpreter.op_start(MagicMock(target="Worker"), None)
+        cmd = popen.call_args[0][0]
+        self.assertEqual(cmd[-3:], ["--no-cache", "--parallel-process", "--stream"])
+
+
+if __name__ == "__main__":
+    unittest.main()
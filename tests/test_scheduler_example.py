@@ -56,7 +56,7 @@ class TestSchedulerExample(unittest.TestCase):
             os.chdir(os.path.dirname(example_path))
             
             tree = self.parser.parse(code, start='agent')
-            interpreter = Interpreter(tree, ai_bridge=MockAIBridge(), exec_bridge=MockExecBridge())
+            interpreter = Interpreter(tree, ai_bridge=MockAIBridge(), exec_bridge=MockExecBridge(), ast_cache=False)
             interpreter.run()
             
         finally:
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from zai.builtin import tools
+from zai.runtime.shell_pool import ShellPool, WorkerDied
+
+
+class TestShellPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ShellPool(2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_output_and_status(self):
+        result = self.pool.run("echo out; echo err >&2; exit 3")
+        self.assertEqual(result, {"stdout": "out\n", "stderr": "err\n", "code": 3})
+
+    def test_quoting_and_multiline(self):
+        result = self.pool.run("printf '%s\\n' \"a 'b'\" $((1 + 2))\ncat <<EOF\nhere\nEOF")
+        self.assertEqual(result["stdout"], "a 'b'\n3\nhere\n")
+
+    def test_commands_are_isolated(self):
+        self.pool.run("cd /; export ZAI_POOL_LEAK=1; set -e; false")
+        result = self.pool.run("pwd; echo ${ZAI_POOL_LEAK:-clean}")
+        self.assertEqual(result["stdout"], f"{os.getcwd()}\nclean\n")
+
+    def test_per_command_cwd_and_env(self):
+        with tempfile.TemporaryDirectory() as cwd:
+            result = self.pool.run('pwd; echo "$GREETING"; echo ${HOME:-unset}',
+                                   cwd=cwd, env={"GREETING": "hi there", "PATH": os.environ["PATH"]})
+        self.assertEqual(result["stdout"], f"{os.path.realpath(cwd)}\nhi there\nunset\n")
+        with patch.dict(os.environ, {"ZAI_POOL_VAR": "x$y"}):
+            self.assertEqual(self.pool.run('echo "$ZAI_POOL_VAR"')["stdout"], "x$y\n")
+        self.assertEqual(self.pool.run('echo "${ZAI_POOL_VAR-gone}"')["stdout"], "gone\n")
+
+    def test_dead_worker_is_replaced(self):
+        self.assertIn("error", self.pool.run("kill -9 $$"))
+        self.assertEqual(self.pool.run("echo back")["stdout"], "back\n")
+
+    def test_interrupted_command_is_retried_on_a_fresh_worker(self):
+        first = self.pool._acquire()
+        self.pool._release(first)
+        with patch.object(first, "run", side_effect=WorkerDied("pipe closed")):
+            result = self.pool.run("echo again")
+        self.assertEqual(result["stdout"], "again\n")
+        self.assertNotIn(first, self.pool._workers)
+        self.assertTrue(first.proc.poll() is not None)
+
+    def test_reuses_workers(self):
+        pids = {self.pool.run("echo $$")["stdout"] for _ in range(5)}
+        self.assertEqual(len(pids), 1)
+
+    def test_concurrent_commands(self):
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(self.pool.run(f"echo {i}")))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(r["stdout"] for r in results), [f"{i}\n" for i in range(8)])
+        self.assertLessEqual(len(self.pool._workers), 2)
+
+    def test_bash_builtin_uses_pool(self):
+        worker = self.pool.run("echo $$")["stdout"]
+        with patch('zai.builtin.tools.pool_enabled', return_value=True), \
+                patch('zai.builtin.tools.get_pool', return_value=self.pool):
+            self.assertEqual(tools.bash("echo $$"), {"stdout": worker, "stderr": "", "code": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
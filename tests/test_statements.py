@@ -360,6 +360,52 @@ class TestWhileStatement(BaseTestCase):
         """)
         self.assertEqual(env.get_context("sum"), 6)  # 1+2+3
 
+    def test_break_inside_if(self):
+        """Break nested in an if leaves the loop immediately."""
+        res, env, _ = self.run_code("""
+        agent A
+        context C { seen: 0 }
+        skill Main() {
+            var i = 0
+            while true {
+                i = i + 1
+                if i == 3 { break }
+                context.seen = i
+            }
+            success 0 "OK"
+        }
+        """)
+        self.assertEqual(res["status"], "success")
+        self.assertEqual(env.get_context("seen"), 2)
+
+    def test_break_only_leaves_inner_loop(self):
+        """Break in a nested loop does not stop the outer loop."""
+        res, env, _ = self.run_code("""
+        agent A
+        context C { outer: 0 }
+        skill Main() {
+            var i = 0
+            while i < 3 {
+                i = i + 1
+                while true { break }
+                context.outer = i
+            }
+            success 0 "OK"
+        }
+        """)
+        self.assertEqual(env.get_context("outer"), 3)
+
+    def test_fail_inside_loop_ends_skill(self):
+        """Fail inside a loop body returns the failure."""
+        res, env, _ = self.run_code("""
+        agent A
+        skill Main() {
+            while true { if true { fail 7 "stop" } }
+            success 0 "OK"
+        }
+        """)
+        self.assertEqual((res["status"], res["code"], res["message"]), ("fail", 7, "stop"))
+
 
 class TestResponseStatement(BaseTestCase):
     """Test say/reply statements."""
@@ -491,6 +537,75 @@ class TestProcessStatement(BaseTestCase):
         self.assertEqual(env.get_context("style"), "formal")
 
 
+    PARALLEL = """
+        agent A
+        skill Main() {
+            process "Check logs" { extract: ["logs"], using: ["service"] }
+            process "Check metrics" { extract: ["metrics"], using: ["service"] }
+            success 0 "OK"
+        }
+        """
+
+    def test_parallel_process_uses_handle_many(self):
+        mock_ai = MagicMock()
+        mock_ai.handle_many.return_value = [{"logs": "clean"}, {"metrics": "high cpu"}]
+        tree = get_parser().parse(self.PARALLEL, start='agent')
+        interp = Interpreter(tree, ai_bridge=mock_ai, exec_bridge=MagicMock(), parallel_process=True)
+        interp.run()
+        requests = mock_ai.handle_many.call_args[0][0]
+        self.assertEqual([(r[0], r[1]) for r in requests], [("Check logs", ["logs"]), ("Check metrics", ["metrics"])])
+        mock_ai.handle.assert_not_called()
+        self.assertEqual(interp.env.get_context("logs"), "clean")
+        self.assertEqual(interp.env.get_context("metrics"), "high cpu")
+
+    def test_parallel_process_falls_back_when_persona_reads_a_key(self):
+        tree = get_parser().parse("""
+        agent A
+        persona Ops {
+            tone { if context.logs { "Cite the logs" } else { "Be brief" } }
+        }
+        skill Main() {
+            process "Check logs" { extract: ["logs"], using: ["service"] }
+            process "Check metrics" { extract: ["metrics"], using: ["service"] }
+            success 0 "OK"
+        }
+        """, start='agent')
+        mock_ai = self.mock_ai_bridge({"logs": "clean"})
+        interp = Interpreter(tree, ai_bridge=mock_ai, exec_bridge=MagicMock(), parallel_process=True)
+        interp.run()
+        mock_ai.handle_many.assert_not_called()
+        system_prompts = [call.args[2] for call in mock_ai.handle.call_args_list]
+        self.assertIn("Be brief", system_prompts[0])
+        self.assertIn("Cite the logs", system_prompts[1])
+
+    def test_sequential_process_by_default(self):
+        mock_ai = self.mock_ai_bridge({"logs": "clean"})
+        tree = get_parser().parse(self.PARALLEL, start='agent')
+        Interpreter(tree, ai_bridge=mock_ai, exec_bridge=MagicMock(), parallel_process=False).run()
+        self.assertEqual(mock_ai.handle.call_count, 2)
+        mock_ai.handle_many.assert_not_called()
+
+
+    def test_stream_sets_keys_as_they_complete(self):
+        tree = get_parser().parse(self.PARALLEL, start='agent')
+        mock_ai = MagicMock()
+        interp = Interpreter(tree, ai_bridge=mock_ai, exec_bridge=MagicMock(), parallel_process=False, stream=True)
+        seen = []
+
+        def handle_stream(prompt, keys, system, context, on_key):
+            on_key(keys[0], "partial")
+            seen.append(interp.env.get_context(keys[0]))
+            return {keys[0]: "final"}
+        mock_ai.handle_stream.side_effect = handle_stream
+
+        with patch('sys.stdout', new_callable=StringIO) as out:
+            interp.run()
+        self.assertEqual(seen, ["partial", "partial"])
+        self.assertEqual(interp.env.get_context("logs"), "final")
+        self.assertIn("logs: partial", out.getvalue())
+        mock_ai.handle.assert_not_called()
+
+
 class TestAskStatement(BaseTestCase):
     """Test ask statement (user input)."""
 
@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import MagicMock
+
+from zai.core.environment import Environment
+from zai.core.interpreter import Interpreter
+from zai.core.parser import get_parser
+from zai.core.template import compile_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_segments_and_slots(self):
+        tpl = compile_template("Hi {{ name }}, table {{table}}!")
+        self.assertEqual(tpl.static, ("Hi ", ", table ", "!"))
+        self.assertEqual(tpl.names, ("name", "table"))
+
+    def test_compiled_once_per_text(self):
+        self.assertIs(compile_template("Order {{dish}}"), compile_template("Order {{dish}}"))
+
+    def test_render(self):
+        tpl = compile_template("{{a}}-{{b}}")
+        self.assertEqual(tpl.render(lambda name, env: env[name], {"a": "x", "b": "y"}), "x-y")
+
+    def test_resolve_template_lookup_order(self):
+        tree = get_parser().parse('agent A skill Main() { success 0 "OK" }', start='agent')
+        interpreter = Interpreter(tree, ai_bridge=MagicMock(), exec_bridge=MagicMock())
+        interpreter.env.set_context("dish", "soup")
+        interpreter.env.set_context("n", "ctx")
+        env = Environment(parent=interpreter.env)
+        env.set_var("n", 2)
+
+        self.assertEqual(interpreter.resolve_template("{{dish}} x{{n}} {{missing}}", env), "soup x2 {missing}")
+        self.assertEqual(interpreter.resolve_template("no slots", env), "no slots")
+        self.assertEqual(interpreter.resolve_template(42, env), 42)
+
+    def test_template_render_args(self):
+        tree = get_parser().parse('''
+        agent A
+        context C { out: "" }
+        skill Main() {
+            var tpl = "Dear {{who}}"
+            var msg = tpl { who = "Chef" }
+            context.out = msg
+            success 0 "OK"
+        }
+        ''', start='agent')
+        interpreter = Interpreter(tree, ai_bridge=MagicMock(), exec_bridge=MagicMock())
+        interpreter.run()
+        self.assertEqual(interpreter.env.get_context("out"), "Dear Chef")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,401 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import json
+import multiprocessing
+import unittest
+import uuid
+from unittest.mock import MagicMock, patch
+
+from zai.core.async_interpreter import AsyncInterpreter
+from zai.core.interpreter import Interpreter
+from zai.core.parser import get_parser
+from zai.runtime.ring import ShmTransport
+from zai.runtime.transport import FileTransport, SocketTransport, open_transport, parse_filename
+
+RECEIVER = '''
+agent Receiver
+context C { got: "" }
+skill Main() {
+    [code, payload] = wait Sender
+    context.got = code + ":" + payload
+    notify Sender "ACK" payload
+    success 0 "Done"
+}
+'''
+
+SENDER = '''
+agent Sender
+context C { ack: "" }
+skill Main() {
+    notify Receiver "HELLO" "World"
+    [code, payload] = wait Receiver
+    context.ack = code
+    success 0 "Done"
+}
+'''
+
+
+def from_source(msg):
+    return msg.get("source") == "A"
+
+
+class TransportCases:
+    """Shared behaviour; subclasses provide make_transport()."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_roundtrip(self):
+        transport = self.make_transport()
+        transport.register("B")
+        # Callers check the inbox before sleeping on it
+        self.assertIsNone(transport.receive("B", from_source))
+        transport.send("B", {"source": "A", "type": "T", "payload": "p"})
+        self.assertTrue(transport.wait("B", 1))
+        self.assertEqual(transport.receive("B", from_source)["payload"], "p")
+        self.assertIsNone(transport.receive("B", from_source))
+        transport.close()
+
+    def test_unmatched_messages_stay_pending(self):
+        transport = self.make_transport()
+        transport.register("B")
+        transport.send("B", {"source": "C", "payload": "other"})
+        transport.send("B", {"source": "A", "payload": "mine"})
+        self.assertEqual(transport.receive("B", from_source)["payload"], "mine")
+        self.assertEqual(transport.receive("B", lambda msg: True)["payload"], "other")
+        transport.close()
+
+    def test_fifo_per_sender(self):
+        transport = self.make_transport()
+        transport.register("B")
+        for seq in range(1, 31):
+            transport.send("B", {"source": "A", "seq": seq, "response_seq": None, "payload": seq})
+            transport.send("B", {"source": "C", "seq": seq, "response_seq": None, "payload": -seq})
+        received = [transport.receive("B", from_source)["payload"] for _ in range(30)]
+        self.assertEqual(received, list(range(1, 31)))
+        transport.close()
+
+    def test_wait_timeout(self):
+        transport = self.make_transport()
+        transport.register("B")
+        transport.receive("B", from_source)
+        start = time.perf_counter()
+        self.assertFalse(transport.wait("B", 0.1))
+        self.assertGreaterEqual(time.perf_counter() - start, 0.09)
+        transport.close()
+
+    def _run_pair(self, interpreter_cls):
+        tree = lambda code: get_parser().parse(code, start='agent')
+        agents = [interpreter_cls(tree(code), ai_bridge=MagicMock(), exec_bridge=MagicMock(),
+                                  wait_timeout=5, transport=self.make_transport())
+                  for code in (RECEIVER, SENDER)]
+        if interpreter_cls is AsyncInterpreter:
+            async def main():
+                return await asyncio.gather(*(agent.run() for agent in agents))
+            results = asyncio.run(main())
+        else:
+            results = [None, None]
+            threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, agents[i].run()))
+                       for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        for agent in agents:
+            agent.transport.close()
+        return agents, results
+
+    def test_interpreters_exchange_messages(self):
+        for interpreter_cls in (Interpreter, AsyncInterpreter):
+            (receiver, sender), results = self._run_pair(interpreter_cls)
+            self.assertEqual([r["status"] for r in results], ["success", "success"])
+            self.assertEqual(receiver.env.get_context("got"), "HELLO:World")
+            self.assertEqual(sender.env.get_context("ack"), "ACK")
+
+
+class TestFileTransport(TransportCases, unittest.TestCase):
+    def make_transport(self):
+        return FileTransport(self.root)
+
+    def test_message_files(self):
+        transport = self.make_transport()
+        transport.send("B", {"source": "A"})
+        files = os.listdir(os.path.join(self.root, "B"))
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].endswith(".json"))
+
+
+    def test_filename_carries_header(self):
+        transport = self.make_transport()
+        transport.send("B", {"source": "A", "seq": 7, "response_seq": 3})
+        transport.send("B", {"source": "A", "seq": 8, "response_seq": None})
+        headers = sorted((parse_filename(f) for f in os.listdir(os.path.join(self.root, "B"))),
+                         key=lambda h: h["seq"])
+        self.assertEqual(headers, [{"source": "A", "seq": 7, "response_seq": 3},
+                                   {"source": "A", "seq": 8, "response_seq": None}])
+        self.assertIsNone(parse_filename(f"{uuid.uuid4()}.json"))
+
+    def test_only_the_chosen_message_is_opened(self):
+        transport = self.make_transport()
+        for seq in range(1, 51):
+            transport.send("B", {"source": "C", "seq": seq, "response_seq": None})
+        transport.send("B", {"source": "A", "seq": 1, "response_seq": None, "payload": "mine"})
+        with patch("zai.runtime.transport.json.load", wraps=json.load) as load:
+            self.assertEqual(transport.receive("B", from_source)["payload"], "mine")
+        self.assertEqual(load.call_count, 1)
+
+    def test_draining_lists_the_inbox_once(self):
+        transport = FileTransport(self.root, watch_mode="inotify")
+        transport.register("B")
+        for seq in range(1, 2001):
+            transport.send("B", {"source": "A", "seq": seq, "response_seq": None})
+        received = []
+        with patch("zai.runtime.transport.os.listdir", wraps=os.listdir) as listdir:
+            while (msg := transport.receive("B", from_source)) is not None:
+                received.append(msg["seq"])
+        self.assertEqual(received, list(range(1, 2001)))
+        # One listing for the backlog, one more to find it empty
+        self.assertLessEqual(listdir.call_count, 2)
+        transport.send("B", {"source": "A", "seq": 2001, "response_seq": None})
+        self.assertTrue(transport.wait("B", 1))
+        self.assertEqual(transport.receive("B", from_source)["seq"], 2001)
+        transport.close()
+
+    def test_legacy_message_files(self):
+        inbox = FileTransport(self.root).inbox("B")
+        with open(os.path.join(inbox, f"{uuid.uuid4()}.json"), "w") as f:
+            json.dump({"source": "A", "payload": "old"}, f)
+        self.assertEqual(self.make_transport().receive("B", from_source)["payload"], "old")
+
+
+    def test_write_then_rename(self):
+        transport = self.make_transport()
+        with patch("zai.runtime.transport.os.replace", wraps=os.replace) as replace:
+            transport.send("B", {"source": "A", "seq": 1, "response_seq": None})
+        tmp, final = replace.call_args[0]
+        self.assertTrue(os.path.basename(tmp).startswith("."))
+        self.assertEqual(os.listdir(os.path.join(self.root, "B")), [os.path.basename(final)])
+
+    def test_envelope(self):
+        transport = self.make_transport()
+        transport.send("B", {"source": "A", "seq": 1, "response_seq": None, "payload": 1})
+        transport.send_many("B", [{"source": "A", "seq": seq, "response_seq": None, "payload": seq}
+                                  for seq in range(2, 6)])
+        transport.send("B", {"source": "A", "seq": 6, "response_seq": None, "payload": 6})
+        self.assertEqual(len(os.listdir(os.path.join(self.root, "B"))), 3)
+
+        received = [transport.receive("B", from_source)["payload"] for _ in range(6)]
+        self.assertEqual(received, [1, 2, 3, 4, 5, 6])
+        self.assertIsNone(transport.receive("B", from_source))
+        self.assertEqual(os.listdir(os.path.join(self.root, "B")), [])
+
+    def test_envelope_survives_a_receiver_crash(self):
+        transport = self.make_transport()
+        transport.send_many("B", [{"source": "A", "seq": seq, "response_seq": None, "payload": seq}
+                                  for seq in range(1, 5)])
+        self.assertEqual(transport.receive("B", from_source)["payload"], 1)
+        self.assertEqual(transport.receive("B", from_source)["payload"], 2)
+
+        # A new receiver finds only what the first one did not take
+        restarted = self.make_transport()
+        received = [restarted.receive("B", from_source)["payload"] for _ in range(2)]
+        self.assertEqual(received, [3, 4])
+        self.assertIsNone(restarted.receive("B", from_source))
+        self.assertEqual(os.listdir(os.path.join(self.root, "B")), [])
+
+    def test_broken_message_goes_to_dead_letter(self):
+        transport = self.make_transport()
+        inbox = transport.inbox("B")
+        with open(os.path.join(inbox, "A.1.-.x.json"), "w") as f:
+            f.write("{broken")
+        with patch("zai.runtime.transport.json.load", wraps=json.load) as load:
+            self.assertIsNone(transport.receive("B", from_source))
+            self.assertIsNone(transport.receive("B", from_source))
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(os.listdir(os.path.join(inbox, "dead-letter")), ["A.1.-.x.json"])
+
+    def test_broken_legacy_file_gets_grace_period(self):
+        transport = self.make_transport()
+        inbox = transport.inbox("B")
+        path = os.path.join(inbox, f"{uuid.uuid4()}.json")
+        with open(path, "w") as f:
+            f.write('{"source": "A", "payl')
+        self.assertIsNone(transport.receive("B", from_source))
+        self.assertTrue(os.path.exists(path))
+
+        old = time.time() - FileTransport.LEGACY_GRACE - 1
+        os.utime(path, (old, old))
+        self.assertIsNone(transport.receive("B", from_source))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(len(os.listdir(os.path.join(inbox, "dead-letter"))), 1)
+
+
+class TestSocketTransport(TransportCases, unittest.TestCase):
+    def make_transport(self):
+        return SocketTransport(self.root, send_timeout=2)
+
+    def test_send_waits_for_receiver(self):
+        receiver = self.make_transport()
+        timer = threading.Timer(0.2, receiver.register, args=("B",))
+        timer.start()
+        sender = self.make_transport()
+        sender.send("B", {"source": "A", "payload": "late"})
+        timer.join()
+        self.assertEqual(receiver.receive("B", from_source)["payload"], "late")
+        sender.close()
+        receiver.close()
+
+    def test_burst_blocks_sender_until_drained(self):
+        receiver = self.make_transport()
+        receiver.register("B")
+        transport = self.make_transport()
+        sender = threading.Thread(target=lambda: [
+            transport.send("B", {"source": "A", "seq": seq, "response_seq": None})
+            for seq in range(1, 1001)])
+        sender.start()
+        received = []
+        while len(received) < 1000:
+            msg = receiver.receive("B", from_source)
+            if msg is None:
+                receiver.wait("B", 1)
+            else:
+                received.append(msg["seq"])
+        sender.join()
+        self.assertEqual(received, list(range(1, 1001)))
+        transport.close()
+        receiver.close()
+
+    def test_send_to_missing_agent(self):
+        transport = SocketTransport(self.root, send_timeout=0.1)
+        with self.assertRaises(ConnectionError):
+            transport.send("Nobody", {"source": "A"})
+
+    def test_large_message_is_split(self):
+        receiver = self.make_transport()
+        receiver.register("B")
+        transport = self.make_transport()
+        payload = "x" * (1 << 20)
+        self.assertEqual(len(transport.packets({"payload": payload})), 17)
+        sender = threading.Thread(target=lambda: [
+            transport.send("B", {"source": "A", "payload": payload}),
+            asyncio.run(transport.send_async("B", {"source": "A", "payload": "after"}))])
+        sender.start()
+        received = []
+        while len(received) < 2:
+            msg = receiver.receive("B", from_source)
+            if msg is None:
+                receiver.wait("B", 1)
+            else:
+                received.append(msg["payload"])
+        sender.join()
+        self.assertEqual(received, [payload, "after"])
+        transport.close()
+        receiver.close()
+
+    def test_full_buffer_is_undeliverable(self):
+        receiver = self.make_transport()
+        receiver.register("B")
+        transport = SocketTransport(self.root, send_timeout=0.2)
+        with self.assertRaises(ConnectionError):
+            transport.send("B", {"source": "A", "payload": "x" * (4 << 20)})
+        # The unfinished message was dropped with its connection
+        transport.send_timeout = 2
+        transport.send("B", {"source": "A", "payload": "next"})
+        self.assertEqual(receiver.receive("B", from_source)["payload"], "next")
+        transport.close()
+        receiver.close()
+
+    def test_close_removes_socket(self):
+        transport = self.make_transport()
+        transport.register("B")
+        self.assertTrue(os.path.exists(transport.address("B")))
+        transport.close()
+        self.assertFalse(os.path.exists(transport.address("B")))
+
+
+class TestShmTransport(TransportCases, unittest.TestCase):
+    def make_transport(self):
+        return ShmTransport(self.root, capacity=64 * 1024, send_timeout=2)
+
+    def test_header_and_payload_roundtrip(self):
+        transport = self.make_transport()
+        transport.register("B")
+        sent = {"source": "A", "type": 404, "payload": "résumé " * 10, "timestamp": 12.5,
+                "seq": 3, "response_seq": None}
+        transport.send("B", sent)
+        self.assertEqual(transport.receive("B", from_source), sent)
+        transport.close()
+
+    def test_wraps_around(self):
+        transport = ShmTransport(self.root, capacity=4096, send_timeout=2)
+        transport.register("B")
+        for seq in range(1, 301):
+            transport.send("B", {"source": "A", "seq": seq, "response_seq": None, "payload": "x" * (seq % 97)})
+            self.assertEqual(transport.receive("B", from_source)["seq"], seq)
+        transport.close()
+
+    def test_full_ring_times_out(self):
+        transport = ShmTransport(self.root, capacity=4096, send_timeout=0.1)
+        transport.register("B")
+        with self.assertRaises(ConnectionError):
+            for seq in range(1, 1000):
+                transport.send("B", {"source": "A", "seq": seq, "response_seq": None, "payload": "x" * 100})
+        transport.close()
+
+    def test_burst_between_processes(self):
+        receiver = self.make_transport()
+        receiver.register("B")
+        sender = multiprocessing.get_context("fork").Process(target=_send_burst, args=(self.root, 2000))
+        sender.start()
+        received = []
+        while len(received) < 2000:
+            msg = receiver.receive("B", from_source)
+            if msg is None:
+                receiver.wait("B", 5)
+            else:
+                received.append(msg["seq"])
+        sender.join(5)
+        self.assertEqual(sender.exitcode, 0)
+        self.assertEqual(received, list(range(1, 2001)))
+        receiver.close()
+
+    def test_receiver_restart(self):
+        first = self.make_transport()
+        first.register("B")
+        sender = self.make_transport()
+        sender.send("B", {"source": "A", "seq": 1, "response_seq": None})
+        first.close()
+
+        second = self.make_transport()
+        second.register("B")
+        sender.send("B", {"source": "A", "seq": 2, "response_seq": None})
+        self.assertEqual(second.receive("B", from_source)["seq"], 2)
+        sender.close()
+        second.close()
+
+
+def _send_burst(root, count):
+    transport = ShmTransport(root, capacity=64 * 1024, send_timeout=5)
+    for seq in range(1, count + 1):
+        transport.send("B", {"source": "A", "seq": seq, "response_seq": None, "payload": "order"})
+    transport.close()
+
+
+class TestOpenTransport(unittest.TestCase):
+    def test_kinds(self):
+        self.assertIsInstance(open_transport("file"), FileTransport)
+        self.assertIsInstance(open_transport("socket"), SocketTransport)
+        self.assertIsInstance(open_transport("shm"), ShmTransport)
+        with self.assertRaises(ValueError):
+            open_transport("carrier-pigeon")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,10 @@
 import os
-import subprocess
 import shutil
 import fnmatch
 import re
-import requests
+from ..runtime.command import run_command
+from ..runtime.http import get_client
+from ..runtime.shell_pool import get_pool, pool_enabled
 
 def ls(path="."):
     """List directory contents."""
@@ -120,15 +121,17 @@ def edit(path, old_text, new_text):
     except Exception as e:
         return {"error": str(e)}
 
-def bash(command):
-    """Execute a shell command."""
+def bash(command, on_line=None):
+    """Execute a shell command.
+
+    Bounded by ZAI_EXEC_TIMEOUT and ZAI_EXEC_MAX_OUTPUT; on_line(stream, line)
+    sees the output line by line.
+    """
+    if pool_enabled():
+        # A long-lived worker shell instead of a new /bin/sh per command
+        return get_pool().run(command, on_line=on_line)
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
-        return {
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "code": result.returncode
-        }
+        return run_command(command, on_line=on_line)
     except Exception as e:
         return {"error": str(e)}
 
@@ -150,7 +153,8 @@ def python(code):
 def fetch(url, method="GET", json=None, headers=None):
     """Perform an HTTP request."""
     try:
-        response = requests.request(method, url, json=json, headers=headers)
+        # Pooled keep-alive connections shared with the AI bridge
+        response = get_client().request(method, url, json=json, headers=headers)
         return {
             "status": response.status_code,
             "body": response.text,
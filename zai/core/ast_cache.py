@@ -0,0 +1,123 @@
+"""
+On-disk cache of parsed .zai/.zaih trees.
+
+Trees are pickled into a __zaicache__ directory next to the source file, one
+entry per (file, start rule). An entry is reused while the source's mtime and
+size are unchanged; otherwise the content hash decides, so touching a file
+without editing it does not force a re-parse.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+import lark
+
+from .parser import GRAMMAR, LALR_GRAMMAR, get_parser
+from ..config import get_bool
+
+CACHE_DIRNAME = "__zaicache__"
+FORMAT_VERSION = 1
+
+_GRAMMAR_KEY = hashlib.sha256(
+    f"{FORMAT_VERSION}\0{lark.__version__}\0{GRAMMAR}\0{LALR_GRAMMAR}".encode("utf-8")
+).hexdigest()[:16]
+
+
+def cache_enabled():
+    """Whether the AST cache is on (ZAI_AST_CACHE, default true)."""
+    return get_bool("ZAI_AST_CACHE", True)
+
+
+def cache_path(path, start):
+    """Cache entry path for source file path parsed from rule start."""
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIRNAME, f"{name}.{start}.{_GRAMMAR_KEY}.pickle")
+
+
+def _source_hash(code):
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def load(path, start, st):
+    """Return the cached tree for path, or None if missing or stale.
+
+    st is the os.stat() result of the source; the file is only read and
+    hashed when its mtime/size no longer match the cache entry, and the
+    entry is then rewritten with st if the content is unchanged.
+    """
+    try:
+        with open(cache_path(path, start), "rb") as f:
+            header, tree = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, TypeError):
+        return None
+
+    if header.get("mtime_ns") == st.st_mtime_ns and header.get("size") == st.st_size:
+        return tree
+    try:
+        with open(path, "r") as f:
+            code = f.read()
+    except OSError:
+        return None
+    if header.get("source_hash") == _source_hash(code):
+        # Touched but not edited: record the new mtime so the next load
+        # takes the stat-only path again
+        store(path, start, st, code, tree)
+        return tree
+    return None
+
+
+def store(path, start, st, code, tree):
+    """Write tree to the cache; failures (read-only dirs etc.) are ignored.
+
+    st must be taken before code was read, so a concurrent edit leaves an
+    entry whose mtime no longer matches instead of a stale hit.
+    """
+    entry = cache_path(path, start)
+    header = {
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "source_hash": _source_hash(code),
+    }
+    try:
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(entry), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((header, tree), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, entry)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        pass
+
+
+def parse_file(path, start="start", use_cache=None):
+    """Parse the zai source file at path, consulting the AST cache first.
+
+    Args:
+        path: Source file path.
+        start: Grammar start rule ('start' for .zai, 'config_file' for .zaih).
+        use_cache: Override ZAI_AST_CACHE; False always parses.
+
+    Returns:
+        The parse tree.
+    """
+    if use_cache is None:
+        use_cache = cache_enabled()
+
+    st = os.stat(path)
+    if use_cache:
+        tree = load(path, start, st)
+        if tree is not None:
+            return tree
+
+    with open(path, "r") as f:
+        code = f.read()
+    tree = get_parser().parse(code, start=start)
+
+    if use_cache:
+        store(path, start, st, code, tree)
+    return tree
@@ -0,0 +1,182 @@
+"""
+asyncio execution engine.
+
+AsyncInterpreter runs the same compiled skills as Interpreter, but the
+statements that block (process, exec, notify, wait, ask) await instead, so one event
+loop can drive many agent sessions at once:
+
+    await asyncio.gather(*(AsyncInterpreter(tree, ...).run() for _ in range(100)))
+
+Only the handlers that can suspend (and the blocks that contain them) are
+coroutines; everything else reuses the synchronous op_* handlers.
+"""
+
+import asyncio
+import inspect
+import time
+
+from . import ir
+from .environment import Frame
+from .interpreter import Interpreter
+from .signals import BREAK, SUCCESS, Result
+
+from ..runtime.default_bridge import DefaultAsyncAIBridge, DefaultAsyncExecBridge
+
+
+class AsyncInterpreter(Interpreter):
+    def __init__(self, tree, ai_bridge=None, exec_bridge=None, **kwargs):
+        super().__init__(
+            tree,
+            ai_bridge=ai_bridge or DefaultAsyncAIBridge(),
+            exec_bridge=exec_bridge or DefaultAsyncExecBridge(),
+            **kwargs,
+        )
+        # Synchronous bridges are still accepted; they run in a worker thread
+        self._ai_handle = _as_coroutine(self.ai_bridge.handle)
+        self._exec_handle = _as_coroutine(self.exec_bridge.handle)
+
+        # Statement class -> coroutine handler, for the statements that await
+        self._async_statements = {
+            ir.Block: self.aop_block,
+            ir.If: self.aop_if,
+            ir.While: self.aop_while,
+            ir.Ask: self.aop_ask,
+            ir.Process: self.aop_process,
+            ir.ProcessGroup: self.aop_process_group,
+            ir.Exec: self.aop_exec,
+            ir.ExecGroup: self.aop_exec_group,
+            ir.Notify: self.aop_notify,
+            ir.Wait: self.aop_wait,
+            ir.Invoke: self.aop_invoke,
+        }
+
+    async def run(self, agent_name=None, entry_skill="Main", entry_args=None):
+        if not self.load(agent_name):
+            return {}
+        return await self.execute_skill(entry_skill, entry_args or {})
+
+    async def execute_skill(self, name, args):
+        return (await self.call_skill(name, args)).as_dict()
+
+    async def call_skill(self, name, args):
+        """Run skill name and return its Result."""
+        if name not in self.skills:
+            return Result("fail", 404, f"Skill '{name}' not found")
+
+        skill = self.skills[name]
+        local_env = Frame(skill.layout, parent=self.env)
+        for k, v in args.items():
+            self.env.set_context(k, v)
+
+        result = await self.aop_block(skill.body, local_env)
+        # A stray break outside any loop just ends the skill
+        if result is None or result is BREAK:
+            return SUCCESS
+        return result
+
+    async def aop_block(self, node, env):
+        statements = self._statements
+        coroutines = self._async_statements
+        for stmt in node.stmts:
+            handler = coroutines.get(stmt.__class__)
+            if handler is not None:
+                result = await handler(stmt, env)
+            else:
+                result = statements[stmt.__class__](stmt, env)
+            if result is not None:
+                return result
+        return None
+
+    async def aop_if(self, node, env):
+        if self.eval_expr(node.cond, env):
+            return await self.aop_block(node.then, env)
+        elif node.orelse is not None:
+            return await self.aop_block(node.orelse, env)
+
+    async def aop_while(self, node, env):
+        cond = node.cond.evaluate
+        while cond(self, env):
+            result = await self.aop_block(node.body, env)
+            if result is not None:
+                if result is BREAK:
+                    return None
+                return result
+            # A body with nothing to await must not starve the other sessions
+            await asyncio.sleep(0)
+
+    async def aop_ask(self, node, env):
+        await asyncio.to_thread(self.op_ask, node, env)
+
+    async def aop_process(self, node, env):
+        request = self.process_request(node, env)
+        if self.stream:
+            res = await _as_coroutine(self.ai_bridge.handle_stream)(*request, self.on_process_key)
+        else:
+            res = await self._ai_handle(*request)
+        for k, v in res.items(): self.env.set_context(k, v)
+
+    async def aop_process_group(self, node, env):
+        if not self.parallel_process:
+            for stmt in node.processes:
+                await self.aop_process(stmt, env)
+            return
+        requests = self.process_requests(node, env)
+        if requests is None:
+            for stmt in node.processes:
+                await self.aop_process(stmt, env)
+            return
+        handle_many = _as_coroutine(self.ai_bridge.handle_many)
+        self.apply_process_results(await handle_many(requests))
+
+    async def aop_exec(self, node, env):
+        cmd = self.eval_expr(node.cmd, env)
+        if self.stream:
+            res = await _as_coroutine(self.exec_bridge.handle_stream)(cmd, list(node.keys), self.on_exec_line)
+        else:
+            res = await self._exec_handle(cmd, list(node.keys))
+        for k, v in res.items(): self.env.set_context(k, v)
+
+    async def aop_exec_group(self, node, env):
+        if not self.parallel_exec:
+            for stmt in node.execs:
+                await self.aop_exec(stmt, env)
+            return
+        handle_many = _as_coroutine(self.exec_bridge.handle_many)
+        self.apply_process_results(await handle_many(self.exec_requests(node, env)))
+
+    async def aop_notify(self, node, env):
+        message = self.build_message(node, env)
+        await self.transport.send_async(node.target, message)
+        print(f"[{self.agent_name}] Notified {node.target}: {message['type']}", flush=True)
+
+    async def aop_wait(self, node, env):
+        target_source = node.source
+        self.begin_wait(target_source)
+
+        deadline = time.time() + self.wait_timeout
+        while True:
+            found_msg = self.receive(target_source)
+            if found_msg is not None:
+                self.accept_message(found_msg, node, env)
+                return
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            await self.transport.wait_async(self.agent_name, remaining)
+
+        self.wait_timed_out(node, env)
+
+    async def aop_invoke(self, node, env):
+        call_args = {name: self.eval_expr(expr, env) for name, expr in node.args}
+        res = await self.call_skill(node.name, call_args)
+        # Only a failing sub-skill ends the caller
+        return res if res.failed else None
+
+
+def _as_coroutine(handle):
+    if inspect.iscoroutinefunction(handle):
+        return handle
+
+    async def run_in_thread(*args):
+        return await asyncio.to_thread(handle, *args)
+    return run_in_thread
@@ -0,0 +1,427 @@
+"""
+Lowers Lark parse trees into zai.core.ir nodes.
+
+Everything that only depends on the source text is decided here, once:
+string literals are unquoted, numbers converted, operators bound to
+functions and optional grammar parts dropped. The Interpreter then runs the
+resulting nodes without looking at rule names or token types again.
+
+Skills are compiled in three passes:
+  1. lower: Lark tree -> ir nodes.
+  2. resolve: every local variable name of the skill gets a fixed slot in
+     its Frame; Name, VarDecl, SetVar and Wait nodes record their slot.
+  3. bind: every expression node gets an `evaluate(interp, env)` closure
+     built bottom-up from its children's closures, so evaluating an
+     expression is a chain of direct Python calls with no dispatch on node
+     kind and, for slotted names, no dictionary or parent-chain walk.
+"""
+
+from lark import Token, Tree
+
+from . import ir
+from .environment import MISSING
+
+
+def _add(l, r): return (l + r) if isinstance(l, (int, float)) else (str(l) + str(r))
+def _sub(l, r): return float(l) - float(r)
+def _mul(l, r): return float(l) * float(r)
+def _div(l, r): return float(l) / float(r)
+def _eq(l, r): return str(l) == str(r)
+def _ne(l, r): return str(l) != str(r)
+def _gt(l, r): return float(l) > float(r)
+def _lt(l, r): return float(l) < float(r)
+def _ge(l, r): return float(l) >= float(r)
+def _le(l, r): return float(l) <= float(r)
+def _and(l, r): return bool(l) and bool(r)
+def _or(l, r): return bool(l) or bool(r)
+
+
+OPERATORS = {
+    '+': _add, '-': _sub, '*': _mul, '/': _div,
+    '==': _eq, '!=': _ne, '>': _gt, '<': _lt, '>=': _ge, '<=': _le,
+    '&&': _and, '||': _or,
+}
+
+
+class CompileError(Exception):
+    pass
+
+
+def _literal(token):
+    if token.type == 'ESCAPED_STRING': return token.value[1:-1]
+    if token.type == 'MULTILINE_STRING': return token.value[3:-3]
+    if token.type == 'SIGNED_NUMBER': return float(token.value)
+    return token
+
+
+def compile_expression(node):
+    """Lower an expression tree (or token) to a bound ir expression node.
+
+    Names are looked up dynamically (persona items, declarations); skill
+    bodies go through compile_skill, which resolves them to slots.
+    """
+    expr = _lower_expression(node)
+    _bind_all(expr)
+    return expr
+
+
+def _lower_expression(node):
+    if node is None:
+        return ir.Const(None)
+    if isinstance(node, Token):
+        if node.type == 'IDENTIFIER':
+            # Boolean literals may be parsed as identifiers
+            if node.value == 'true': return ir.Const(True)
+            if node.value == 'false': return ir.Const(False)
+            return ir.Name(node.value)
+        return ir.Const(_literal(node))
+    if not isinstance(node, Tree):
+        return ir.Const(node)
+
+    data = node.data
+    if data == 'true': return ir.Const(True)
+    if data == 'false': return ir.Const(False)
+    if data in ('string', 'number', 'simple_expression', 'expression', 'boolean'):
+        return _lower_expression(node.children[0])
+    if data == 'context_var':
+        return ir.ContextRef(node.children[1].value)
+    if data == 'persona_ref':
+        return ir.PersonaRef(node.children[0].value, node.children[1].value)
+    if data == 'template_render':
+        args = _compile_args(node.children[1]) if len(node.children) > 1 else ()
+        return ir.TemplateRender(node.children[0].value, args)
+    if data == 'binary_op':
+        left, op, right = node.children
+        return ir.BinOp(op.value, OPERATORS[op.value],
+                        _lower_expression(left), _lower_expression(right))
+    if data == 'persona_block':
+        return ir.PersonaBlock(tuple(_lower_expression(f) for f in node.children))
+    if data == 'persona_if':
+        then = _lower_expression(node.children[1])
+        orelse = node.children[2] if len(node.children) > 2 else None
+        return ir.PersonaIf(_lower_expression(node.children[0]), then,
+                            _lower_expression(orelse) if orelse is not None else None)
+    return ir.Const(None)
+
+
+# --- Expression closures ---------------------------------------------------
+
+def _const_closure(expr):
+    value = expr.value
+    def const(interp, env):
+        return value
+    return const
+
+
+def _name_closure(expr):
+    name, slot = expr.name, expr.slot
+    if slot is None:
+        def name_(interp, env):
+            value = env.lookup(name)
+            if value is MISSING: return interp.env.get_context(name)
+            return value
+        return name_
+
+    def slot_name(interp, env):
+        value = env.values[slot]
+        if value is MISSING: return interp.env.get_context(name)
+        return value
+    return slot_name
+
+
+def _context_ref_closure(expr):
+    key = expr.key
+    def context_ref(interp, env):
+        return interp.env.get_context(key)
+    return context_ref
+
+
+def _apply(fn, l, r):
+    if l is None: l = 0
+    if r is None: r = 0
+    try:
+        return fn(l, r)
+    except Exception:
+        return False
+
+
+def _binop_closure(expr):
+    left, right = expr.left.evaluate, expr.right.evaluate
+    op, fn = expr.op, expr.fn
+
+    # Short-circuit: the right operand is only evaluated when it decides the result
+    if op == '&&':
+        def and_(interp, env):
+            return bool(left(interp, env)) and bool(right(interp, env))
+        return and_
+    if op == '||':
+        def or_(interp, env):
+            return bool(left(interp, env)) or bool(right(interp, env))
+        return or_
+
+    if isinstance(expr.left, ir.Const) and isinstance(expr.right, ir.Const):
+        return _const_closure(ir.Const(_apply(fn, expr.left.value, expr.right.value)))
+
+    if isinstance(expr.right, ir.Const):
+        r = expr.right.value
+        if r is None: r = 0
+        def binop_const(interp, env):
+            l = left(interp, env)
+            if l is None: l = 0
+            try:
+                return fn(l, r)
+            except Exception:
+                return False
+        return binop_const
+
+    def binop(interp, env):
+        l = left(interp, env)
+        r = right(interp, env)
+        if l is None: l = 0
+        if r is None: r = 0
+        try:
+            return fn(l, r)
+        except Exception:
+            return False
+    return binop
+
+
+def _persona_ref_closure(expr):
+    persona, key = expr.persona, expr.key
+    def persona_ref(interp, env):
+        return interp.evaluate_persona(persona, key, env)
+    return persona_ref
+
+
+def _template_render_closure(expr):
+    name = expr.name
+    args = tuple((arg, value.evaluate) for arg, value in expr.args)
+    def template_render(interp, env):
+        tpl_str = env.get_var(name)
+        temp_ctx = interp.env.context.copy()
+        for arg, value in args:
+            temp_ctx[arg] = value(interp, env)
+        return interp.resolve_template(tpl_str, temp_ctx)
+    return template_render
+
+
+def _persona_block_closure(expr):
+    fragments = tuple(fragment.evaluate for fragment in expr.fragments)
+    def persona_block(interp, env):
+        parts = []
+        for fragment in fragments:
+            val = fragment(interp, env)
+            if val: parts.append(str(val))
+        return " ".join(parts)
+    return persona_block
+
+
+def _persona_if_closure(expr):
+    cond, then = expr.cond.evaluate, expr.then.evaluate
+    orelse = expr.orelse.evaluate if expr.orelse is not None else None
+    def persona_if(interp, env):
+        if cond(interp, env):
+            return then(interp, env)
+        elif orelse is not None:
+            return orelse(interp, env)
+        return ""
+    return persona_if
+
+
+_CLOSURES = {
+    ir.Const: _const_closure,
+    ir.Name: _name_closure,
+    ir.ContextRef: _context_ref_closure,
+    ir.BinOp: _binop_closure,
+    ir.PersonaRef: _persona_ref_closure,
+    ir.TemplateRender: _template_render_closure,
+    ir.PersonaBlock: _persona_block_closure,
+    ir.PersonaIf: _persona_if_closure,
+}
+
+
+def _walk(value):
+    """Yield every ir node reachable from value, children before parents."""
+    if isinstance(value, ir.Node):
+        for field in value.__slots__:
+            yield from _walk(getattr(value, field))
+        yield value
+    elif isinstance(value, tuple):
+        for item in value:
+            yield from _walk(item)
+
+
+def _bind_all(root):
+    for node in _walk(root):
+        closure = _CLOSURES.get(node.__class__)
+        if closure is not None:
+            node.evaluate = closure(node)
+
+
+class Scope:
+    """Slot layout of one skill: local variable name -> index in its Frame."""
+
+    def __init__(self):
+        self.layout = {}
+
+    def slot(self, name):
+        return self.layout.setdefault(name, len(self.layout))
+
+
+def _resolve(root, scope):
+    for node in _walk(root):
+        cls = node.__class__
+        if cls is ir.Name or cls is ir.VarDecl or cls is ir.SetVar:
+            node.slot = scope.slot(node.name)
+        elif cls is ir.Wait:
+            node.code_slot = scope.slot(node.code_var)
+            node.msg_slot = scope.slot(node.msg_var)
+
+
+def _target_name(target):
+    if isinstance(target, Tree) and target.data == 'context_var':
+        return target.children[1].value
+    return target.value
+
+
+def _compile_args(args_node):
+    if args_node is None:
+        return ()
+    return tuple((_target_name(assign.children[0]), _lower_expression(assign.children[1]))
+                 for assign in args_node.children)
+
+
+def _string_keys(children):
+    return tuple(_lower_expression(tok).value for tok in children if tok is not None)
+
+
+def _lower_block(node):
+    return ir.Block(_group_processes([_lower_statement(stmt) for stmt in node.children
+                                      if isinstance(stmt, Tree)]))
+
+
+def _reads(expr):
+    """Context keys and names an expression refers to directly, or None when
+    it may read any key (persona items and templates look the context up
+    at run time)."""
+    names = set()
+    for node in _walk(expr):
+        cls = node.__class__
+        if cls is ir.ContextRef:
+            names.add(node.key)
+        elif cls is ir.Name:
+            names.add(node.name)
+        elif cls is ir.PersonaRef or cls is ir.TemplateRender:
+            return None
+    return names
+
+
+def _process_reads(stmt):
+    # The prompt, and the context keys it declares with `using`; without
+    # `using` the call may be sent the whole context
+    if stmt.inputs is None:
+        return None
+    reads = _reads(stmt.prompt)
+    return None if reads is None else reads | set(stmt.inputs)
+
+
+def _group_processes(stmts):
+    """Fold runs of process statements whose prompts and `using` inputs do
+    not read a key extracted earlier in the run into one ProcessGroup. A
+    statement without `using` is sent the whole context, so it can only
+    start a run. The system prompt is checked at run time (process_requests)."""
+    return _group_independent(stmts, ir.Process, ir.ProcessGroup, _process_reads)
+
+
+def _group_independent(stmts, kind, group, reads):
+    """Fold runs of kind statements into group nodes; a statement starts a
+    new run when reads(stmt) has a key in the keys of an earlier one
+    (reads() returns None for "any key")."""
+    grouped = []
+    run, written = [], set()
+
+    def flush():
+        if len(run) > 1:
+            grouped.append(group(tuple(run)))
+        else:
+            grouped.extend(run)
+        run.clear()
+        written.clear()
+
+    for stmt in stmts:
+        if stmt.__class__ is not kind:
+            flush()
+            grouped.append(stmt)
+            continue
+        needs = reads(stmt)
+        if written and (needs is None or not needs.isdisjoint(written)):
+            flush()
+        run.append(stmt)
+        written.update(stmt.keys)
+    flush()
+    return tuple(grouped)
+
+
+def _lower_statement(node):
+    data = node.data
+    children = node.children
+
+    if data == 'var_decl':
+        return ir.VarDecl(children[0].value, _lower_expression(children[1]))
+    if data == 'assignment':
+        target, expr = children
+        if isinstance(target, Tree) and target.data == 'context_var':
+            return ir.SetContext(target.children[1].value, _lower_expression(expr))
+        return ir.SetVar(target.value, _lower_expression(expr))
+    if data == 'if_stmt':
+        orelse = children[2] if len(children) > 2 else None
+        return ir.If(_lower_expression(children[0]), _lower_block(children[1]),
+                     _lower_block(orelse) if orelse is not None else None)
+    if data == 'while_stmt':
+        return ir.While(_lower_expression(children[0]), _lower_block(children[1]))
+    if data == 'block':
+        return _lower_block(node)
+    if data == 'break_stmt':
+        return ir.Break()
+    if data == 'response_stmt':
+        return ir.Say(_lower_expression(children[0]))
+    if data == 'ask_stmt':
+        return ir.Ask(_lower_expression(children[0]))
+    if data == 'process_stmt':
+        inputs = None
+        if isinstance(children[-1], Tree) and children[-1].data == 'process_inputs':
+            inputs = _string_keys(children[-1].children)
+            children = children[:-1]
+        return ir.Process(_lower_expression(children[0]), _string_keys(children[1:]), inputs)
+    if data == 'exec_stmt':
+        return ir.Exec(_lower_expression(children[0]), _string_keys(children[1:]))
+    if data == 'parallel_stmt':
+        return ir.ExecGroup(tuple(_lower_statement(stmt) for stmt in children))
+    if data == 'notify_stmt':
+        return ir.Notify(children[0].value, _lower_expression(children[1]),
+                         _lower_expression(children[2]))
+    if data == 'wait_stmt':
+        return ir.Wait(children[0].value, children[1].value, children[2].value)
+    if data == 'start_stmt':
+        return ir.Start(children[0].value)
+    if data == 'skill_invoke':
+        args = _compile_args(children[1]) if len(children) > 1 else ()
+        return ir.Invoke(children[0].value, args)
+    if data == 'return_stmt':
+        return _lower_statement(children[0])
+    if data == 'success_stmt':
+        return ir.Success(_lower_expression(children[0]), _lower_expression(children[1]))
+    if data == 'fail_stmt':
+        return ir.Fail(_lower_expression(children[0]), _lower_expression(children[1]))
+    raise CompileError(f"Unsupported statement '{data}'")
+
+
+def compile_skill(node):
+    """Lower a skill_def tree to an ir.Skill."""
+    name, params_node, body = node.children
+    params = tuple(tok.value for tok in params_node.children) if params_node is not None else ()
+    block = _lower_block(body)
+    scope = Scope()
+    _resolve(block, scope)
+    _bind_all(block)
+    return ir.Skill(name.value, params, block, scope.layout)
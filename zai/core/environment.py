@@ -1,15 +1,29 @@
+# Marks an unassigned slot / a failed lookup
+MISSING = object()
+
+
 class Environment:
     def __init__(self, parent=None):
         self.variables = {}
         self.context = {}
         self.parent = parent
+        # Bumped by every context write; versions[key] is the write that last set key
+        self.version = 0
+        self.versions = {}
+
+    def lookup(self, name, default=MISSING):
+        env = self
+        while env is not None:
+            if name in env.variables:
+                return env.variables[name]
+            env = env.parent
+        return default
 
     def get_var(self, name):
-        if name in self.variables:
-            return self.variables[name]
-        if self.parent:
-            return self.parent.get_var(name)
-        raise NameError(f"Variable '{name}' not found")
+        value = self.lookup(name)
+        if value is MISSING:
+            raise NameError(f"Variable '{name}' not found")
+        return value
 
     def set_var(self, name, value):
         self.variables[name] = value
@@ -22,4 +36,47 @@ class Environment:
         return None
 
     def set_context(self, name, value):
+        self.version += 1
+        self.versions[name] = self.version
         self.context[name] = value
+
+
+class Frame:
+    """Local variables of one skill invocation, stored by slot index.
+
+    layout (name -> slot) comes from the compiled skill and is shared by all
+    its frames; compiled code reads and writes `values` directly, name-based
+    access is for templates and personas.
+    """
+    __slots__ = ("layout", "values", "parent")
+
+    def __init__(self, layout, parent=None):
+        self.layout = layout
+        self.values = [MISSING] * len(layout)
+        self.parent = parent
+
+    def lookup(self, name, default=MISSING):
+        slot = self.layout.get(name)
+        if slot is not None and self.values[slot] is not MISSING:
+            return self.values[slot]
+        if self.parent is not None:
+            return self.parent.lookup(name, default)
+        return default
+
+    def get_var(self, name):
+        value = self.lookup(name)
+        if value is MISSING:
+            raise NameError(f"Variable '{name}' not found")
+        return value
+
+    def set_var(self, name, value):
+        slot = self.layout.get(name)
+        if slot is None:
+            raise NameError(f"Variable '{name}' is not local to this skill")
+        self.values[slot] = value
+
+    def get_context(self, name):
+        return self.parent.get_context(name) if self.parent is not None else None
+
+    def set_context(self, name, value):
+        self.parent.set_context(name, value)
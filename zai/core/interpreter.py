@@ -1,27 +1,48 @@
 import re
 import os
-import json
 import time
-import uuid
-from .environment import Environment
+from . import ir
+from .environment import Environment, Frame, MISSING
+from .persona_cache import PersonaCache
+from .signals import BREAK, SUCCESS, Result, Signal
+from .ast_cache import parse_file
+from .compiler import compile_expression, compile_skill
+from .template import compile_template
 
 from ..runtime.default_bridge import DefaultAIBridge, DefaultExecBridge
+from ..runtime.prompt import SystemPrompt, select_context
+from ..runtime.transport import open_transport
+from ..config import get_bool
+
+# `{{name=}}` in an ask prompt: the context key receiving the user's answer
+ASK_SLOT = re.compile(r"\{\{\s*([a-zA-Z0-9_]+)=\s*\}\}")
 
 class Interpreter:
-    def __init__(self, tree, ai_bridge=None, exec_bridge=None, base_path=".", wait_timeout=60, source_file=None):
+    def __init__(self, tree, ai_bridge=None, exec_bridge=None, base_path=".", wait_timeout=60, source_file=None, ast_cache=None, scheduler=None, transport=None, parallel_process=None, stream=None, parallel_exec=None):
         self.tree = tree
         self.env = Environment()
         self.skills = {}
         self.agent_name = ""
         self.persona = {}
         self.agent_system_prompt = ""
+        self.persona_cache = PersonaCache()  # rendered system-prompt fragments
+        self.system_fragments = []  # fragments of the last system prompt built
         self.ai_bridge = ai_bridge or DefaultAIBridge()
         self.exec_bridge = exec_bridge or DefaultExecBridge()
         self.base_path = base_path
         self.imported_files = set()  # prevent circular imports
-        self.ipc_root = os.path.join(os.getcwd(), ".zai_ipc")
+        self.transport = transport or open_transport()  # carries notify / wait
         self.wait_timeout = wait_timeout
         self.source_file = source_file
+        self.ast_cache = ast_cache  # None: follow ZAI_AST_CACHE
+        self.scheduler = scheduler  # runtime.scheduler.Scheduler: `start` runs agents in-process
+        # Send independent consecutive process statements as one handle_many batch
+        self.parallel_process = get_bool("ZAI_PARALLEL_PROCESS", False) if parallel_process is None else parallel_process
+        # Stream process responses, setting and echoing each key as it completes,
+        # and echo exec output line by line
+        self.stream = get_bool("ZAI_STREAM", False) if stream is None else stream
+        # Run the exec statements of `parallel { ... }` blocks as one handle_many batch
+        self.parallel_exec = get_bool("ZAI_PARALLEL_EXEC", False) if parallel_exec is None else parallel_exec
 
         self.agent_registry = {}
         self.session_id = None
@@ -36,24 +57,32 @@ class Interpreter:
         self.received_seq = None  # Sequence number of received message
         self.conversation_stack = []  # Stack for nested request-response patterns
 
-    def _ensure_ipc_dir(self, agent_name):
-        path = os.path.join(self.ipc_root, agent_name)
-        os.makedirs(path, exist_ok=True)
-        return path
+        # IR dispatch table: statement class -> bound handler
+        self._statements = {cls: getattr(self, f"op_{cls.opname}") for cls in ir.STATEMENTS}
 
     def resolve_template(self, template_str, env):
-        if not isinstance(template_str, str): return template_str
-        def replace(match):
-            key = match.group(1)
-            try:
-                val = env.get_var(key)
+        if not isinstance(template_str, str) or "{{" not in template_str:
+            return template_str
+        return compile_template(template_str).render(self._template_value, env)
+
+    def _template_value(self, key, env):
+        # env is an Environment, or a plain dict of values (template_render)
+        if isinstance(env, dict):
+            val = env.get(key)
+        else:
+            val = env.lookup(key)
+            if val is not MISSING:
                 return str(val)
-            except:
-                val = self.env.get_context(key)
-                if val is not None:
-                    return str(val)
-                return f"{{{key}}}"
-        return re.sub(r"\{\{\s*([a-zA-Z0-9_]+)\s*\}\}", replace, template_str)
+            val = self.env.get_context(key)
+        if val is not None:
+            return str(val)
+        return f"{{{key}}}"
+
+    def execute(self, stmt, env):
+        return self._statements[stmt.__class__](stmt, env)
+
+    def eval_expr(self, expr, env):
+        return expr.evaluate(self, env)
 
     def visit(self, node, env):
         if node is None: return None
@@ -68,11 +97,20 @@ class Interpreter:
         for child in node.children:
             if child is not None:
                 last_result = self.visit(child, env)
-                if isinstance(last_result, dict) and (last_result.get("final") or last_result.get("status") == "fail"):
+                if isinstance(last_result, Signal):
                     return last_result
         return last_result
 
     def run(self, agent_name=None, entry_skill="Main", entry_args=None):
+        if not self.load(agent_name):
+            return {}
+        return self.execute_skill(entry_skill, entry_args or {})
+
+    def load(self, agent_name=None):
+        """Process the agent's declarations and compile its skills.
+
+        Returns False when the tree holds no agent (a plain config file).
+        """
         root = self.tree
         if root.data == 'start':
             target_agent = None
@@ -91,11 +129,13 @@ class Interpreter:
                         break
                 if not target_agent:
                     # Could be just config file
-                    return {}
+                    return False
             root = target_agent
         
         if root.data == 'agent':
             self.agent_name = root.children[0].value
+            # Accept messages from now on, even before the first wait
+            self.transport.register(self.agent_name)
             self.context_defined = False
             self.agent_system_prompt = ""
 
@@ -120,10 +160,9 @@ class Interpreter:
                 elif agent_child.data == 'persona_def':
                     self.visit_persona_def(agent_child, self.env)
                 elif agent_child.data == 'skill_def':
-                    name = agent_child.children[0].value
-                    self.skills[name] = agent_child
- 
-        return self.execute_skill(entry_skill, entry_args or {})
+                    skill = compile_skill(agent_child)
+                    self.skills[skill.name] = skill
+        return True
 
     def visit_context_def(self, node, env):
         if self.context_defined:
@@ -137,7 +176,6 @@ class Interpreter:
                 self.env.set_context(key, val)
 
     def visit_import_stmt(self, node, env):
-        from .parser import get_parser
         rel_path = self.evaluate(node.children[0], env)
         abs_path = os.path.abspath(os.path.join(self.base_path, rel_path))
         
@@ -150,11 +188,7 @@ class Interpreter:
              print(f"Warning: Import file not found: {abs_path}")
              return
 
-        with open(abs_path, 'r') as f:
-            code = f.read()
-            
-        parser = get_parser()
-        tree = parser.parse(code, start='config_file')
+        tree = parse_file(abs_path, start='config_file', use_cache=self.ast_cache)
         
         # We need to process definitions in the imported file
         # imports in imports are also possible, so recursive visit is good
@@ -164,8 +198,6 @@ class Interpreter:
             self.visit(child, env)
 
     def visit_use_stmt(self, node, env):
-        from .parser import get_parser
-        
         module_path = self.evaluate(node.children[0], env)
         abs_path = os.path.abspath(os.path.join(self.base_path, module_path))
         
@@ -180,11 +212,7 @@ class Interpreter:
             print(f"Warning: Use file not found: {abs_path}")
             return
         
-        with open(abs_path, 'r') as f:
-            code = f.read()
-        
-        parser = get_parser()
-        tree = parser.parse(code, start='start')
+        tree = parse_file(abs_path, start='start', use_cache=self.ast_cache)
         
         for child in tree.children:
             if hasattr(child, 'data') and child.data == 'agent':
@@ -199,107 +227,79 @@ class Interpreter:
         for item in node.children[1:]:
             if hasattr(item, 'data') and item.data == 'persona_item':
                 key = item.children[0].value
-                # Store the AST node (either expression or persona_block)
-                self.persona[name][key] = item.children[1]
-
-    def visit_persona_block(self, node, env):
-        fragments = []
-        for fragment in node.children:
-            val = self.visit(fragment, env)
-            if val: fragments.append(str(val))
-        return " ".join(fragments)
-
-    def visit_persona_if(self, node, env):
-        cond = self.evaluate(node.children[0], env)
-        if cond:
-            return self.visit(node.children[1], env)
-        elif len(node.children) > 2 and node.children[2] is not None:
-            return self.visit(node.children[2], env)
-        return ""
+                # Store the compiled item (either expression or persona_block)
+                self.persona[name][key] = compile_expression(item.children[1])
 
     def evaluate_persona(self, persona_name, key, env):
         if persona_name not in self.persona: return ""
         node = self.persona[persona_name].get(key)
         if node is None: return ""
-        
-        # If it was an inline expression (not a block)
-        if not hasattr(node, 'data') or node.data != 'persona_block':
-            val = self.evaluate(node, env)
-            return self.resolve_template(val, env)
-        
-        # If it is a block
-        val = self.visit(node, env)
+        val = self.eval_expr(node, env)
         return self.resolve_template(val, env)
 
     def execute_skill(self, name, args):
+        return self.call_skill(name, args).as_dict()
+
+    def call_skill(self, name, args):
+        """Run skill name and return its Result."""
         if name not in self.skills:
-            return {"status": "fail", "code": 404, "message": f"Skill '{name}' not found"}
-        
-        skill_node = self.skills[name]
-        body_start_index = 2
-        
-        local_env = Environment(parent=self.env)
+            return Result("fail", 404, f"Skill '{name}' not found")
+
+        skill = self.skills[name]
+        local_env = Frame(skill.layout, parent=self.env)
         for k, v in args.items():
             self.env.set_context(k, v)
 
-        for stmt in skill_node.children[body_start_index:]:
-            if not hasattr(stmt, 'data'): continue
-            result = self.visit(stmt, local_env)
-            if isinstance(result, dict) and (result.get("final") or result.get("status") == "fail"):
+        result = self.op_block(skill.body, local_env)
+        # A stray break outside any loop just ends the skill
+        if result is None or result is BREAK:
+            return SUCCESS
+        return result
+
+    def op_var_decl(self, node, env):
+        env.values[node.slot] = node.expr.evaluate(self, env)
+
+    def op_set_var(self, node, env):
+        env.values[node.slot] = node.expr.evaluate(self, env)
+
+    def op_set_context(self, node, env):
+        self.env.set_context(node.key, self.eval_expr(node.expr, env))
+
+    def op_if(self, node, env):
+        if self.eval_expr(node.cond, env):
+            return self.op_block(node.then, env)
+        elif node.orelse is not None:
+            return self.op_block(node.orelse, env)
+
+    def op_while(self, node, env):
+        cond = node.cond.evaluate
+        while cond(self, env):
+            result = self.op_block(node.body, env)
+            if result is not None:
+                if result is BREAK:
+                    return None
                 return result
-        return {"status": "success", "code": 0, "message": "OK", "final": True}
 
-    def visit_var_decl(self, node, env):
-        name = node.children[0].value
-        val = self.evaluate(node.children[1], env)
-        env.set_var(name, val)
-
-    def visit_assignment(self, node, env):
-        target_node = node.children[0]
-        val = self.evaluate(node.children[1], env)
-        if hasattr(target_node, 'data') and target_node.data == 'context_var':
-            key = target_node.children[1].value 
-            self.env.set_context(key, val)
-        else:
-            env.set_var(target_node.value, val)
-
-    def visit_if_stmt(self, node, env):
-        cond = self.evaluate(node.children[0], env)
-        if cond:
-            return self.visit(node.children[1], env)
-        elif len(node.children) > 2 and node.children[2] is not None:
-            return self.visit(node.children[2], env)
-
-    def visit_while_stmt(self, node, env):
-        while self.evaluate(node.children[0], env):
-            result = self.visit(node.children[1], env)
-            if isinstance(result, dict):
-                if result.get("break"):
-                    return {"break": True}
-                if result.get("final") or result.get("status") == "fail":
-                    return result
-
-    def visit_break_stmt(self, node, env):
-        return {"break": True}
-
-    def visit_block(self, node, env):
-        last_result = None
-        for stmt in node.children:
-            if hasattr(stmt, 'data'):
-                last_result = self.visit(stmt, env)
-                if isinstance(last_result, dict) and (last_result.get("final") or last_result.get("status") == "fail"):
-                    return last_result
-        return last_result
+    def op_break(self, node, env):
+        return BREAK
+
+    def op_block(self, node, env):
+        statements = self._statements
+        for stmt in node.stmts:
+            result = statements[stmt.__class__](stmt, env)
+            if result is not None:
+                return result
+        return None
 
-    def visit_response_stmt(self, node, env):
-        val = self.evaluate(node.children[0], env)
+    def op_say(self, node, env):
+        val = self.eval_expr(node.expr, env)
         msg = self.resolve_template(val, env)
         print(f"[{self.agent_name}] Agent: {msg}", flush=True)
 
-    def visit_ask_stmt(self, node, env):
-        prompt = self.evaluate(node.children[0], env)
+    def op_ask(self, node, env):
+        prompt = self.eval_expr(node.expr, env)
         prompt = self.resolve_template(prompt, env)
-        match = re.search(r"\{\{\s*([a-zA-Z0-9_]+)=\s*\}\}", prompt)
+        match = ASK_SLOT.search(prompt)
         if match:
             var_name = match.group(1)
             # Match the exact pattern found and remove it
@@ -310,43 +310,134 @@ class Interpreter:
         else:
             input(f"[{self.agent_name}] {prompt} ")
 
-    def visit_process_stmt(self, node, env):
-        prompt = self.evaluate(node.children[0], env)
-        keys = [self.evaluate(tok, env) for tok in node.children[1:] if tok is not None]
+    def op_process(self, node, env):
+        prompt, keys, system_prompt, context = self.process_request(node, env)
+        if self.stream:
+            res = self.ai_bridge.handle_stream(prompt, keys, system_prompt, context, self.on_process_key)
+        else:
+            res = self.ai_bridge.handle(prompt, keys, system_prompt, context)
+        for k, v in res.items(): self.env.set_context(k, v)
 
-        # Build system prompt: Agent base + Persona overlays
-        system_parts = []
+    def process_request(self, node, env, system_prompt=None):
+        """(prompt, extract keys, system prompt, selected context) for a process statement."""
+        prompt = self.eval_expr(node.prompt, env)
+        if system_prompt is None:
+            system_prompt = self.build_system_prompt(env)
+        context = select_context(self.env.context, node.inputs, (prompt, system_prompt))
+        return prompt, list(node.keys), system_prompt, context
+
+    def on_process_key(self, key, value):
+        """A streamed process result key is complete: set it and show it."""
+        self.env.set_context(key, value)
+        print(f"[{self.agent_name}] Agent: {key}: {value}", flush=True)
+
+    def op_process_group(self, node, env):
+        if not self.parallel_process:
+            for stmt in node.processes:
+                self.op_process(stmt, env)
+            return
+        requests = self.process_requests(node, env)
+        if requests is None:
+            for stmt in node.processes:
+                self.op_process(stmt, env)
+            return
+        self.apply_process_results(self.ai_bridge.handle_many(requests))
+
+    def process_requests(self, node, env):
+        """handle_many arguments for a ProcessGroup, or None when the group
+        has to run one statement at a time.
+
+        The system prompt and context are taken once, before any of the
+        group's results are in. The compiler only groups statements whose
+        prompts and `using` inputs do not read each other's keys; the system
+        prompt is only known here, so a group whose persona items read a key
+        one of its statements extracts runs sequentially instead.
+        """
+        system_prompt = self.build_system_prompt(env)
+        extracted = {key for stmt in node.processes[:-1] for key in stmt.keys}
+        if self.persona_cache.reads_any(self.system_fragments, extracted):
+            return None
+        return [self.process_request(stmt, env, system_prompt) for stmt in node.processes]
+
+    def apply_process_results(self, results):
+        # In statement order, so a later statement's keys win as they would sequentially
+        for res in results:
+            for k, v in res.items(): self.env.set_context(k, v)
+
+    def build_system_prompt(self, env):
+        """Agent base prompt followed by the persona overlays.
+
+        Fragments that read no context or variables come first, so the start
+        of the prompt is byte-identical from call to call and providers can
+        reuse their cached prefix; the fragments that depend on state follow.
+        """
+        render = self.persona_cache.render
+        is_static = self.persona_cache.is_static
+        static_parts, dynamic_parts = [], []
+        self.system_fragments = fragments = []  # rendered for this prompt
 
         # 1. Agent-level system prompt (base identity) with template resolution
         if self.agent_system_prompt:
             # Resolve templates like {{context.user_name}} or {{variable}}
-            resolved_prompt = self.resolve_template(self.agent_system_prompt, env)
-            system_parts.append(resolved_prompt)
+            base = self.agent_system_prompt
+            fragment = ("system", base)
+            fragments.append(fragment)
+            resolved_prompt = render(self, fragment, env, lambda e: self.resolve_template(base, e))
+            (static_parts if is_static(fragment) else dynamic_parts).append(resolved_prompt)
 
         # 2. Persona overlays (dynamic contextual adjustments)
-        for persona_name in self.persona:
-            persona_parts = []
-            for key in self.persona[persona_name]:
-                instruction = self.evaluate_persona(persona_name, key, env)
+        for persona_name, items in self.persona.items():
+            persona_parts = {True: [], False: []}  # static? -> "[key]\ninstruction"
+            for key, node in items.items():
+                # Keyed by the compiled item, so a redefined persona renders afresh
+                fragment = (persona_name, key, node)
+                fragments.append(fragment)
+                instruction = render(self, fragment, env,
+                                     lambda e: self.evaluate_persona(persona_name, key, e))
                 if instruction:
-                    persona_parts.append(f"[{key}]\n{instruction}")
-            if persona_parts:
-                system_parts.append(f"--- Persona: {persona_name} ---\n" + "\n".join(persona_parts))
-
-        system = "\n\n".join(system_parts)
-        res = self.ai_bridge.handle(prompt, keys, system, self.env.context)
+                    persona_parts[is_static(fragment)].append(f"[{key}]\n{instruction}")
+            for static, parts in ((True, static_parts), (False, dynamic_parts)):
+                if persona_parts[static]:
+                    parts.append(f"--- Persona: {persona_name} ---\n" + "\n".join(persona_parts[static]))
+
+        return SystemPrompt("\n\n".join(static_parts + dynamic_parts), "\n\n".join(static_parts))
+
+    def op_exec(self, node, env):
+        cmd = self.eval_expr(node.cmd, env)
+        keys = list(node.keys)
+        if self.stream:
+            res = self.exec_bridge.handle_stream(cmd, keys, self.on_exec_line)
+        else:
+            res = self.exec_bridge.handle(cmd, keys)
         for k, v in res.items(): self.env.set_context(k, v)
 
-    def visit_exec_stmt(self, node, env):
-        cmd = self.evaluate(node.children[0], env)
-        keys = [self.evaluate(tok, env) for tok in node.children[1:] if tok is not None]
-        res = self.exec_bridge.handle(cmd, keys)
-        for k, v in res.items(): self.env.set_context(k, v)
+    def on_exec_line(self, stream, line):
+        """A streamed exec wrote a line: show it."""
+        print(f"[{self.agent_name}] {stream}: {line}", flush=True)
 
-    def visit_notify_stmt(self, node, env):
-        target_agent = node.children[0].value
-        cmd_type = self.evaluate(node.children[1], env)
-        payload = self.evaluate(node.children[2], env)
+    def op_exec_group(self, node, env):
+        if not self.parallel_exec:
+            for stmt in node.execs:
+                self.op_exec(stmt, env)
+            return
+        results = self.exec_bridge.handle_many(self.exec_requests(node, env))
+        self.apply_process_results(results)
+
+    def exec_requests(self, node, env):
+        """handle_many arguments for a `parallel` block: every command is
+        evaluated before any of them runs."""
+        return [(self.eval_expr(stmt.cmd, env), list(stmt.keys)) for stmt in node.execs]
+
+    def op_notify(self, node, env):
+        message = self.build_message(node, env)
+        self.transport.send(node.target, message)
+        print(f"[{self.agent_name}] Notified {node.target}: {message['type']}", flush=True)
+
+    def build_message(self, node, env):
+        """Message dict for a notify, updating the request-response state."""
+        target_agent = node.target
+        cmd_type = self.eval_expr(node.type, env)
+        payload = self.eval_expr(node.payload, env)
         payload = self.resolve_template(str(payload), env)
 
         # Increment send sequence for this request
@@ -377,9 +468,7 @@ class Interpreter:
             # Expect a response to this new request
             self.expected_response_seq = seq
 
-        # Write to target agent's IPC directory
-        target_dir = self._ensure_ipc_dir(target_agent)
-        message = {
+        return {
             "source": self.agent_name,
             "type": cmd_type,
             "payload": payload,
@@ -388,106 +477,76 @@ class Interpreter:
             "response_seq": response_seq  # Echo back received sequence if this is a response
         }
 
-        filename = f"{uuid.uuid4()}.json"
-        with open(os.path.join(target_dir, filename), "w") as f:
-            json.dump(message, f)
-
-        print(f"[{self.agent_name}] Notified {target_agent}: {cmd_type}", flush=True)
+    def op_wait(self, node, env):
+        target_source = node.source # We expect this to be the source agent name
+        self.begin_wait(target_source)
 
-    def visit_wait_stmt(self, node, env):
-        code_var = node.children[0].value
-        msg_var = node.children[1].value
-        target_source = node.children[2].value # We expect this to be the source agent name
+        # Check the inbox, then sleep until something new arrives
+        deadline = time.time() + self.wait_timeout
+        while True:
+            found_msg = self.receive(target_source)
+            if found_msg is not None:
+                self.accept_message(found_msg, node, env)
+                return
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            self.transport.wait(self.agent_name, remaining)
 
-        my_dir = self._ensure_ipc_dir(self.agent_name)
+        self.wait_timed_out(node, env)
 
+    def begin_wait(self, target_source):
         print(f"[{self.agent_name}] Waiting for signal from {target_source}...", flush=True)
 
+    def receive(self, target_source):
+        """Consume and return the next message from target_source, or None."""
         # Get the expected response sequence number
         expected_seq = self.expected_response_seq
 
-        # Simple polling loop
-        timeout = self.wait_timeout
-        start_time = time.time()
-
-        while time.time() - start_time < timeout:
-            found_msg = None
-            found_file = None
-
-            # Check for messages
-            if os.path.exists(my_dir):
-                files = os.listdir(my_dir)
-                for fname in files:
-                    if not fname.endswith(".json"): continue
-                    fpath = os.path.join(my_dir, fname)
-                    try:
-                        with open(fpath, 'r') as f:
-                            msg = json.load(f)
-
-                        # Check if message is from expected source
-                        # If expected_seq is set, require matching response_seq
-                        # But if response_seq is None, accept the message anyway
-                        if msg.get("source") == target_source:
-                            if expected_seq is not None and msg.get("response_seq") is not None:
-                                if msg.get("response_seq") != expected_seq:
-                                    continue  # Not the response we're waiting for
-                            found_msg = msg
-                            found_file = fpath
-                            break
-                    except (json.JSONDecodeError, IOError) as e:
-                        print(f"[{self.agent_name}] Warning: Failed to read message file {fname}: {e}")
-
-            if found_msg and found_file:
-                # Consume message
-                os.remove(found_file)
-                env.set_var(code_var, found_msg.get("type")) # usually numeric code or string
-                env.set_var(msg_var, found_msg.get("payload"))
-
-                # Push current conversation context to stack before overwriting
-                # This allows us to return to the previous context after responding
-                if self.received_from is not None:
-                    self.conversation_stack.append((self.received_from, self.received_seq))
-
-                # Track who sent us this message (for response correlation)
-                self.received_from = found_msg.get("source")
-                self.received_seq = found_msg.get("seq")
-
-                # Clear expected sequence after receiving response
-                self.expected_response_seq = None
-                return
+        def match(msg):
+            # Check if message is from expected source
+            # If expected_seq is set, require matching response_seq
+            # But if response_seq is None, accept the message anyway
+            if msg.get("source") != target_source:
+                return False
+            response_seq = msg.get("response_seq")
+            return expected_seq is None or response_seq is None or response_seq == expected_seq
+
+        return self.transport.receive(self.agent_name, match)
+
+    def accept_message(self, found_msg, node, env):
+        env.values[node.code_slot] = found_msg.get("type") # usually numeric code or string
+        env.values[node.msg_slot] = found_msg.get("payload")
 
-            time.sleep(0.5)
+        # Push current conversation context to stack before overwriting
+        # This allows us to return to the previous context after responding
+        if self.received_from is not None:
+            self.conversation_stack.append((self.received_from, self.received_seq))
 
-        # Timeout case
+        # Track who sent us this message (for response correlation)
+        self.received_from = found_msg.get("source")
+        self.received_seq = found_msg.get("seq")
+
+        # Clear expected sequence after receiving response
+        self.expected_response_seq = None
+
+    def wait_timed_out(self, node, env):
         print(f"[{self.agent_name}] Wait timed out!", flush=True)
-        env.set_var(code_var, -1)
-        env.set_var(msg_var, "TIMEOUT")
+        env.values[node.code_slot] = -1
+        env.values[node.msg_slot] = "TIMEOUT"
         self.expected_response_seq = None
 
-    def visit_template_render(self, node, env):
-        tpl_str = env.get_var(node.children[0].value)
-        temp_ctx = self.env.context.copy()
-        if len(node.children) > 1:
-            for assign in node.children[1].children:
-                 temp_ctx[assign.children[0].value] = self.evaluate(assign.children[1], env)
-        return self.resolve_template(tpl_str, temp_ctx)
+    def op_invoke(self, node, env):
+        call_args = {name: self.eval_expr(expr, env) for name, expr in node.args}
+        res = self.call_skill(node.name, call_args)
+        # Only a failing sub-skill ends the caller
+        return res if res.failed else None
 
-    def visit_skill_invoke(self, node, env):
-        name = node.children[0].value
-        call_args = {}
-        if len(node.children) > 1 and node.children[1] is not None:
-            for assign in node.children[1].children:
-                call_args[assign.children[0].value] = self.evaluate(assign.children[1], env)
-        res = self.execute_skill(name, call_args)
-        if isinstance(res, dict) and res.get("status") == "success":
-            res["final"] = False
-        return res
-
-    def visit_success_stmt(self, node, env):
-        return {"status": "success", "code": int(self.evaluate(node.children[0], env)), "message": self.evaluate(node.children[1], env), "final": True}
-
-    def visit_start_stmt(self, node, env):
-        target_agent = node.children[0].value
+    def op_success(self, node, env):
+        return Result("success", int(self.eval_expr(node.code, env)), self.eval_expr(node.message, env))
+
+    def op_start(self, node, env):
+        target_agent = node.target
         print(f"[{self.agent_name}] Starting sub-agent: {target_agent}", flush=True)
 
         import subprocess
@@ -500,8 +559,23 @@ class Interpreter:
         elif self.source_file:
             source_file = self.source_file
 
-        if source_file:
+        if source_file and self.scheduler is not None:
+            try:
+                self.scheduler.spawn(source_file, agent_name=target_agent)
+                print(f"[{self.agent_name}] Sub-agent {target_agent} started in-process", flush=True)
+            except Exception as e:
+                print(f"[{self.agent_name}] Failed to start sub-agent {target_agent}: {e}", flush=True)
+        elif source_file:
             cmd = [sys.executable, "-m", "zai.zai", source_file]
+            # The child resolves its own config; flags carry what this run was given
+            if self.ast_cache is False:
+                cmd.append("--no-cache")
+            if self.parallel_process:
+                cmd.append("--parallel-process")
+            if self.stream:
+                cmd.append("--stream")
+            if self.parallel_exec:
+                cmd.append("--parallel-exec")
             try:
                 proc = subprocess.Popen(
                     cmd,
@@ -513,51 +587,10 @@ class Interpreter:
         else:
             print(f"Warning: Cannot start agent {target_agent}, source file not known.")
 
-    def visit_fail_stmt(self, node, env):
-        return {"status": "fail", "code": int(self.evaluate(node.children[0], env)), "message": self.evaluate(node.children[1], env), "final": True}
+    def op_fail(self, node, env):
+        return Result("fail", int(self.eval_expr(node.code, env)), self.eval_expr(node.message, env))
 
     def evaluate(self, node, env):
+        """Evaluate a Lark expression tree (declarations, import paths)."""
         if node is None: return None
-        if not hasattr(node, 'data'):
-            if hasattr(node, 'type'):
-                if node.type == 'ESCAPED_STRING': return node.value[1:-1]
-                if node.type == 'MULTILINE_STRING': return node.value[3:-3]
-                if node.type == 'SIGNED_NUMBER': return float(node.value)
-                if node.type == 'IDENTIFIER':
-                    # Handle boolean literals that may be parsed as identifiers
-                    if node.value == 'true': return True
-                    if node.value == 'false': return False
-                    try: return env.get_var(node.value)
-                    except: return self.env.get_context(node.value)
-            return node
-        
-        if node.data == 'true': return True
-        if node.data == 'false': return False
-        
-        if node.data in ['string', 'number', 'simple_expression', 'expression', 'boolean']: 
-            return self.evaluate(node.children[0], env)
-        if node.data == 'template_render': return self.visit_template_render(node, env)
-        if node.data == 'context_var': return self.env.get_context(node.children[1].value)
-        if node.data == 'persona_ref':
-            persona_name = node.children[0].value
-            item_key = node.children[1].value
-            return self.evaluate_persona(persona_name, item_key, env)
-        if node.data == 'binary_op':
-            l, op, r = self.evaluate(node.children[0], env), node.children[1].value, self.evaluate(node.children[2], env)
-            if l is None: l = 0
-            if r is None: r = 0
-            try:
-                if op == '+': return (l + r) if isinstance(l, (int, float)) else (str(l) + str(r))
-                if op == '-': return float(l) - float(r)
-                if op == '*': return float(l) * float(r)
-                if op == '/': return float(l) / float(r)
-                if op == '==': return str(l) == str(r)
-                if op == '!=': return str(l) != str(r)
-                if op == '>': return float(l) > float(r)
-                if op == '<': return float(l) < float(r)
-                if op == '>=': return float(l) >= float(r)
-                if op == '<=': return float(l) <= float(r)
-                if op == '&&': return bool(l) and bool(r)
-                if op == '||': return bool(l) or bool(r)
-            except: return False
-        return None
+        return self.eval_expr(compile_expression(node), env)
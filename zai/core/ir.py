@@ -0,0 +1,287 @@
+"""
+Lowered intermediate representation executed by the Interpreter.
+
+The compiler (zai.core.compiler) turns Lark trees into these nodes once per
+skill / persona definition: literals are already unquoted and converted,
+operators are bound to their implementation, and optional grammar parts are
+normalised away. Statement classes name the Interpreter handler that runs
+them (`op_<opname>`); expressions carry their own `evaluate(interp, env)`
+closure, built by the compiler.
+"""
+
+
+class Node:
+    __slots__ = ()
+    opname = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+# --- Expressions -----------------------------------------------------------
+
+class Expr(Node):
+    __slots__ = ("evaluate",)
+
+class Const(Expr):
+    __slots__ = ("value",)
+    opname = "const"
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Name(Expr):
+    """Identifier: a local variable, falling back to the context."""
+    __slots__ = ("name", "slot")
+    opname = "name"
+
+    def __init__(self, name, slot=None):
+        self.name = name
+        self.slot = slot  # Frame index; None means look up by name
+
+
+class ContextRef(Expr):
+    __slots__ = ("key",)
+    opname = "context_ref"
+
+    def __init__(self, key):
+        self.key = key
+
+
+class BinOp(Expr):
+    __slots__ = ("op", "fn", "left", "right")
+    opname = "binop"
+
+    def __init__(self, op, fn, left, right):
+        self.op = op
+        self.fn = fn
+        self.left = left
+        self.right = right
+
+
+class PersonaRef(Expr):
+    __slots__ = ("persona", "key")
+    opname = "persona_ref"
+
+    def __init__(self, persona, key):
+        self.persona = persona
+        self.key = key
+
+
+class TemplateRender(Expr):
+    __slots__ = ("name", "args")
+    opname = "template_render"
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args  # tuple of (name, expression)
+
+
+# --- Persona items ---------------------------------------------------------
+
+class PersonaBlock(Expr):
+    __slots__ = ("fragments",)
+    opname = "persona_block"
+
+    def __init__(self, fragments):
+        self.fragments = fragments
+
+
+class PersonaIf(Expr):
+    __slots__ = ("cond", "then", "orelse")
+    opname = "persona_if"
+
+    def __init__(self, cond, then, orelse):
+        self.cond = cond
+        self.then = then
+        self.orelse = orelse
+
+
+# --- Statements ------------------------------------------------------------
+
+class Skill(Node):
+    __slots__ = ("name", "params", "body", "layout")
+    opname = "skill"
+
+    def __init__(self, name, params, body, layout):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.layout = layout  # local variable name -> Frame slot
+
+
+class Block(Node):
+    __slots__ = ("stmts",)
+    opname = "block"
+
+    def __init__(self, stmts):
+        self.stmts = stmts
+
+
+class VarDecl(Node):
+    __slots__ = ("name", "expr", "slot")
+    opname = "var_decl"
+
+    def __init__(self, name, expr, slot=None):
+        self.name = name
+        self.expr = expr
+        self.slot = slot
+
+
+class SetVar(Node):
+    __slots__ = ("name", "expr", "slot")
+    opname = "set_var"
+
+    def __init__(self, name, expr, slot=None):
+        self.name = name
+        self.expr = expr
+        self.slot = slot
+
+
+class SetContext(Node):
+    __slots__ = ("key", "expr")
+    opname = "set_context"
+
+    def __init__(self, key, expr):
+        self.key = key
+        self.expr = expr
+
+
+class If(Node):
+    __slots__ = ("cond", "then", "orelse")
+    opname = "if"
+
+    def __init__(self, cond, then, orelse):
+        self.cond = cond
+        self.then = then
+        self.orelse = orelse
+
+
+class While(Node):
+    __slots__ = ("cond", "body")
+    opname = "while"
+
+    def __init__(self, cond, body):
+        self.cond = cond
+        self.body = body
+
+
+class Break(Node):
+    __slots__ = ()
+    opname = "break"
+
+
+class Say(Node):
+    __slots__ = ("expr",)
+    opname = "say"
+
+    def __init__(self, expr):
+        self.expr = expr
+
+
+class Ask(Node):
+    __slots__ = ("expr",)
+    opname = "ask"
+
+    def __init__(self, expr):
+        self.expr = expr
+
+
+class Process(Node):
+    __slots__ = ("prompt", "keys", "inputs")
+    opname = "process"
+
+    def __init__(self, prompt, keys, inputs=None):
+        self.prompt = prompt
+        self.keys = keys  # tuple of str
+        self.inputs = inputs  # context keys sent to the model; None: all (`using: [...]`)
+
+
+class ProcessGroup(Node):
+    """Consecutive process statements that do not read each other's keys."""
+    __slots__ = ("processes",)
+    opname = "process_group"
+
+    def __init__(self, processes):
+        self.processes = processes  # tuple of Process
+
+
+class Exec(Node):
+    __slots__ = ("cmd", "keys")
+    opname = "exec"
+
+    def __init__(self, cmd, keys):
+        self.cmd = cmd
+        self.keys = keys  # tuple of str
+
+
+class ExecGroup(Node):
+    """The exec statements of a `parallel { ... }` block."""
+    __slots__ = ("execs",)
+    opname = "exec_group"
+
+    def __init__(self, execs):
+        self.execs = execs  # tuple of Exec
+
+
+class Notify(Node):
+    __slots__ = ("target", "type", "payload")
+    opname = "notify"
+
+    def __init__(self, target, type, payload):
+        self.target = target
+        self.type = type
+        self.payload = payload
+
+
+class Wait(Node):
+    __slots__ = ("code_var", "msg_var", "source", "code_slot", "msg_slot")
+    opname = "wait"
+
+    def __init__(self, code_var, msg_var, source, code_slot=None, msg_slot=None):
+        self.code_var = code_var
+        self.msg_var = msg_var
+        self.source = source
+        self.code_slot = code_slot
+        self.msg_slot = msg_slot
+
+
+class Start(Node):
+    __slots__ = ("target",)
+    opname = "start"
+
+    def __init__(self, target):
+        self.target = target
+
+
+class Invoke(Node):
+    __slots__ = ("name", "args")
+    opname = "invoke"
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args  # tuple of (name, expression)
+
+
+class Success(Node):
+    __slots__ = ("code", "message")
+    opname = "success"
+
+    def __init__(self, code, message):
+        self.code = code
+        self.message = message
+
+
+class Fail(Node):
+    __slots__ = ("code", "message")
+    opname = "fail"
+
+    def __init__(self, code, message):
+        self.code = code
+        self.message = message
+
+
+STATEMENTS = (Block, VarDecl, SetVar, SetContext, If, While, Break, Say, Ask,
+              Process, ProcessGroup, Exec, ExecGroup, Notify, Wait, Start, Invoke, Success, Fail)
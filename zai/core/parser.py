@@ -1,4 +1,12 @@
+import hashlib
+import os
+import threading
+
+import lark
 from lark import Lark
+from lark.exceptions import UnexpectedInput
+
+from ..config import get_bool, get_str
 
 GRAMMAR = r"""
     start: (agent | context_def | persona_def | import_stmt)+
@@ -6,7 +14,7 @@ GRAMMAR = r"""
     agent: "agent" IDENTIFIER [agent_system_prompt] use_stmt* import_stmt* (context_def | persona_def)* skill_def+
 
     agent_system_prompt: "<<<" agent_sys_content ">>>"
-    agent_sys_content: /[^>]+/s
+    agent_sys_content: SYS_CONTENT
 
     use_stmt: "use" string
 
@@ -34,6 +42,7 @@ GRAMMAR = r"""
               | process_stmt
               | ask_stmt
               | exec_stmt
+              | parallel_stmt
               | notify_stmt
               | wait_stmt
               | start_stmt
@@ -52,11 +61,13 @@ GRAMMAR = r"""
     while_stmt: "while" condition block
     block: "{" statement* "}"
 
-    process_stmt: "process" expression [ "{" "extract" ":" "[" string ("," string)* "]" "}" ]
+    process_stmt: "process" expression [ "{" "extract" ":" "[" string ("," string)* "]" [","? process_inputs] "}" ]
+    process_inputs: "using" ":" "[" string ("," string)* "]"
     
     ask_stmt: "ask" string
     
     exec_stmt: "exec" simple_expression [ "{" "filter" ":" "[" string ("," string)* "]" "}" ]
+    parallel_stmt: "parallel" "{" exec_stmt* "}"
     
     notify_stmt: "notify" IDENTIFIER expression expression
     
@@ -99,6 +110,141 @@ GRAMMAR = r"""
 
     IDENTIFIER: /[a-zA-Z_][a-zA-Z0-9_]*/
     CONTEXT_DOT.10: "context."
+    SYS_CONTENT: /[^>]+/s
+    MULTILINE_STRING.2: /\"\"\"(.|\n)*?\"\"\"/
+    ESCAPED_STRING: /"([^"\\\r\n]|\\.)*"/
+    string: ESCAPED_STRING | MULTILINE_STRING
+    number: SIGNED_NUMBER
+
+    %import common.SIGNED_NUMBER
+    %import common.WS
+    %import common.CPP_COMMENT
+    %ignore WS
+    %ignore CPP_COMMENT
+"""
+
+# LALR(1) variant of GRAMMAR producing the same trees.
+#
+# The Earley grammar leans on ambiguity resolution in three places, which are
+# made explicit here:
+#   * binary_op is flattened to a left-recursive rule, giving the same
+#     left-associative, single-precedence trees Earley picks.
+#   * template_render (`name { args }`) cannot end a condition, because a
+#     condition is always followed by a "{" block (if/while/persona_if) or an
+#     optional `{ extract: ... }` (process).
+#   * persona_ref and context_var are told apart by the CONTEXT_DOT terminal,
+#     which outranks IDENTIFIER "." in the lexer.
+LALR_GRAMMAR = r"""
+    start: (agent | context_def | persona_def | import_stmt)+
+
+    agent: "agent" IDENTIFIER [agent_system_prompt] use_stmt* import_stmt* (context_def | persona_def)* skill_def+
+
+    agent_system_prompt: "<<<" agent_sys_content ">>>"
+    agent_sys_content: SYS_CONTENT
+
+    use_stmt: "use" string
+
+    import_stmt: "import" string
+
+    config_file: (context_def | persona_def | import_stmt)*
+
+    context_def: "context" IDENTIFIER "{" (context_item (","? context_item)*)? "}"
+    context_item: IDENTIFIER ":" expression
+
+    persona_def: "persona" IDENTIFIER "{" persona_item* "}"
+    persona_item: IDENTIFIER (":" expression | persona_block)
+    persona_block: "{" persona_fragment* "}"
+    ?persona_fragment: expression | persona_if
+    persona_if: "if" condition persona_block ["else" persona_block]
+
+    skill_def: "skill" IDENTIFIER "(" [params] ")" block
+    params: IDENTIFIER ("," IDENTIFIER)*
+
+    ?statement: var_decl
+              | assignment
+              | if_stmt
+              | while_stmt
+              | response_stmt
+              | process_stmt
+              | ask_stmt
+              | exec_stmt
+              | parallel_stmt
+              | notify_stmt
+              | wait_stmt
+              | start_stmt
+              | skill_invoke
+              | return_stmt
+              | break_stmt
+
+    start_stmt: "start" IDENTIFIER
+
+    var_decl: "var" IDENTIFIER "=" expression
+    assignment: target "=" expression
+    ?target: IDENTIFIER | context_var
+    context_var: CONTEXT_DOT IDENTIFIER
+
+    if_stmt: "if" condition block ["else" block]
+    while_stmt: "while" condition block
+    block: "{" statement* "}"
+
+    process_stmt: "process" condition [ "{" "extract" ":" "[" string ("," string)* "]" [","? process_inputs] "}" ]
+    process_inputs: "using" ":" "[" string ("," string)* "]"
+
+    ask_stmt: "ask" string
+
+    exec_stmt: "exec" simple_expression [ "{" "filter" ":" "[" string ("," string)* "]" "}" ]
+    parallel_stmt: "parallel" "{" exec_stmt* "}"
+
+    notify_stmt: "notify" IDENTIFIER expression expression
+
+    wait_stmt: "[" IDENTIFIER "," IDENTIFIER "]" "=" "wait" IDENTIFIER
+
+    skill_invoke: "invoke" IDENTIFIER "(" [args] ")"
+    args: assignment ("," assignment)*
+
+    return_stmt: success_stmt | fail_stmt
+    success_stmt: "success" expression expression
+    fail_stmt: "fail" expression expression
+
+    break_stmt: "break"
+
+    response_stmt: ("reply" | "say") expression
+
+    ?expression: binary_op
+               | operand
+
+    binary_op: expression OPERATOR operand
+
+    ?operand: simple_expression
+            | template_render
+            | context_var
+            | persona_ref
+
+    ?condition: condition OPERATOR condition_operand -> binary_op
+              | condition_operand
+
+    ?condition_operand: simple_expression
+                      | context_var
+                      | persona_ref
+
+    persona_ref: IDENTIFIER "." IDENTIFIER
+
+    ?simple_expression: string
+                      | number
+                      | boolean
+                      | IDENTIFIER
+                      | "(" expression ")"
+
+    boolean: "true" -> true
+           | "false" -> false
+
+    OPERATOR: "+" | "-" | "*" | "/" | "==" | "!=" | ">" | "<" | ">=" | "<=" | "&&" | "||"
+
+    template_render: IDENTIFIER "{" args "}"
+
+    IDENTIFIER: /[a-zA-Z_][a-zA-Z0-9_]*/
+    CONTEXT_DOT.10: "context."
+    SYS_CONTENT.2: /[^>]+/s
     MULTILINE_STRING.2: /\"\"\"(.|\n)*?\"\"\"/
     ESCAPED_STRING: /"([^"\\\r\n]|\\.)*"/
     string: ESCAPED_STRING | MULTILINE_STRING
@@ -111,5 +257,85 @@ GRAMMAR = r"""
     %ignore CPP_COMMENT
 """
 
-def get_parser():
-    return Lark(GRAMMAR, start=['start', 'agent', 'config_file', 'context_def', 'persona_def'], parser='earley')
+START_RULES = ['start', 'agent', 'config_file', 'context_def', 'persona_def']
+
+PARSER_MODES = ('lalr', 'earley')
+
+
+class FallbackParser:
+    """LALR parser that retries with Earley when the fast path rejects the input.
+
+    A few inputs only the ambiguous grammar accepts (e.g. a template_render used
+    as an `if` condition) still parse; genuine syntax errors are reported by
+    the Earley parser, as before.
+    """
+
+    def __init__(self, lalr, earley_factory):
+        self.lalr = lalr
+        self._earley_factory = earley_factory
+        self._earley = None
+
+    def parse(self, text, start=None):
+        try:
+            return self.lalr.parse(text, start=start)
+        except UnexpectedInput:
+            if self._earley is None:
+                self._earley = self._earley_factory()
+            return self._earley.parse(text, start=start)
+
+
+_parsers = {}
+_parsers_lock = threading.Lock()
+
+
+def cache_dir():
+    """Directory for zai's on-disk caches (ZAI_CACHE_DIR, default ~/.cache/zai)."""
+    return os.path.expanduser(get_str("ZAI_CACHE_DIR", "~/.cache/zai"))
+
+
+def grammar_cache_path(grammar, directory=None):
+    """Path of the serialized LALR tables for grammar, keyed by its hash."""
+    key = f"{lark.__version__}\0{grammar}".encode("utf-8")
+    digest = hashlib.sha256(key).hexdigest()[:16]
+    return os.path.join(directory or cache_dir(), f"grammar-{digest}.lark")
+
+
+def _build_earley():
+    return Lark(GRAMMAR, start=START_RULES, parser='earley')
+
+
+def _build_lalr(directory=None):
+    cache = False
+    if get_bool("ZAI_GRAMMAR_CACHE", True):
+        path = grammar_cache_path(LALR_GRAMMAR, directory)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cache = path
+        except OSError:
+            pass
+    return Lark(LALR_GRAMMAR, start=START_RULES, parser='lalr', cache=cache)
+
+
+def get_parser(mode=None):
+    """Return the process-wide parser for the zai grammar.
+
+    mode is 'lalr' (default, falls back to Earley on inputs it rejects) or
+    'earley'. When omitted it is read from ZAI_PARSER. Parsers are built once
+    per mode; the LALR tables are also serialized to cache_dir() so later
+    processes skip grammar compilation (disable with ZAI_GRAMMAR_CACHE=false).
+    """
+    mode = (mode or get_str("ZAI_PARSER", "lalr")).lower()
+    if mode not in PARSER_MODES:
+        raise ValueError(f"Unknown parser mode '{mode}', expected one of {PARSER_MODES}")
+    parser = _parsers.get(mode)
+    if parser is not None:
+        return parser
+    with _parsers_lock:
+        parser = _parsers.get(mode)
+        if parser is None:
+            if mode == 'earley':
+                parser = _build_earley()
+            else:
+                parser = FallbackParser(_build_lalr(), lambda: get_parser('earley'))
+            _parsers[mode] = parser
+    return parser
@@ -0,0 +1,144 @@
+"""
+Rendered system-prompt fragments, reused until something they read changes.
+
+build_system_prompt renders the agent's base prompt and every persona item
+on each `process`. PersonaCache renders a fragment once while recording its
+reads: the context keys it looked up (with the write version of each, see
+Environment.versions) and the variables it resolved by name (with the value
+found). The next render reuses the text as long as every recorded key still
+has the same version and every variable still resolves to the same object;
+a fragment that copied the whole context (a template render) is reused only
+while no context key at all has been written.
+
+Values changed in place, rather than reassigned, are not noticed; zai code
+only ever reassigns.
+"""
+
+from .environment import MISSING
+
+
+class Reads:
+    """What one fragment looked at while it was rendered."""
+    __slots__ = ("context", "names", "all_context", "version")
+
+    def __init__(self, version):
+        self.context = {}  # key -> write version seen
+        self.names = {}  # variable name -> value found (MISSING if unbound)
+        self.all_context = False
+        self.version = version  # Environment.version at render time
+
+    def empty(self):
+        return not (self.context or self.names or self.all_context)
+
+    def valid(self, root, env):
+        if self.all_context:
+            if root.version != self.version:
+                return False
+        else:
+            versions = root.versions
+            for key, version in self.context.items():
+                if versions.get(key, 0) != version:
+                    return False
+        for name, value in self.names.items():
+            if env.lookup(name) is not value:
+                return False
+        return True
+
+
+class _ContextView:
+    """Stands in for the interpreter's Environment while a fragment renders."""
+
+    def __init__(self, root, reads):
+        self._root = root
+        self._reads = reads
+
+    def get_context(self, name):
+        self._reads.context.setdefault(name, self._root.versions.get(name, 0))
+        return self._root.get_context(name)
+
+    @property
+    def context(self):
+        self._reads.all_context = True
+        return self._root.context
+
+    def lookup(self, name, default=MISSING):
+        value = self._root.lookup(name, default)
+        self._reads.names.setdefault(name, value)
+        return value
+
+    def get_var(self, name):
+        self.lookup(name)
+        return self._root.get_var(name)
+
+    def __getattr__(self, name):
+        return getattr(self._root, name)
+
+
+class _LocalView:
+    """Stands in for the skill's Frame while a fragment renders."""
+
+    def __init__(self, env, reads):
+        self._env = env
+        self._reads = reads
+
+    def lookup(self, name, default=MISSING):
+        value = self._env.lookup(name, MISSING)
+        self._reads.names.setdefault(name, value)
+        return default if value is MISSING else value
+
+    def get_var(self, name):
+        self.lookup(name)
+        return self._env.get_var(name)
+
+    def get_context(self, name):
+        return self._env.get_context(name)
+
+    def __getattr__(self, name):
+        return getattr(self._env, name)
+
+
+class PersonaCache:
+    def __init__(self):
+        self.entries = {}  # fragment -> (text, Reads)
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, interp, fragment, env, fn):
+        """fn(env) -> text for fragment, reused while its reads are unchanged."""
+        entry = self.entries.get(fragment)
+        if entry is not None and entry[1].valid(interp.env, env):
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        root = interp.env
+        reads = Reads(root.version)
+        # Closures read the context through interp.env; route them through the view
+        interp.env = _ContextView(root, reads)
+        try:
+            text = fn(_LocalView(env, reads))
+        finally:
+            interp.env = root
+        self.entries[fragment] = (text, reads)
+        return text
+
+    def is_static(self, fragment):
+        """The fragment's last render read no context or variables."""
+        entry = self.entries.get(fragment)
+        return entry is not None and entry[1].empty()
+
+    def reads_any(self, fragments, keys):
+        """Whether the last render of any of fragments read one of keys."""
+        for fragment in fragments:
+            entry = self.entries.get(fragment)
+            if entry is None:
+                continue
+            reads = entry[1]
+            if reads.all_context or not keys.isdisjoint(reads.context):
+                return True
+        return False
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
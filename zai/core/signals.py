@@ -0,0 +1,45 @@
+"""
+Control-flow signals returned by statement handlers.
+
+A handler returns None to fall through to the next statement, or a Signal
+to unwind: BREAK leaves the innermost while loop, a Result (success / fail)
+leaves the skill. Blocks only need an `is not None` check per statement.
+"""
+
+
+class Signal:
+    __slots__ = ()
+
+
+class Break(Signal):
+    __slots__ = ()
+
+    def __repr__(self):
+        return "BREAK"
+
+
+BREAK = Break()
+
+
+class Result(Signal):
+    """Outcome of a skill: `success` / `fail` statement or the implicit end."""
+    __slots__ = ("status", "code", "message")
+
+    def __init__(self, status, code, message):
+        self.status = status
+        self.code = code
+        self.message = message
+
+    @property
+    def failed(self):
+        return self.status == "fail"
+
+    def as_dict(self):
+        return {"status": self.status, "code": self.code, "message": self.message, "final": True}
+
+    def __repr__(self):
+        return f"Result({self.status!r}, {self.code!r}, {self.message!r})"
+
+
+# Returned when a skill body runs to completion
+SUCCESS = Result("success", 0, "OK")
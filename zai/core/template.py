@@ -0,0 +1,39 @@
+"""
+Precompiled {{ name }} templates.
+
+A template string is split once into static segments and variable slots and
+the result is kept in an LRU keyed by the template text, so the strings
+rendered on every say / ask / notify / process only pay for the lookups.
+Strings without "{{" never reach the cache.
+"""
+
+import re
+from functools import lru_cache
+
+PLACEHOLDER = re.compile(r"\{\{\s*([a-zA-Z0-9_]+)\s*\}\}")
+
+TEMPLATE_CACHE_SIZE = 1024
+
+
+class Template:
+    __slots__ = ("static", "names")
+
+    def __init__(self, static, names):
+        self.static = static  # len(names) + 1 literal segments
+        self.names = names
+
+    def render(self, resolve, env):
+        """Render with resolve(name, env) supplying each slot's text."""
+        static = self.static
+        out = [static[0]]
+        for i, name in enumerate(self.names, 1):
+            out.append(resolve(name, env))
+            out.append(static[i])
+        return "".join(out)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(text):
+    """Split text into a Template; cached by text."""
+    parts = PLACEHOLDER.split(text)
+    return Template(tuple(parts[0::2]), tuple(parts[1::2]))
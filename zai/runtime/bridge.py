@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 class BaseBridge(ABC):
@@ -10,7 +11,93 @@ class AIBridge(BaseBridge):
     def handle(self, prompt, extract_keys, system_prompt, context):
         pass
 
+    def handle_many(self, requests):
+        """handle() for each (prompt, extract_keys, system_prompt, context) tuple.
+
+        Results come back in request order. Bridges that can serve several
+        requests at once override this; the default runs them one by one.
+        """
+        return [self.handle(*request) for request in requests]
+
+    def handle_stream(self, prompt, extract_keys, system_prompt, context, on_key):
+        """handle(), calling on_key(key, value) as each extracted key completes.
+
+        Returns the same dict as handle(). The default reports every key
+        once the whole response is in.
+        """
+        result = self.handle(prompt, extract_keys, system_prompt, context)
+        for key, value in result.items():
+            on_key(key, value)
+        return result
+
 class ExecBridge(BaseBridge):
     @abstractmethod
     def handle(self, cmd, filter_keys):
         pass
+
+    def handle_many(self, requests):
+        """handle() for each (cmd, filter_keys) tuple, results in request order."""
+        return [self.handle(*request) for request in requests]
+
+    def handle_stream(self, cmd, filter_keys, on_line):
+        """handle(), calling on_line(stream, line) for each line of output.
+
+        The default reports stdout and stderr once the command has finished.
+        """
+        result = self.handle(cmd, filter_keys)
+        report_lines(result, on_line)
+        return result
+
+class AsyncAIBridge(BaseBridge):
+    """AIBridge for AsyncInterpreter: handle is a coroutine."""
+    @abstractmethod
+    async def handle(self, prompt, extract_keys, system_prompt, context):
+        pass
+
+    concurrency = 4  # requests handle_many keeps in flight
+
+    async def handle_many(self, requests):
+        """handle() for each request tuple, at most concurrency at a time."""
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def one(request):
+            async with limit:
+                return await self.handle(*request)
+        return await asyncio.gather(*(one(request) for request in requests))
+
+    async def handle_stream(self, prompt, extract_keys, system_prompt, context, on_key):
+        """handle(), calling on_key(key, value) as each extracted key completes."""
+        result = await self.handle(prompt, extract_keys, system_prompt, context)
+        for key, value in result.items():
+            on_key(key, value)
+        return result
+
+class AsyncExecBridge(BaseBridge):
+    """ExecBridge for AsyncInterpreter: handle is a coroutine."""
+    @abstractmethod
+    async def handle(self, cmd, filter_keys):
+        pass
+
+    concurrency = 4  # commands handle_many runs at once
+
+    async def handle_many(self, requests):
+        """handle() for each (cmd, filter_keys) tuple, at most concurrency at a time."""
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def one(request):
+            async with limit:
+                return await self.handle(*request)
+        return await asyncio.gather(*(one(request) for request in requests))
+
+    async def handle_stream(self, cmd, filter_keys, on_line):
+        """handle(), calling on_line(stream, line) for each line of output."""
+        result = await self.handle(cmd, filter_keys)
+        report_lines(result, on_line)
+        return result
+
+def report_lines(result, on_line):
+    for stream in ("stdout", "stderr"):
+        text = result.get(stream)
+        if isinstance(text, str):
+            for line in text.splitlines():
+                on_line(stream, line)
@@ -0,0 +1,157 @@
+"""
+Shell commands with a hard timeout, bounded output and line streaming.
+
+run_command / run_command_async start the command in its own session and
+read stdout and stderr as they are produced:
+
+  * on_line(stream, line) is called with each complete line ("stdout" or
+    "stderr", newline stripped), so output can be shown while the command
+    still runs;
+  * each stream keeps at most ZAI_EXEC_MAX_OUTPUT bytes (default 1 MiB):
+    the first and last halves, joined by a "[... N bytes truncated ...]"
+    marker, so neither a runaway log nor its final error line is lost;
+  * after ZAI_EXEC_TIMEOUT seconds (default 0: no limit) the whole process
+    group is killed and the result carries an "error" next to the output
+    collected so far.
+
+The result is the dict tools.bash has always returned: stdout, stderr, code.
+"""
+
+import asyncio
+import os
+import selectors
+import signal
+import subprocess
+import time
+
+from ..config import get_float, get_int
+
+READ_SIZE = 65536
+
+
+def exec_timeout(timeout=None):
+    """Seconds, or None for no limit."""
+    timeout = get_float("ZAI_EXEC_TIMEOUT", 0.0) if timeout is None else timeout
+    return timeout if timeout > 0 else None
+
+
+def max_output(limit=None):
+    return get_int("ZAI_EXEC_MAX_OUTPUT", 1 << 20) if limit is None else limit
+
+
+class OutputBuffer:
+    """One stream's output: head and tail halves of at most limit bytes."""
+
+    def __init__(self, name, limit, on_line=None):
+        self.name = name
+        self.limit = limit
+        self.on_line = on_line
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.dropped = 0
+        self._partial = b""  # bytes after the last newline, for on_line
+
+    def feed(self, data):
+        if self.on_line is not None:
+            *lines, self._partial = (self._partial + data).split(b"\n")
+            for line in lines:
+                self.on_line(self.name, line.decode(errors="replace"))
+        room = self.limit // 2 - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            excess = len(self.tail) - (self.limit - self.limit // 2)
+            if excess > 0:
+                del self.tail[:excess]
+                self.dropped += excess
+
+    def close(self):
+        if self.on_line is not None and self._partial:
+            self.on_line(self.name, self._partial.decode(errors="replace"))
+            self._partial = b""
+
+    def text(self):
+        if not self.dropped:
+            return (self.head + self.tail).decode(errors="replace")
+        return (self.head.decode(errors="replace")
+                + f"\n[... {self.dropped} bytes truncated ...]\n"
+                + self.tail.decode(errors="replace"))
+
+
+def _kill(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _result(stdout, stderr, code, timeout, timed_out):
+    stdout.close()
+    stderr.close()
+    result = {"stdout": stdout.text(), "stderr": stderr.text(), "code": code}
+    if timed_out:
+        result["error"] = f"Command timed out after {timeout:g}s"
+    return result
+
+
+def run_command(command, timeout=None, limit=None, on_line=None, cwd=None, env=None):
+    timeout, limit = exec_timeout(timeout), max_output(limit)
+    proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            cwd=cwd, env=env, start_new_session=True)
+    buffers = {proc.stdout: OutputBuffer("stdout", limit, on_line),
+               proc.stderr: OutputBuffer("stderr", limit, on_line)}
+    deadline = None if timeout is None else time.monotonic() + timeout
+    timed_out = False
+    with selectors.DefaultSelector() as selector:
+        for pipe in buffers:
+            selector.register(pipe, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                timed_out = True
+                _kill(proc)
+                break
+            for key, _ in selector.select(remaining):
+                data = os.read(key.fd, READ_SIZE)
+                if data:
+                    buffers[key.fileobj].feed(data)
+                else:
+                    selector.unregister(key.fileobj)
+    for pipe in buffers:
+        pipe.close()
+    # Output is closed; the shell may still be reaping a background child
+    try:
+        code = proc.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        _kill(proc)
+        code = proc.wait()
+    return _result(buffers[proc.stdout], buffers[proc.stderr], code, timeout, timed_out)
+
+
+async def run_command_async(command, timeout=None, limit=None, on_line=None, cwd=None, env=None):
+    timeout, limit = exec_timeout(timeout), max_output(limit)
+    proc = await asyncio.create_subprocess_shell(
+        command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        cwd=cwd, env=env, start_new_session=True)
+    stdout = OutputBuffer("stdout", limit, on_line)
+    stderr = OutputBuffer("stderr", limit, on_line)
+
+    async def pump(reader, buffer):
+        while data := await reader.read(READ_SIZE):
+            buffer.feed(data)
+
+    async def finish():
+        await asyncio.gather(pump(proc.stdout, stdout), pump(proc.stderr, stderr))
+        return await proc.wait()
+
+    timed_out = False
+    try:
+        code = await asyncio.wait_for(finish(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        _kill(proc)
+        code = await proc.wait()
+    return _result(stdout, stderr, code, timeout, timed_out)
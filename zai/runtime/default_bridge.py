@@ -1,42 +1,221 @@
 import json
-from openai import OpenAI
-from .bridge import AIBridge, ExecBridge
+import shlex
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import openai
+from openai import OpenAI, AsyncOpenAI
+from .bridge import AIBridge, ExecBridge, AsyncAIBridge, AsyncExecBridge, report_lines
+from .command import run_command_async
+from .http import get_async_client, get_client
+from .json_stream import JsonObjectStream
+from .prompt import TokenUsage, build_messages
+from .resilience import CallPolicy
+from .response_cache import cache_key, cacheable, open_response_cache
+from .shell_pool import get_pool, pool_enabled
 from ..builtin import tools
-from ..config import get_str, get_float
+from ..config import get_str, get_float, get_int
+
+# A reply that is not a JSON object is asked for again this many times
+MALFORMED_RETRIES = 1
 
 class DefaultAIBridge(AIBridge):
-    def __init__(self, api_key=None, base_url=None):
-        self.api_key = api_key or get_str("ZAI_API_KEY")
-        self.base_url = base_url or get_str("ZAI_BASE_URL")
-        self.model = get_str("ZAI_MODEL", "deepseek-reasoner")
-        self.temperature = get_float("ZAI_TEMPERATURE", 0.0)
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+    def __init__(self, api_key=None, base_url=None, concurrency=None, cache=None, http_client=None, policy=None):
+        configure(self, api_key, base_url, concurrency, cache, policy)
+        # Shares the runtime's connection pool with fetch and the other bridges;
+        # retries are left to the policy
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                             http_client=http_client or get_client())
+        self._pool = None  # created by the first handle_many
 
         print(f"[DefaultAIBridge] API_KEY: {self.api_key}  ; BASE_URL: {self.base_url} ; TEMPERATURE: {self.temperature}")
 
     def handle(self, prompt, extract_keys, system_prompt, context):
         # print(f"[DefaultAIBridge] {prompt=} {extract_keys=} {system_prompt=} {context=}")
-        # Format the context for the AI
-        context_str = json.dumps(context, indent=2, ensure_ascii=False)
-        full_prompt = f"Context:\n{context_str}\n\nTask: {prompt}\n\nPlease return a JSON object with the following keys: {', '.join(extract_keys)}"
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": full_prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-
-        try:
-            result = json.loads(response.choices[0].message.content)
-            return {k: result.get(k) for k in extract_keys}
-        except (ValueError, KeyError, json.JSONDecodeError) as e:
-            print(f"ERROR: Failed to parse AI response: {e}")
-            return {k: None for k in extract_keys}
+        key, cached = cache_lookup(self, prompt, extract_keys, system_prompt, context)
+        if cached is not None:
+            return cached
+        messages = build_messages(prompt, extract_keys, system_prompt, context)
+        for _ in range(MALFORMED_RETRIES + 1):
+            response = self.policy.run(lambda timeout: create(self, messages, timeout))
+            result = accept(self, key, messages, response, extract_keys)
+            if result is not None:
+                return result
+        return {k: None for k in extract_keys}
+
+    def handle_stream(self, prompt, extract_keys, system_prompt, context, on_key):
+        """Stream the completion, reporting extracted keys as they complete."""
+        key, cached = cache_lookup(self, prompt, extract_keys, system_prompt, context)
+        if cached is not None:
+            return replay(cached, on_key)
+        messages = build_messages(prompt, extract_keys, system_prompt, context)
+        # Opening the stream is retried; keys already reported are not re-sent
+        stream = self.policy.run(lambda timeout: create(self, messages, timeout, stream=True), hedge=False)
+        parser = JsonObjectStream()
+        for chunk in stream:
+            report(parser.feed(chunk_text(chunk)), extract_keys, on_key)
+        return accept_stream(self, key, messages, parser, extract_keys)
+
+    def handle_many(self, requests):
+        """Send the requests over at most concurrency threads sharing one client."""
+        if len(requests) < 2 or self.concurrency == 1:
+            return super().handle_many(requests)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix="zai-ai")
+        futures = [self._pool.submit(self.handle, *request) for request in requests]
+        return [future.result() for future in futures]
+
+class DefaultAsyncAIBridge(AsyncAIBridge):
+    def __init__(self, api_key=None, base_url=None, concurrency=None, cache=None, policy=None):
+        configure(self, api_key, base_url, concurrency, cache, policy)
+        self._clients = weakref.WeakKeyDictionary()  # event loop -> AsyncOpenAI
+
+    @property
+    def client(self):
+        """AsyncOpenAI on the running loop's pooled client, made on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, max_retries=0, http_client=get_async_client())
+        return client
+
+    async def handle(self, prompt, extract_keys, system_prompt, context):
+        key, cached = cache_lookup(self, prompt, extract_keys, system_prompt, context)
+        if cached is not None:
+            return cached
+        messages = build_messages(prompt, extract_keys, system_prompt, context)
+        for _ in range(MALFORMED_RETRIES + 1):
+            response = await self.policy.run_async(lambda timeout: create(self, messages, timeout))
+            result = accept(self, key, messages, response, extract_keys)
+            if result is not None:
+                return result
+        return {k: None for k in extract_keys}
+
+    async def handle_stream(self, prompt, extract_keys, system_prompt, context, on_key):
+        key, cached = cache_lookup(self, prompt, extract_keys, system_prompt, context)
+        if cached is not None:
+            return replay(cached, on_key)
+        messages = build_messages(prompt, extract_keys, system_prompt, context)
+        stream = await self.policy.run_async(lambda timeout: create(self, messages, timeout, stream=True), hedge=False)
+        parser = JsonObjectStream()
+        async for chunk in stream:
+            report(parser.feed(chunk_text(chunk)), extract_keys, on_key)
+        return accept_stream(self, key, messages, parser, extract_keys)
+
+def configure(bridge, api_key, base_url, concurrency, cache, policy):
+    """Settings, response cache, usage and call policy shared by the AI bridges."""
+    bridge.api_key = api_key or get_str("ZAI_API_KEY")
+    bridge.base_url = base_url or get_str("ZAI_BASE_URL")
+    bridge.model = get_str("ZAI_MODEL", "deepseek-reasoner")
+    bridge.temperature = get_float("ZAI_TEMPERATURE", 0.0)
+    bridge.concurrency = max(1, concurrency or get_int("ZAI_AI_CONCURRENCY", 4))
+    # None: follow ZAI_AI_CACHE; False: no cache
+    bridge.cache = open_response_cache() if cache is None else (None if cache is False else cache)
+    bridge.usage = TokenUsage()
+    bridge.policy = policy or call_policy(bridge.base_url)
+    bridge.metrics = bridge.policy.metrics
+
+def create(bridge, messages, timeout, **kwargs):
+    """Start a JSON-object completion on the bridge's client (a coroutine for the async one)."""
+    return bridge.client.chat.completions.create(
+        model=bridge.model,
+        messages=messages,
+        response_format={"type": "json_object"},
+        timeout=timeout,
+        **kwargs
+    )
+
+def accept(bridge, key, messages, response, extract_keys):
+    """Record and cache a completion; None when it has to be asked for again."""
+    bridge.usage.record(messages, getattr(response, "usage", None), response_text(response))
+    result = parse_response(response, extract_keys)
+    if result is None:
+        bridge.metrics.count("malformed")
+    else:
+        cache_store(bridge, key, result)
+    return result
+
+def accept_stream(bridge, key, messages, parser, extract_keys):
+    bridge.usage.record(messages, completion=parser.text)
+    result = stream_result(parser, extract_keys)
+    cache_store(bridge, key, result)
+    return result
+
+def call_policy(base_url):
+    """CallPolicy from config; agents on the same endpoint share its rate limit."""
+    return CallPolicy.from_config(f"ai:{base_url or 'default'}", retryable=retryable, retry_after=retry_after)
+
+def retryable(exc):
+    """Timeouts, dropped connections, 429s and 5xx are worth another attempt."""
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code in (408, 409)
+
+def retry_after(exc):
+    """Seconds from the Retry-After header of a failed response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    try:
+        return float(headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def cache_lookup(bridge, prompt, extract_keys, system_prompt, context):
+    """(cache key, cached result); (None, None) when the bridge has no cache."""
+    if bridge.cache is None:
+        return None, None
+    key = cache_key(bridge.model, bridge.temperature, prompt, extract_keys, system_prompt, context)
+    return key, bridge.cache.get(key)
+
+def cache_store(bridge, key, result):
+    if key is not None and cacheable(result):
+        bridge.cache.put(key, result)
+
+def replay(result, on_key):
+    for k, v in result.items():
+        on_key(k, v)
+    return result
+
+def chunk_text(chunk):
+    # The final chunk of some providers only carries usage
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+def report(members, extract_keys, on_key):
+    for k, v in members:
+        if k in extract_keys:
+            on_key(k, v)
+
+def stream_result(parser, extract_keys):
+    values = parser.result()
+    if values is None:
+        print(f"ERROR: Failed to parse streamed AI response: {parser.text[:200]!r}")
+        return {k: None for k in extract_keys}
+    return {k: values.get(k) for k in extract_keys}
+
+def response_text(response):
+    try:
+        content = response.choices[0].message.content
+    except (AttributeError, IndexError):
+        return ""
+    return content if isinstance(content, str) else ""
+
+def parse_response(response, extract_keys):
+    """The extracted keys, or None when the reply is not a JSON object."""
+    try:
+        result = json.loads(response.choices[0].message.content)
+        return {k: result.get(k) for k in extract_keys}
+    except (ValueError, KeyError, TypeError, AttributeError, json.JSONDecodeError) as e:
+        print(f"ERROR: Failed to parse AI response: {e}")
+        return None
 
 class DefaultExecBridge(ExecBridge):
+    def __init__(self, concurrency=None):
+        self.concurrency = max(1, concurrency or get_int("ZAI_EXEC_CONCURRENCY", 4))
+        self._pool = None  # created by the first handle_many
+
     def handle(self, cmd, filter_keys):
         # cmd is expected to be a string or a dict-like structured command
         # For simple string commands, we use the bash tool.
@@ -47,30 +226,87 @@ class DefaultExecBridge(ExecBridge):
         # Otherwise, if we can parse it as a tool call, use that.
         
         # For now, let's treat cmd as a bash command unless it matches a builtin tool name.
-        parts = cmd.split(maxsplit=1)
-        tool_name = parts[0]
-        args_str = parts[1] if len(parts) > 1 else ""
-        
-        result = {}
-        if hasattr(tools, tool_name):
-            # Attempt to execute as a builtin tool
-            # This is a bit simplified; real Zai might pass structured args.
-            # Here we assume bash-like space-separated arguments for simplicity.
-            # Or if it's 'ls .', it calls tools.ls('.')
-            try:
-                import shlex
-                args = shlex.split(args_str)
-                func = getattr(tools, tool_name)
-                # Call function with positional arguments
-                result = func(*args)
-            except Exception as e:
-                result = {"error": f"Tool '{tool_name}' failed: {e}"}
+        tool = resolve_tool(cmd)
+        if tool is not None:
+            result = run_tool(*tool)
         else:
             # Fallback to bash
             result = tools.bash(cmd)
-            
-        # Apply filter keys
-        if not filter_keys:
-            return result
-            
-        return {k: result.get(k) for k in filter_keys if k in result}
+        return filter_result(result, filter_keys)
+
+    def handle_stream(self, cmd, filter_keys, on_line):
+        """Shell commands report each output line as it is written."""
+        tool = resolve_tool(cmd)
+        if tool is not None:
+            result = run_tool(*tool)
+            report_lines(result, on_line)
+        else:
+            result = tools.bash(cmd, on_line=on_line)
+        return filter_result(result, filter_keys)
+
+    def handle_many(self, requests):
+        """Run the commands on at most concurrency threads."""
+        if len(requests) < 2 or self.concurrency == 1:
+            return super().handle_many(requests)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix="zai-exec")
+        futures = [self._pool.submit(self.handle, *request) for request in requests]
+        return [future.result() for future in futures]
+
+class DefaultAsyncExecBridge(AsyncExecBridge):
+    """Builtin tools run in a worker thread; shell commands as asyncio subprocesses."""
+    def __init__(self, concurrency=None):
+        self.concurrency = max(1, concurrency or get_int("ZAI_EXEC_CONCURRENCY", 4))
+
+    async def handle(self, cmd, filter_keys):
+        tool = resolve_tool(cmd)
+        if tool is not None:
+            result = await asyncio.to_thread(run_tool, *tool)
+        else:
+            result = await bash(cmd)
+        return filter_result(result, filter_keys)
+
+    async def handle_stream(self, cmd, filter_keys, on_line):
+        tool = resolve_tool(cmd)
+        if tool is not None:
+            result = await asyncio.to_thread(run_tool, *tool)
+            report_lines(result, on_line)
+        else:
+            result = await bash(cmd, on_line)
+        return filter_result(result, filter_keys)
+
+def resolve_tool(cmd):
+    """(tool name, args string) if cmd names a builtin tool, else None."""
+    parts = cmd.split(maxsplit=1)
+    tool_name = parts[0]
+    if not hasattr(tools, tool_name):
+        return None
+    return tool_name, (parts[1] if len(parts) > 1 else "")
+
+def run_tool(tool_name, args_str):
+    # This is a bit simplified; real Zai might pass structured args.
+    # Here we assume bash-like space-separated arguments for simplicity.
+    # Or if it's 'ls .', it calls tools.ls('.')
+    try:
+        args = shlex.split(args_str)
+        func = getattr(tools, tool_name)
+        # Call function with positional arguments
+        return func(*args)
+    except Exception as e:
+        return {"error": f"Tool '{tool_name}' failed: {e}"}
+
+async def bash(command, on_line=None):
+    """tools.bash without blocking the event loop."""
+    if pool_enabled():
+        return await asyncio.to_thread(get_pool().run, command, on_line=on_line)
+    try:
+        return await run_command_async(command, on_line=on_line)
+    except Exception as e:
+        return {"error": str(e)}
+
+def filter_result(result, filter_keys):
+    # Apply filter keys
+    if not filter_keys:
+        return result
+
+    return {k: result.get(k) for k in filter_keys if k in result}
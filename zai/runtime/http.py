@@ -0,0 +1,100 @@
+"""
+Pooled HTTP clients shared by the whole runtime.
+
+The AI bridges hand these to the OpenAI SDK and the `fetch` builtin sends
+its requests through them, so connections (and their TLS sessions) are kept
+alive and reused across process statements and tool calls instead of being
+set up per call.
+
+There is one synchronous client per process and one async client per event
+loop (an httpx AsyncClient cannot move between loops). Settings come from
+zai.config:
+
+    ZAI_HTTP_MAX_CONNECTIONS     pool size (default 20)
+    ZAI_HTTP_KEEPALIVE           idle connections kept open (default 10)
+    ZAI_HTTP_KEEPALIVE_EXPIRY    seconds an idle connection is kept (default 30)
+    ZAI_HTTP2                    auto (default: when h2 is installed), on
+                                 (an error without h2), off
+    ZAI_HTTP_TIMEOUT             seconds, for fetch (default 30); the OpenAI
+                                 SDK sets its own per request
+"""
+
+import asyncio
+import importlib.util
+import threading
+import weakref
+
+try:
+    import httpx
+except ImportError:  # openai releases built on the httpx2 fork
+    import httpx2 as httpx
+
+from ..config import get_float, get_int, get_str
+
+HTTP2_MODES = ("auto", "on", "off")
+
+_lock = threading.Lock()
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncClient
+
+
+def http2_enabled(mode=None):
+    mode = (mode or get_str("ZAI_HTTP2", "auto")).lower()
+    if mode not in HTTP2_MODES:
+        raise ValueError(f"Unknown ZAI_HTTP2 '{mode}', expected one of {', '.join(HTTP2_MODES)}")
+    if mode == "off":
+        return False
+    available = importlib.util.find_spec("h2") is not None
+    if mode == "on" and not available:
+        raise ValueError("ZAI_HTTP2=on needs the h2 package: pip install 'zai[http2]'")
+    return available
+
+
+def client_options():
+    """Keyword arguments shared by the sync and async clients."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=get_int("ZAI_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=get_int("ZAI_HTTP_KEEPALIVE", 10),
+            keepalive_expiry=get_float("ZAI_HTTP_KEEPALIVE_EXPIRY", 30.0),
+        ),
+        "http2": http2_enabled(),
+        "timeout": get_float("ZAI_HTTP_TIMEOUT", 30.0),
+        "follow_redirects": True,
+    }
+
+
+def get_client():
+    """The process-wide pooled httpx.Client."""
+    global _client
+    with _lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(**client_options())
+        return _client
+
+
+def get_async_client():
+    """The pooled httpx.AsyncClient of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = _async_clients[loop] = httpx.AsyncClient(**client_options())
+        return client
+
+
+def close_clients():
+    """Close the sync client; async ones are closed with aclose_client()."""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+async def aclose_client():
+    """Close the running loop's async client."""
+    with _lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
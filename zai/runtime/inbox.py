@@ -0,0 +1,168 @@
+"""
+Wake-ups for `wait`: block until something lands in an agent's inbox.
+
+InotifyWatcher (Linux) sleeps on an inotify descriptor, so a wait resumes as
+soon as a message file is closed or renamed into the inbox. PollingWatcher is
+the portable fallback and simply sleeps for the poll interval. Either way the
+caller rescans the inbox after every wake-up; a watcher only says "look now".
+changed() asks the same without blocking, so a caller can skip a rescan.
+
+ZAI_INBOX_WATCHER selects the implementation: auto (default), inotify, poll.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from ..config import get_str
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; followed by len bytes of name
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+
+WATCHER_MODES = ("auto", "inotify", "poll")
+
+_libc = None
+
+
+def _inotify():
+    global _libc
+    if _libc is None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc = libc
+    return _libc
+
+
+class PollingWatcher:
+    """Wakes up every poll_interval seconds."""
+
+    def __init__(self, path, poll_interval=0.5):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.alive = True
+
+    def changed(self):
+        """Cannot tell without looking: always True."""
+        return True
+
+    def wait(self, timeout):
+        time.sleep(max(0, min(self.poll_interval, timeout)))
+        return True
+
+    async def wait_async(self, timeout):
+        await asyncio.sleep(max(0, min(self.poll_interval, timeout)))
+        return True
+
+    def close(self):
+        self.alive = False
+
+
+class InotifyWatcher:
+    """Wakes up when a file is written or moved into path.
+
+    The watch stays registered between waits, so a message that arrives
+    while the caller is scanning is still reported by the next wait.
+    alive turns False when the directory itself goes away; open a new
+    watcher once it has been recreated.
+    """
+
+    def __init__(self, path):
+        libc = _inotify()
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        if libc.inotify_add_watch(fd, os.fsencode(path), _WATCH_MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, os.strerror(err), path)
+        self.path = path
+        self.fd = fd
+        self.alive = True
+
+    def _drain(self):
+        """Consume queued events; return True if there were any."""
+        seen = False
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return seen
+            if not data:
+                return seen
+            seen = True
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, offset)
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    self.alive = False
+                offset += _EVENT.size + length
+
+    def changed(self):
+        """Whether the inbox changed since the last wait or changed(), without
+        blocking."""
+        return self._drain()
+
+    def wait(self, timeout):
+        """Block up to timeout seconds; True if the inbox changed."""
+        if self._drain():
+            return True
+        readable, _, _ = select.select([self.fd], [], [], max(0, timeout))
+        return self._drain() if readable else False
+
+    async def wait_async(self, timeout):
+        if self._drain():
+            return True
+        return await wait_readable([self.fd], timeout) and self._drain()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        self.alive = False
+
+    def __del__(self):
+        if getattr(self, "fd", None) is not None:
+            self.close()
+
+
+async def wait_readable(fds, timeout):
+    """Suspend until one of fds is readable; False on timeout."""
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    for fd in fds:
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+    try:
+        await asyncio.wait_for(ready, max(0, timeout))
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        for fd in fds:
+            loop.remove_reader(fd)
+    return True
+
+
+def open_watcher(path, mode=None, poll_interval=0.5):
+    """Watcher for directory path; mode defaults to ZAI_INBOX_WATCHER."""
+    mode = (mode or get_str("ZAI_INBOX_WATCHER", "auto")).lower()
+    if mode not in WATCHER_MODES:
+        raise ValueError(f"Unknown inbox watcher '{mode}', expected one of {', '.join(WATCHER_MODES)}")
+    if mode != "poll":
+        try:
+            return InotifyWatcher(path)
+        except (OSError, AttributeError, TypeError):
+            # No inotify here (non-Linux libc, or out of instances)
+            if mode == "inotify":
+                raise
+    return PollingWatcher(path, poll_interval)
@@ -0,0 +1,110 @@
+"""
+Incremental parsing of the JSON object a streamed completion returns.
+
+The model's reply arrives in arbitrary pieces. JsonObjectStream scans each
+piece once, tracking string / escape state and nesting depth, and hands back
+every top-level member as soon as the comma or closing brace after it has
+arrived, so a caller can act on the first key while the rest is still being
+generated. Text before the opening brace (a ```json fence, say) and after
+the closing one is ignored.
+"""
+
+import json
+
+
+class JsonObjectStream:
+    def __init__(self):
+        self.values = {}  # members completed so far, in arrival order
+        self.done = False  # the closing brace has arrived
+        self._pieces = []  # the reply so far, joined only when asked for
+        self._text = None  # cached join of _pieces
+        self._length = 0  # characters fed before the current piece
+        self._start = None  # offset of the opening brace in the reply
+        self._member = []  # pieces of the current top-level member
+        self._malformed = False  # a member did not parse on its own
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def text(self):
+        """The reply received so far."""
+        if self._text is None:
+            self._text = "".join(self._pieces)
+        return self._text
+
+    def feed(self, piece):
+        """Add piece of the reply; return [(key, value)] completed by it."""
+        if self.done or not piece:
+            return []
+        self._pieces.append(piece)
+        self._text = None
+        offset, self._length = self._length, self._length + len(piece)
+        completed = []
+        pos = 0
+        depth, in_string, escape = self._depth, self._in_string, self._escape
+
+        if self._start is None:
+            brace = piece.find("{")
+            if brace < 0:
+                return []
+            self._start = offset + brace
+            pos = brace + 1
+            depth = 1
+        begin = pos  # where the current member resumes in this piece
+
+        while pos < len(piece):
+            ch = piece[pos]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                depth += 1
+            elif ch in "}]":
+                depth -= 1
+                if depth == 0:
+                    self._complete(piece[begin:pos], completed)
+                    self.done = True
+                    break
+            elif ch == "," and depth == 1:
+                self._complete(piece[begin:pos], completed)
+                begin = pos + 1
+            pos += 1
+        else:
+            self._member.append(piece[begin:])
+
+        self._depth, self._in_string, self._escape = depth, in_string, escape
+        return completed
+
+    def _complete(self, tail, completed):
+        self._member.append(tail)
+        member = "".join(self._member)
+        self._member = []
+        if not member.strip():
+            return
+        try:
+            item = json.loads("{" + member + "}")
+        except ValueError:
+            self._malformed = True  # result() re-parses the whole text
+            return
+        for key, value in item.items():
+            self.values[key] = value
+            completed.append((key, value))
+
+    def result(self):
+        """The whole object, or None when the reply held no valid one."""
+        if self.done and not self._malformed:
+            return self.values
+        if self._start is None:
+            return None
+        try:
+            value, _ = json.JSONDecoder().raw_decode(self.text, self._start)
+        except ValueError:
+            return None
+        return value if isinstance(value, dict) else None
@@ -0,0 +1,186 @@
+"""
+What a `process` call sends to the model, and how big it is.
+
+The context goes out as compact JSON. A process statement may name the
+context keys it needs (`using: [...]`); otherwise ZAI_CONTEXT_SELECT picks:
+
+    all   every context key (default)
+    auto  small values always; values whose JSON exceeds ZAI_CONTEXT_LARGE
+          characters (default 1024) only when the prompt or system prompt
+          mentions their key
+
+Providers cache the processed prefix of a prompt, so messages are laid out
+most-stable first: the static part of the system prompt (SystemPrompt.static:
+the agent prompt and persona items that read no state), the state-dependent
+persona items, the context (keys keep their insertion order, so it mostly
+grows at the end), and last the task and the keys to extract.
+
+TokenUsage keeps prompt size and token counts per call. Counts come from
+the response's usage when the provider reports it, else ~4 characters per
+token; ZAI_TOKEN_LOG=1 prints a line per call. Its PrefixStats measures how
+much of each prompt repeats the start of a recent one.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import deque
+
+from ..config import get_bool, get_int, get_str
+
+SELECT_MODES = ("all", "auto")
+
+
+class SystemPrompt(str):
+    """System prompt text that knows which leading part is static."""
+
+    def __new__(cls, text, static=""):
+        prompt = super().__new__(cls, text)
+        prompt.static = static  # a prefix of text
+        return prompt
+
+
+def serialize_context(context):
+    return json.dumps(context, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def build_messages(prompt, extract_keys, system_prompt, context):
+    # Format the context for the AI
+    context_str = serialize_context(context)
+    full_prompt = f"Context:\n{context_str}\n\nTask: {prompt}\n\nPlease return a JSON object with the following keys: {', '.join(extract_keys)}"
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": full_prompt}
+    ]
+
+
+def select_context(context, inputs=None, mentions=(), mode=None, large=None):
+    """The part of context a process call sends.
+
+    inputs are the keys a statement declared with `using`; without them
+    mode (default ZAI_CONTEXT_SELECT) decides, and in auto mode a large
+    value is only kept when one of the mentions texts names its key.
+    """
+    if inputs is not None:
+        return {k: context[k] for k in inputs if k in context}
+    mode = (mode or get_str("ZAI_CONTEXT_SELECT", "all")).lower()
+    if mode not in SELECT_MODES:
+        raise ValueError(f"Unknown context selection '{mode}', expected one of {', '.join(SELECT_MODES)}")
+    if mode == "all":
+        return context
+    large = get_int("ZAI_CONTEXT_LARGE", 1024) if large is None else large
+    text = "\n".join(str(m) for m in mentions if m)
+    selected = {}
+    for key, value in context.items():
+        if len(serialize_context(value)) <= large or re.search(rf"\b{re.escape(key)}\b", text):
+            selected[key] = value
+    return selected
+
+
+def common_prefix(a, b, step=256):
+    """Length of the longest common prefix of a and b."""
+    # Chunk comparisons run in C and copy at most step characters each; only
+    # the first chunk that differs is walked character by character
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i:i + step] == b[i:i + step]:
+        i += step
+    if i >= n:
+        return n
+    return i + len(os.path.commonprefix([a[i:i + step], b[i:i + step]]))
+
+
+class PrefixStats:
+    """How much of each prompt a provider-side prefix cache could reuse.
+
+    A prompt's reusable part is its longest common prefix with one of the
+    `window` prompts before it; cached_tokens adds up what the provider says
+    it actually served from cache, when it says.
+    """
+
+    def __init__(self, window=16):
+        self.window = deque(maxlen=window)
+        self.calls = 0
+        self.prompt_chars = 0
+        self.reused_chars = 0
+        self.static_chars = 0
+        self.cached_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, messages, cached_tokens=None):
+        """Account for one prompt; the characters it shares with a recent one."""
+        text = "".join(f"{m['role']}\0{m['content']}\0" for m in messages)
+        static = sum(len(getattr(m["content"], "static", "")) for m in messages)
+        with self._lock:
+            reused = max((common_prefix(text, earlier) for earlier in self.window), default=0)
+            self.window.append(text)
+            self.calls += 1
+            self.prompt_chars += len(text)
+            self.reused_chars += reused
+            self.static_chars += static
+            self.cached_tokens += cached_tokens or 0
+        return reused
+
+    def report(self):
+        return {
+            "calls": self.calls,
+            "prompt_chars": self.prompt_chars,
+            "reused_chars": self.reused_chars,
+            "reuse_ratio": round(self.reused_chars / self.prompt_chars, 3) if self.prompt_chars else 0.0,
+            "static_chars": self.static_chars,
+            "cached_tokens": self.cached_tokens,
+        }
+
+
+def estimate_tokens(chars):
+    return (chars + 3) // 4
+
+
+def _count(usage, name):
+    value = getattr(usage, name, None)
+    return value if isinstance(value, int) else None
+
+
+class TokenUsage:
+    """Prompt size and token counts of the model calls made by one bridge."""
+
+    def __init__(self, log=None, keep=1000):
+        self.log = get_bool("ZAI_TOKEN_LOG", False) if log is None else log
+        self.recent = deque(maxlen=keep)  # latest calls, oldest first
+        self.calls = 0
+        self.prompt_chars = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.prefix = PrefixStats()
+        self._lock = threading.Lock()  # handle_many records from worker threads
+
+    def record(self, messages, usage=None, completion=""):
+        """Account for one call; usage is the response's usage object, if any."""
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        prompt_tokens = _count(usage, "prompt_tokens")
+        completion_tokens = _count(usage, "completion_tokens")
+        details = getattr(usage, "prompt_tokens_details", None)
+        reused = self.prefix.record(messages, _count(details, "cached_tokens"))
+        call = {
+            "prompt_chars": prompt_chars,
+            "prompt_tokens": estimate_tokens(prompt_chars) if prompt_tokens is None else prompt_tokens,
+            "completion_tokens": estimate_tokens(len(completion)) if completion_tokens is None else completion_tokens,
+            "estimated": prompt_tokens is None,
+        }
+        with self._lock:
+            self.recent.append(call)
+            self.calls += 1
+            self.prompt_chars += prompt_chars
+            self.prompt_tokens += call["prompt_tokens"]
+            self.completion_tokens += call["completion_tokens"]
+        if self.log:
+            approx = "~" if call["estimated"] else ""
+            print(f"[tokens] prompt {prompt_chars} chars, {approx}{call['prompt_tokens']} tokens; "
+                  f"completion {approx}{call['completion_tokens']} tokens; "
+                  f"prefix reused {reused} chars", flush=True)
+        return call
+
+    def totals(self):
+        return {"calls": self.calls, "prompt_chars": self.prompt_chars,
+                "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
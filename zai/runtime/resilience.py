@@ -0,0 +1,292 @@
+"""
+Timeouts, retries, rate limiting and hedging for model calls.
+
+CallPolicy runs one logical call as a series of attempts:
+
+  * every attempt first takes a token from a TokenBucket, so agents sharing
+    a bucket stay under the provider's request rate;
+  * an attempt gets `timeout` seconds; failures the caller marks retryable
+    are retried after exponential backoff with full jitter (or the server's
+    Retry-After), up to `retries` times;
+  * with hedging on, an attempt still running after the hedge percentile of
+    recent latencies gets a duplicate; whichever finishes first wins. The
+    duplicate needs a token that is available right away; without one the
+    attempt is simply awaited, so hedging never goes over the rate limit.
+
+CallMetrics counts all of it. Settings come from zai.config:
+
+    ZAI_AI_TIMEOUT              seconds per attempt (default 120)
+    ZAI_AI_RETRIES              retries after the first attempt (default 3)
+    ZAI_AI_BACKOFF              first backoff in seconds (default 0.5)
+    ZAI_AI_BACKOFF_MAX          backoff cap in seconds (default 30)
+    ZAI_AI_RATE                 requests per second, 0 for no limit (default 0)
+    ZAI_AI_BURST                bucket size (default: max(1, rate))
+    ZAI_AI_HEDGE_PERCENTILE     e.g. 95; 0 turns hedging off (default 0)
+    ZAI_AI_HEDGE_MIN_SAMPLES    latencies needed before hedging (default 20)
+"""
+
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ..config import get_float, get_int
+
+
+class TokenBucket:
+    """rate tokens per second, up to burst; callers reserve, then sleep off any debt."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token; seconds the caller must wait before using it."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_acquire(self):
+        """Take a token only if one is available now."""
+        if not self.rate:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def shared_bucket(name, rate, burst=None):
+    """The process-wide bucket for name (e.g. an endpoint), so every agent
+    hosted in this process draws from the same budget."""
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None or (bucket.rate, bucket.burst) != (rate, burst or max(1.0, rate)):
+            bucket = _buckets[name] = TokenBucket(rate, burst)
+        return bucket
+
+
+class CallMetrics:
+    """Counters and recent latencies of one bridge's calls."""
+
+    COUNTERS = ("calls", "attempts", "retries", "timeouts", "rate_limited", "malformed",
+                "failures", "hedges", "hedge_wins", "hedges_skipped")
+
+    def __init__(self, keep=500):
+        self.latencies = deque(maxlen=keep)  # seconds, successful attempts only
+        self.throttled = 0.0  # seconds spent waiting on the token bucket
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def observe(self, latency):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def throttle(self, seconds):
+        if seconds:
+            with self._lock:
+                self.throttled += seconds
+
+    def percentile(self, p):
+        with self._lock:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+    def snapshot(self):
+        stats = {name: getattr(self, name) for name in self.COUNTERS}
+        stats["throttled_seconds"] = round(self.throttled, 3)
+        for p in (50, 95, 99):
+            stats[f"latency_p{p}"] = self.percentile(p)
+        return stats
+
+
+class CallPolicy:
+    def __init__(self, timeout=120.0, retries=3, backoff=0.5, backoff_max=30.0, bucket=None,
+                 hedge_percentile=0, hedge_min_samples=20, metrics=None,
+                 retryable=lambda exc: False, retry_after=lambda exc: None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.bucket = bucket or TokenBucket(0)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.metrics = metrics or CallMetrics()
+        self.retryable = retryable  # exc -> bool
+        self.retry_after = retry_after  # exc -> seconds the server asked for, or None
+        self._pool = None  # threads for sync hedging
+
+    @classmethod
+    def from_config(cls, bucket_name, **kwargs):
+        rate = get_float("ZAI_AI_RATE", 0.0)
+        options = dict(
+            timeout=get_float("ZAI_AI_TIMEOUT", 120.0),
+            retries=get_int("ZAI_AI_RETRIES", 3),
+            backoff=get_float("ZAI_AI_BACKOFF", 0.5),
+            backoff_max=get_float("ZAI_AI_BACKOFF_MAX", 30.0),
+            bucket=shared_bucket(bucket_name, rate, get_float("ZAI_AI_BURST", 0.0) or None),
+            hedge_percentile=get_float("ZAI_AI_HEDGE_PERCENTILE", 0.0),
+            hedge_min_samples=get_int("ZAI_AI_HEDGE_MIN_SAMPLES", 20),
+        )
+        options.update(kwargs)
+        return cls(**options)
+
+    def delay(self, attempt, exc):
+        """Seconds to sleep before retry number attempt (0-based)."""
+        hint = self.retry_after(exc)
+        if hint is not None:
+            return min(hint, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+    def hedge_delay(self):
+        """Seconds after which a duplicate attempt is sent, or None."""
+        if not self.hedge_percentile or len(self.metrics.latencies) < self.hedge_min_samples:
+            return None
+        return self.metrics.percentile(self.hedge_percentile)
+
+    def _failed(self, exc, attempt):
+        """Count exc; seconds to wait before retrying, or None to give up."""
+        if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__:
+            self.metrics.count("timeouts")
+        if getattr(exc, "status_code", None) == 429:
+            self.metrics.count("rate_limited")
+        if not self.retryable(exc) or attempt >= self.retries:
+            self.metrics.count("failures")
+            return None
+        self.metrics.count("retries")
+        return self.delay(attempt, exc)
+
+    def run(self, call, hedge=True):
+        """call(timeout) -> result, retried and hedged per the policy."""
+        self.metrics.count("calls")
+        attempt = 0
+        while True:
+            self.metrics.throttle(self.bucket.acquire())
+            try:
+                return self._attempt(call, hedge)
+            except Exception as exc:
+                delay = self._failed(exc, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def run_async(self, call, hedge=True):
+        """call(timeout) -> awaitable result, retried and hedged per the policy."""
+        self.metrics.count("calls")
+        attempt = 0
+        while True:
+            self.metrics.throttle(await self.bucket.acquire_async())
+            try:
+                return await self._attempt_async(call, hedge)
+            except Exception as exc:
+                delay = self._failed(exc, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _timed(self, call):
+        self.metrics.count("attempts")
+        start = time.perf_counter()
+        result = call(self.timeout)
+        self.metrics.observe(time.perf_counter() - start)
+        return result
+
+    async def _timed_async(self, call):
+        self.metrics.count("attempts")
+        start = time.perf_counter()
+        result = await call(self.timeout)
+        self.metrics.observe(time.perf_counter() - start)
+        return result
+
+    def _attempt(self, call, hedge):
+        delay = self.hedge_delay() if hedge else None
+        if delay is None:
+            return self._timed(call)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(thread_name_prefix="zai-hedge")
+        first = self._pool.submit(self._timed, call)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        if not self.bucket.try_acquire():
+            self.metrics.count("hedges_skipped")
+            return first.result()
+        # The slower attempt cannot be cancelled; its result is dropped
+        self.metrics.count("hedges")
+        second = self._pool.submit(self._timed, call)
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self.metrics.count("hedge_wins")
+                    return future.result()
+        return first.result()  # both failed: raise the original attempt's error
+
+    async def _attempt_async(self, call, hedge):
+        delay = self.hedge_delay() if hedge else None
+        first = asyncio.ensure_future(self._timed_async(call))
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        if not self.bucket.try_acquire():
+            self.metrics.count("hedges_skipped")
+            return await first
+        self.metrics.count("hedges")
+        second = asyncio.ensure_future(self._timed_async(call))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.metrics.count("hedge_wins")
+                        return task.result()
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
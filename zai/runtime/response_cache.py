@@ -0,0 +1,185 @@
+"""
+Cache of `process` responses.
+
+A response is keyed by a SHA-256 over model, temperature, prompt, system
+prompt, context and extract keys (canonical JSON, so dict order does not
+matter). Entries expire after ttl seconds (0: never) and the least recently
+used ones are evicted past max_entries or max_bytes of stored JSON.
+
+MemoryResponseCache lives as long as the bridge; SQLiteResponseCache keeps
+entries in a database file shared by every run (and process) that uses it.
+
+ZAI_AI_CACHE selects one: off (default), memory, sqlite. ZAI_AI_CACHE_TTL,
+ZAI_AI_CACHE_SIZE, ZAI_AI_CACHE_MAX_BYTES and ZAI_AI_CACHE_PATH tune it.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from ..config import get_float, get_int, get_str
+
+CACHE_KINDS = ("off", "memory", "sqlite")
+DEFAULT_PATH = os.path.join("~", ".cache", "zai", "responses.sqlite3")
+
+
+def cache_key(model, temperature, prompt, extract_keys, system_prompt, context):
+    """Stable hash of everything that decides a model response."""
+    blob = json.dumps([model, temperature, prompt, list(extract_keys), system_prompt, context],
+                      sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def cacheable(result):
+    """False for the all-None result of a response that failed to parse."""
+    return not result or any(v is not None for v in result.values())
+
+
+class ResponseCache:
+    """get / put of result dicts plus hit, miss and eviction counters."""
+
+    def __init__(self, max_entries=1024, ttl=3600.0, max_bytes=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()  # handle_many looks up from worker threads
+
+    def _expires(self):
+        return time.time() + self.ttl if self.ttl else None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self), "hit_rate": self.hits / total if total else 0.0}
+
+    def get(self, key):
+        """Cached result for key, or None."""
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(value)
+
+    def put(self, key, result):
+        value = json.dumps(result, ensure_ascii=False, default=str)
+        if self.max_bytes and len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._put(key, value)
+
+    def close(self):
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    def __init__(self, max_entries=1024, ttl=3600.0, max_bytes=None):
+        super().__init__(max_entries, ttl, max_bytes)
+        self._entries = OrderedDict()  # key -> (expires, JSON), least recently used first
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires < time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def _put(self, key, value):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (self._expires(), value)
+        self._bytes += len(value)
+        while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+
+class SQLiteResponseCache(ResponseCache):
+    def __init__(self, path=None, max_entries=1024, ttl=3600.0, max_bytes=None):
+        super().__init__(max_entries, ttl, max_bytes)
+        self.path = os.path.expanduser(path or DEFAULT_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL, used REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _get(self, key):
+        row = self._db.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        now = time.time()
+        if expires is not None and expires < now:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+        return value
+
+    def _put(self, key, value):
+        now = time.time()
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, self._expires(), now))
+            db.execute("DELETE FROM responses WHERE expires IS NOT NULL AND expires < ?", (now,))
+            count, size = db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM responses").fetchone()
+            excess = max(0, count - self.max_entries)
+            if self.max_bytes and size > self.max_bytes:
+                lengths = [n for (n,) in db.execute("SELECT LENGTH(value) FROM responses ORDER BY used, rowid")]
+                size -= sum(lengths[:excess])
+                while size > self.max_bytes and excess < len(lengths):
+                    size -= lengths[excess]
+                    excess += 1
+            if excess:
+                db.execute("DELETE FROM responses WHERE key IN "
+                           "(SELECT key FROM responses ORDER BY used, rowid LIMIT ?)", (excess,))
+                self.evictions += excess
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        self._db.close()
+
+
+def open_response_cache(kind=None):
+    """Response cache named by kind (default ZAI_AI_CACHE), or None when off."""
+    kind = (kind or get_str("ZAI_AI_CACHE", "off")).lower()
+    if kind not in CACHE_KINDS:
+        raise ValueError(f"Unknown response cache '{kind}', expected one of {', '.join(CACHE_KINDS)}")
+    if kind == "off":
+        return None
+    limits = dict(max_entries=get_int("ZAI_AI_CACHE_SIZE", 1024),
+                  ttl=get_float("ZAI_AI_CACHE_TTL", 3600.0),
+                  max_bytes=get_int("ZAI_AI_CACHE_MAX_BYTES", 0) or None)
+    if kind == "sqlite":
+        return SQLiteResponseCache(get_str("ZAI_AI_CACHE_PATH", "") or None, **limits)
+    return MemoryResponseCache(**limits)
@@ -0,0 +1,350 @@
+"""
+Shared-memory ring buffer transport for agents on the same host.
+
+Every agent owns one multiprocessing.shared_memory segment holding a ring of
+binary records: a fixed little-endian header followed by the source, type
+and payload bytes, padded to 8 bytes.
+
+    total_len u32 | flags u8 | pad u8 | source_len u16 | type_len u16 |
+    seq i64 | response_seq i64 (-1: none) | timestamp f64 | payload_len u32
+
+Senders append under an flock on <root>/<agent>.ring.lock; the owning agent
+is the only reader. receive() matches on headers read in place from the
+shared buffer and decodes only the record it takes, straight out of shared
+memory. Records a wait did not accept stay in the ring, so a full ring
+blocks senders (backpressure) for up to send_timeout.
+
+There is no descriptor to sleep on: wait polls the write position, starting
+at 0.2 ms and backing off to poll_interval.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+import _posixshmem
+
+from .transport import Transport, default_root
+
+MAGIC = 0x5A414952  # "ZAIR"
+DATA = 64  # control block size; records start here
+
+# magic, closed, capacity, write position, read position (positions only grow)
+_CONTROL = struct.Struct("<IIQQQ")
+_CLOSED, _WRITE, _READ = 4, 16, 24
+_POS = struct.Struct("<Q")
+
+_RECORD = struct.Struct("<IBBHHqqdI")
+_MARK = struct.Struct("<IB")  # total_len, flags: enough to skip a record
+
+TAKEN = 1
+WRAP = 2  # filler up to the end of the buffer
+TYPE_JSON = 4
+PAYLOAD_JSON = 8
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _encode(value, flag):
+    if isinstance(value, str):
+        return value.encode(), 0
+    return json.dumps(value).encode(), flag
+
+
+class _Mapping:
+    """The parts of SharedMemory a Ring uses, for a segment mapped by hand."""
+
+    def __init__(self, name, mapping):
+        self.name = name
+        self._mmap = mapping
+        self.buf = memoryview(mapping)
+
+    def close(self):
+        self.buf.release()
+        self._mmap.close()
+
+
+def _attach(name):
+    """Map an existing segment without involving this process's resource tracker."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Before Python 3.13 every attach is registered with the resource tracker,
+    # which unlinks the owner's segment when this process exits
+    fd = _posixshmem.shm_open("/" + name, os.O_RDWR, mode=0o600)
+    try:
+        return _Mapping(name, mmap.mmap(fd, os.fstat(fd).st_size))
+    finally:
+        os.close(fd)
+
+
+class Ring:
+    def __init__(self, shm):
+        self.shm = shm
+        self.buf = shm.buf
+        magic, _, self.capacity, _, _ = _CONTROL.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory segment {shm.name} is not a zai ring")
+
+    @classmethod
+    def create(cls, name, capacity):
+        capacity = _align(capacity)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=DATA + capacity)
+        _CONTROL.pack_into(shm.buf, 0, MAGIC, 0, capacity, 0, 0)
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name):
+        try:
+            shm = _attach(name)
+        except ValueError:
+            # Created but not yet sized: not listening yet
+            raise FileNotFoundError(name) from None
+        if _CONTROL.unpack_from(shm.buf, 0)[0] == 0:
+            # Sized but the control block is not written yet
+            shm.close()
+            raise FileNotFoundError(name)
+        return cls(shm)
+
+    def _get(self, offset):
+        return _POS.unpack_from(self.buf, offset)[0]
+
+    @property
+    def write_pos(self):
+        return self._get(_WRITE)
+
+    @property
+    def closed(self):
+        return struct.unpack_from("<I", self.buf, _CLOSED)[0] != 0
+
+    def mark_closed(self):
+        struct.pack_into("<I", self.buf, _CLOSED, 1)
+
+    def append(self, message):
+        """Write message if it fits; False when the ring is full. Caller holds the writer lock."""
+        source = message.get("source", "").encode()
+        type_bytes, type_flag = _encode(message.get("type"), TYPE_JSON)
+        payload, payload_flag = _encode(message.get("payload"), PAYLOAD_JSON)
+        size = _align(_RECORD.size + len(source) + len(type_bytes) + len(payload))
+        if size > self.capacity // 2:
+            raise ValueError(f"Message of {size} bytes does not fit a {self.capacity} byte ring")
+
+        buf = self.buf
+        write = self.write_pos
+        tail = self.capacity - write % self.capacity
+        need = size + tail if tail < size else size
+        if need > self.capacity - (write - self._get(_READ)):
+            return False
+        if tail < size:
+            _MARK.pack_into(buf, DATA + write % self.capacity, tail, WRAP)
+            write += tail
+
+        offset = DATA + write % self.capacity
+        response_seq = message.get("response_seq")
+        _RECORD.pack_into(
+            buf, offset, size, type_flag | payload_flag, 0, len(source), len(type_bytes),
+            message.get("seq") or 0, -1 if response_seq is None else response_seq,
+            message.get("timestamp") or time.time(), len(payload))
+        start = offset + _RECORD.size
+        for part in (source, type_bytes, payload):
+            buf[start:start + len(part)] = part
+            start += len(part)
+        # Publish only once the record is complete
+        _POS.pack_into(buf, _WRITE, write + size)
+        return True
+
+    def records(self):
+        """(offset, header fields) of every record not yet taken, oldest first."""
+        buf = self.buf
+        pos, write = self._get(_READ), self.write_pos
+        while pos < write:
+            offset = DATA + pos % self.capacity
+            total, flags = _MARK.unpack_from(buf, offset)
+            if not flags & (TAKEN | WRAP):
+                yield offset, _RECORD.unpack_from(buf, offset)
+            pos += total
+
+    def source(self, offset, fields):
+        start = offset + _RECORD.size
+        return str(self.buf[start:start + fields[3]], "utf-8")
+
+    def take(self, offset, fields):
+        """Decode the record at offset, mark it taken and free leading space."""
+        _, flags, _, source_len, type_len, seq, response_seq, timestamp, payload_len = fields
+        buf = self.buf
+        start = offset + _RECORD.size + source_len
+        msg_type = str(buf[start:start + type_len], "utf-8")
+        start += type_len
+        payload = str(buf[start:start + payload_len], "utf-8")
+        message = {
+            "source": self.source(offset, fields),
+            "type": json.loads(msg_type) if flags & TYPE_JSON else msg_type,
+            "payload": json.loads(payload) if flags & PAYLOAD_JSON else payload,
+            "timestamp": timestamp,
+            "seq": seq,
+            "response_seq": None if response_seq < 0 else response_seq,
+        }
+        buf[offset + 4] = flags | TAKEN
+        self._release()
+        return message
+
+    def _release(self):
+        buf = self.buf
+        read, write = self._get(_READ), self.write_pos
+        while read < write:
+            total, flags = _MARK.unpack_from(buf, DATA + read % self.capacity)
+            if not flags & (TAKEN | WRAP):
+                break
+            read += total
+        _POS.pack_into(buf, _READ, read)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+class ShmTransport(Transport):
+    """Ring buffer inbox per agent in POSIX shared memory."""
+
+    def __init__(self, root=None, capacity=1 << 20, send_timeout=10.0, poll_interval=0.02):
+        self.root = root or default_root()
+        self.capacity = capacity
+        self.send_timeout = send_timeout
+        self.poll_interval = poll_interval
+        self._prefix = "zai-" + hashlib.sha1(os.path.abspath(self.root).encode()).hexdigest()[:10]
+        self._rings = {}  # own agent -> Ring
+        self._seen = {}  # own agent -> write position at the last receive
+        self._peers = {}  # target -> (Ring, lock fd)
+        self._lock = threading.Lock()  # flock does not exclude threads sharing the fd
+
+    def segment_name(self, agent):
+        return f"{self._prefix}-{agent}"
+
+    def register(self, agent):
+        if agent in self._rings:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        name = self.segment_name(agent)
+        try:
+            # Left behind by an earlier run: tell its senders to reattach
+            stale = Ring.attach(name)
+            stale.mark_closed()
+            stale.close()
+            _posixshmem.shm_unlink("/" + name)
+        except (FileNotFoundError, ValueError):
+            pass
+        self._rings[agent] = Ring.create(name, self.capacity)
+        self._seen[agent] = 0
+
+    def _peer(self, target):
+        peer = self._peers.get(target)
+        if peer is not None and peer[0].closed:
+            self._drop_peer(target)
+            peer = None
+        if peer is None:
+            ring = Ring.attach(self.segment_name(target))
+            os.makedirs(self.root, exist_ok=True)
+            lock = os.open(os.path.join(self.root, f"{target}.ring.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+            peer = self._peers[target] = (ring, lock)
+        return peer
+
+    def _drop_peer(self, target):
+        ring, lock = self._peers.pop(target)
+        ring.close()
+        os.close(lock)
+
+    def _try_send(self, target, message):
+        with self._lock:
+            ring, lock = self._peer(target)
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return ring.append(message)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _undeliverable(self, target, reason):
+        return ConnectionError(f"Cannot deliver to agent '{target}' via shared memory: {reason}")
+
+    def send(self, target, message):
+        deadline = time.time() + self.send_timeout
+        reason = "ring full"
+        while True:
+            try:
+                if self._try_send(target, message):
+                    return
+            except FileNotFoundError:
+                reason = "not listening"
+            if time.time() >= deadline:
+                raise self._undeliverable(target, reason)
+            time.sleep(0.001)
+
+    async def send_async(self, target, message):
+        deadline = time.time() + self.send_timeout
+        reason = "ring full"
+        while True:
+            try:
+                if self._try_send(target, message):
+                    return
+            except FileNotFoundError:
+                reason = "not listening"
+            if time.time() >= deadline:
+                raise self._undeliverable(target, reason)
+            await asyncio.sleep(0.001)
+
+    def receive(self, agent, match):
+        self.register(agent)
+        ring = self._rings[agent]
+        self._seen[agent] = ring.write_pos
+        for offset, fields in ring.records():
+            header = {"source": ring.source(offset, fields), "seq": fields[5],
+                      "response_seq": None if fields[6] < 0 else fields[6]}
+            if match(header):
+                return ring.take(offset, fields)
+        return None
+
+    def _changed(self, agent):
+        return self._rings[agent].write_pos != self._seen[agent]
+
+    def wait(self, agent, timeout):
+        self.register(agent)
+        deadline = time.time() + timeout
+        delay = 0.0002
+        while not self._changed(agent):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.poll_interval)
+        return True
+
+    async def wait_async(self, agent, timeout):
+        self.register(agent)
+        deadline = time.time() + timeout
+        delay = 0.0002
+        while not self._changed(agent):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.poll_interval)
+        return True
+
+    def close(self):
+        for ring in self._rings.values():
+            ring.mark_closed()
+            shm = ring.shm
+            ring.close()
+            shm.unlink()
+        self._rings.clear()
+        for target in list(self._peers):
+            self._drop_peer(target)
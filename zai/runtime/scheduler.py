@@ -0,0 +1,114 @@
+"""
+In-process agent runtime.
+
+By default `start` launches every sub-agent as its own `python -m zai.zai`
+process. A Scheduler instead hosts the agents as AsyncInterpreter tasks on a
+single event loop. They share the memoized parser, the parsed trees and one
+pair of bridges, so there is one HTTP client for the whole run.
+
+Enabled with `zai --in-process` or ZAI_IN_PROCESS=1.
+"""
+
+import asyncio
+import os
+
+from ..core.ast_cache import parse_file
+from ..core.async_interpreter import AsyncInterpreter
+from .default_bridge import DefaultAsyncAIBridge, DefaultAsyncExecBridge
+from .http import aclose_client
+
+
+class Scheduler:
+    def __init__(self, ai_bridge=None, exec_bridge=None, wait_timeout=60, ast_cache=None, parallel_process=None, stream=None, parallel_exec=None):
+        self.ai_bridge = ai_bridge
+        self.exec_bridge = exec_bridge
+        self.wait_timeout = wait_timeout
+        self.ast_cache = ast_cache
+        self.parallel_process = parallel_process
+        self.stream = stream
+        self.parallel_exec = parallel_exec
+        self.tasks = {}  # agent name -> asyncio.Task
+        self.results = {}  # agent name -> result dict, once finished
+        self._trees = {}  # absolute path -> parsed tree
+
+    def load_tree(self, path):
+        """Parse a .zai file once per scheduler."""
+        path = os.path.abspath(path)
+        tree = self._trees.get(path)
+        if tree is None:
+            tree = self._trees[path] = parse_file(path, start='start', use_cache=self.ast_cache)
+        return tree
+
+    def create_interpreter(self, source_file):
+        # Bridges are built on first use so a scheduler costs nothing until it runs
+        if self.ai_bridge is None:
+            self.ai_bridge = DefaultAsyncAIBridge()
+        if self.exec_bridge is None:
+            self.exec_bridge = DefaultAsyncExecBridge()
+        source_file = os.path.abspath(source_file)
+        return AsyncInterpreter(
+            self.load_tree(source_file),
+            ai_bridge=self.ai_bridge,
+            exec_bridge=self.exec_bridge,
+            base_path=os.path.dirname(source_file),
+            wait_timeout=self.wait_timeout,
+            source_file=source_file,
+            ast_cache=self.ast_cache,
+            scheduler=self,
+            parallel_process=self.parallel_process,
+            stream=self.stream,
+            parallel_exec=self.parallel_exec,
+        )
+
+    def spawn(self, source_file, agent_name=None, entry_skill="Main", entry_args=None):
+        """Start an agent as a task on the running loop and return the task.
+
+        Declarations are processed before returning, so an unknown agent
+        raises here. Returns None when the file holds no agent.
+        """
+        interpreter = self.create_interpreter(source_file)
+        if not interpreter.load(agent_name):
+            return None
+
+        name = interpreter.agent_name
+        running = self.tasks.get(name)
+        if running is not None and not running.done():
+            # A second instance would compete for the same inbox
+            print(f"Warning: Agent {name} is already running.", flush=True)
+            return running
+
+        task = asyncio.get_running_loop().create_task(self._run(interpreter, entry_skill, entry_args or {}))
+        self.tasks[name] = task
+        return task
+
+    async def _run(self, interpreter, entry_skill, entry_args):
+        try:
+            result = await interpreter.execute_skill(entry_skill, entry_args)
+        except Exception as e:
+            print(f"[{interpreter.agent_name}] Agent crashed: {e}", flush=True)
+            result = {"status": "fail", "code": 500, "message": str(e), "final": True}
+        self.results[interpreter.agent_name] = result
+        return result
+
+    async def join(self):
+        """Wait for every agent, including those started while waiting."""
+        while True:
+            pending = [task for task in self.tasks.values() if not task.done()]
+            if not pending:
+                return
+            await asyncio.wait(pending)
+
+    async def main(self, source_file, agent_name=None, entry_skill="Main", entry_args=None):
+        """Run an agent and everything it starts; return the agent's result."""
+        try:
+            task = self.spawn(source_file, agent_name, entry_skill, entry_args)
+            if task is None:
+                return {}
+            result = await task
+            await self.join()
+            return result
+        finally:
+            await aclose_client()
+
+    def run(self, source_file, agent_name=None, entry_skill="Main", entry_args=None):
+        return asyncio.run(self.main(source_file, agent_name, entry_skill, entry_args))
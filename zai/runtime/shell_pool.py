@@ -0,0 +1,260 @@
+"""
+Long-lived /bin/sh workers for `exec` shell commands.
+
+subprocess.run(shell=True) starts a new /bin/sh for every command. A
+ShellWorker keeps one shell running and feeds it commands instead. Each
+command runs in a subshell, so it sees its own cwd and environment and
+nothing it changes (cd, export, set) outlives it:
+
+    ( cd -- CWD || exit 1; export/unset ENV DIFF; eval 'CMD' ) >OUT 2>ERR </dev/null; echo $?
+
+The output comes back through two FIFOs in the worker's private directory,
+so it cannot collide with the status line on the control pipe, and is read
+while the command runs: nothing touches the disk. Commands get /dev/null
+as stdin.
+
+ZAI_EXEC_TIMEOUT and ZAI_EXEC_MAX_OUTPUT apply as in zai.runtime.command,
+and on_line sees each line as it is written; a command that times out
+takes its worker down with it.
+
+ShellPool hands commands to ZAI_EXEC_WORKERS workers (default 4), started on
+demand; a worker whose shell has died is replaced. ZAI_EXEC_POOL=1 routes the
+`bash` builtin through the process-wide pool (get_pool()).
+"""
+
+import atexit
+import os
+import queue
+import re
+import selectors
+import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+from .command import READ_SIZE, OutputBuffer, exec_timeout, max_output
+from ..config import get_bool, get_int
+
+SHELL = "/bin/sh"
+
+# export/unset only accept names the shell can parse
+_ENV_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+
+class WorkerDied(RuntimeError):
+    pass
+
+
+class ShellWorker:
+    def __init__(self, env=None):
+        self.dir = tempfile.mkdtemp(prefix="zai-sh-")
+        self.out_path = os.path.join(self.dir, "out")
+        self.err_path = os.path.join(self.dir, "err")
+        os.mkfifo(self.out_path)
+        os.mkfifo(self.err_path)
+        self.env = dict(os.environ if env is None else env)  # what the shell started with
+        self.proc = subprocess.Popen(
+            [SHELL], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            env=self.env, start_new_session=True)
+
+    @property
+    def alive(self):
+        return self.proc.poll() is None
+
+    def script(self, command, cwd, env):
+        """The control line running command in a subshell with cwd and env."""
+        q = shlex.quote
+        setup = [f"cd -- {q(cwd)} || exit 1"]
+        for name, value in env.items():
+            if self.env.get(name) != value and _ENV_NAME.match(name):
+                setup.append(f"export {name}={q(value)}")
+        for name in self.env.keys() - env.keys():
+            if _ENV_NAME.match(name):
+                setup.append(f"unset {name}")
+        setup.append(f"eval {q(command)}")
+        return (f"( {'; '.join(setup)} ) >{q(self.out_path)} 2>{q(self.err_path)} </dev/null; "
+                f"echo $?\n")
+
+    def run(self, command, cwd=None, env=None, timeout=None, limit=None, on_line=None):
+        """{"stdout", "stderr", "code"} of command; raises WorkerDied.
+
+        On timeout the worker's whole process group is killed (the pool then
+        replaces it) and the output written so far is returned with an error.
+        """
+        timeout, limit = exec_timeout(timeout), max_output(limit)
+        script = self.script(command, cwd or os.getcwd(), os.environ if env is None else env)
+        buffers, held = {}, []
+        try:
+            for path, name in ((self.out_path, "stdout"), (self.err_path, "stderr")):
+                buffers[os.open(path, os.O_RDONLY | os.O_NONBLOCK)] = OutputBuffer(name, limit, on_line)
+                # Our own write end: until the command opens its end the FIFO would read as EOF
+                held.append(os.open(path, os.O_WRONLY | os.O_NONBLOCK))
+            try:
+                self.proc.stdin.write(script.encode())
+                self.proc.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                raise WorkerDied(str(e)) from None
+            code, error = self._collect(buffers, held, timeout)
+        finally:
+            for fd in list(buffers) + held:
+                os.close(fd)
+        out, err = buffers.values()
+        out.close()
+        err.close()
+        result = {"stdout": out.text(), "stderr": err.text(), "code": code}
+        if error:
+            result["error"] = error
+        return result
+
+    def _collect(self, buffers, held, timeout):
+        """Feed the FIFOs to their buffers until the status line is in and
+        both are closed; (code, error)."""
+        control = self.proc.stdout.fileno()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        status = b""
+        with selectors.DefaultSelector() as selector:
+            selector.register(control, selectors.EVENT_READ)
+            for fd in buffers:
+                selector.register(fd, selectors.EVENT_READ)
+            while selector.get_map():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    os.killpg(self.proc.pid, signal.SIGKILL)
+                    self.proc.wait()
+                    self._release_fifos(held)
+                    for fd in selector.get_map():
+                        if fd in buffers:
+                            self._drain(fd, buffers[fd])
+                    return -signal.SIGKILL, f"Command timed out after {timeout:g}s"
+                for key, _ in selector.select(remaining):
+                    try:
+                        data = os.read(key.fd, READ_SIZE)
+                    except BlockingIOError:
+                        continue
+                    if key.fd != control:
+                        if data:
+                            buffers[key.fd].feed(data)
+                        else:
+                            selector.unregister(key.fd)
+                        continue
+                    if not data:
+                        raise WorkerDied("shell worker exited")
+                    status += data
+                    if status.endswith(b"\n"):
+                        # The command is done: EOF once its (background) writers are too
+                        selector.unregister(control)
+                        self._release_fifos(held)
+        return int(status), None
+
+    @staticmethod
+    def _release_fifos(held):
+        while held:
+            os.close(held.pop())
+
+    @staticmethod
+    def _drain(fd, buffer):
+        while True:
+            try:
+                data = os.read(fd, READ_SIZE)
+            except BlockingIOError:
+                return
+            if not data:
+                return
+            buffer.feed(data)
+
+    def close(self):
+        if self.alive:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                self.proc.kill()
+                self.proc.wait()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class ShellPool:
+    def __init__(self, size=None):
+        self.size = max(1, size or get_int("ZAI_EXEC_WORKERS", 4))
+        self._idle = queue.LifoQueue()
+        self._started = 0
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("shell pool is closed")
+            if self._idle.empty() and self._started < self.size:
+                self._started += 1
+                worker = ShellWorker()
+                self._workers.append(worker)
+                return worker
+        return self._idle.get()
+
+    def _release(self, worker, died=False):
+        if not died and worker.alive and not self._closed:
+            self._idle.put(worker)
+            return
+        worker.close()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            if self._closed:
+                return
+            # Replace a dead shell so the pool keeps its size
+            replacement = ShellWorker()
+            self._workers.append(replacement)
+        self._idle.put(replacement)
+
+    def run(self, command, cwd=None, env=None, timeout=None, limit=None, on_line=None):
+        """Run command on an idle worker. A worker that dies under it is
+        replaced and the command tried once more on a fresh one."""
+        for attempt in range(2):
+            worker = self._acquire()
+            died = False
+            try:
+                return worker.run(command, cwd, env, timeout, limit, on_line)
+            except WorkerDied as e:
+                # poll() may not see the exit yet: never hand this worker out again
+                died, error = True, e
+            finally:
+                self._release(worker, died)
+        return {"error": f"shell worker died: {error}"}
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_enabled():
+    return get_bool("ZAI_EXEC_POOL", False)
+
+
+def get_pool():
+    """The process-wide ShellPool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = ShellPool()
+        return _pool
+
+
+@atexit.register
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
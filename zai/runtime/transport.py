@@ -0,0 +1,530 @@
+"""
+Message transports behind `notify` / `wait`.
+
+A transport moves message dicts between agents by name. The interpreter
+decides which message a wait accepts (source and response_seq matching) and
+passes that in as match(); a transport only delivers, holds and wakes.
+match() may be given just the header fields source, seq and response_seq,
+and messages from one source are offered in the order they were sent:
+
+    register(agent)           start accepting messages for agent
+    send(target, message)     deliver to target's inbox
+    receive(agent, match)     take the first pending message match() accepts
+    wait(agent, timeout)      sleep until something new may have arrived
+
+FileTransport (default) is the original one-JSON-file-per-message inbox
+under .zai_ipc/<agent>/. SocketTransport gives every agent a Unix socket,
+ring.ShmTransport a shared-memory ring buffer. ZAI_TRANSPORT selects one:
+file, socket, shm.
+"""
+
+import asyncio
+import json
+import os
+import select
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+
+from ..config import get_str
+from .inbox import open_watcher, wait_readable
+
+TRANSPORTS = ("file", "socket", "shm")
+
+
+def default_root():
+    return os.path.join(os.getcwd(), ".zai_ipc")
+
+
+class Transport(ABC):
+    def register(self, agent):
+        pass
+
+    @abstractmethod
+    def send(self, target, message):
+        pass
+
+    async def send_async(self, target, message):
+        self.send(target, message)
+
+    def send_many(self, target, messages):
+        """Deliver a burst of messages, in order."""
+        for message in messages:
+            self.send(target, message)
+
+    @abstractmethod
+    def receive(self, agent, match):
+        pass
+
+    @abstractmethod
+    def wait(self, agent, timeout):
+        pass
+
+    @abstractmethod
+    async def wait_async(self, agent, timeout):
+        pass
+
+    def close(self):
+        pass
+
+
+class FileTransport(Transport):
+    """One JSON file per message in <root>/<agent>/.
+
+    Filenames carry the header, <source>.<seq>.<response_seq>.<id>.json, so
+    receive picks its message from the directory listing and only opens
+    that one file. Bare <uuid>.json files from older writers are still read.
+
+    Files are written under a dot-prefixed temporary name and renamed into
+    place, so a reader never sees a partial message. send_many writes a
+    burst as one <source>.<seq>.batch.<id>.json envelope, unpacked by the
+    receiver on sight. The envelope stays on disk, rewritten atomically
+    with the messages not yet taken, until its last message is taken, so
+    a receiver that crashes mid-burst loses nothing. A message that cannot
+    be parsed is moved to <agent>/dead-letter/ instead of being retried on
+    every scan.
+
+    The listing is kept between receives as an index sorted by (source,
+    seq); the inbox is listed again only when nothing in the index matches
+    and the watcher reports a change. A sender's later messages carry higher
+    seqs, so taking from the index first keeps FIFO per sender.
+    """
+
+    # Unparsable bare <uuid>.json files younger than this may still be
+    # being written in place by an older sender
+    LEGACY_GRACE = 5.0
+
+    def __init__(self, root=None, watch_mode=None, poll_interval=0.5, fsync=False):
+        self.root = root or default_root()
+        self.watch_mode = watch_mode  # see inbox.open_watcher
+        self.poll_interval = poll_interval
+        self.fsync = fsync  # flush each message to disk before it becomes visible
+        self._watchers = {}
+        self._pending = {}  # agent -> [(envelope fname, message)] unpacked, in arrival order
+        self._envelopes = {}  # agent -> {envelope fname: messages not yet taken}
+        self._index = {}  # agent -> (sorted [(key, fname, header)], legacy fnames)
+
+    def inbox(self, agent):
+        path = os.path.join(self.root, agent)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def register(self, agent):
+        self.inbox(agent)
+
+    def watcher(self, agent):
+        """Watcher on agent's inbox, reopened if the directory was replaced."""
+        watcher = self._watchers.get(agent)
+        if watcher is None or not watcher.alive:
+            watcher = open_watcher(self.inbox(agent), self.watch_mode, self.poll_interval)
+            self._watchers[agent] = watcher
+            self._index.pop(agent, None)  # listed before the watch began
+        return watcher
+
+    def _write(self, directory, fname, data):
+        tmp = os.path.join(directory, f".{fname}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(directory, fname))
+
+    def send(self, target, message):
+        self._write(self.inbox(target), message_filename(message), message)
+
+    def send_many(self, target, messages):
+        """Deliver messages to target as one envelope file."""
+        messages = list(messages)
+        if messages:
+            self._write(self.inbox(target), envelope_filename(messages[0]), {"messages": messages})
+
+    def receive(self, agent, match):
+        # Watch before the scan so nothing slips in between
+        watcher = self.watcher(agent)
+        my_dir = os.path.join(self.root, agent)
+        if agent not in self._index:
+            watcher.changed()  # everything there now is about to be listed
+            self._scan(agent, my_dir)
+        msg = self._take(agent, my_dir, match)
+        if msg is None and watcher.changed():
+            self._scan(agent, my_dir)
+            msg = self._take(agent, my_dir, match)
+        return msg
+
+    def _scan(self, agent, my_dir):
+        """List the inbox into the index, unpacking new envelopes into pending."""
+        pending = self._pending.setdefault(agent, [])
+        envelopes = self._envelopes.setdefault(agent, {})
+        index, legacy = [], []
+        for fname in os.listdir(my_dir):
+            if not fname.endswith(".json"): continue
+            header = parse_filename(fname)
+            if header is not None:
+                index.append(((header["source"], header["seq"]), fname, header))
+            elif is_envelope(fname):
+                if fname in envelopes:
+                    continue  # already unpacked
+                envelope = self._load(agent, my_dir, fname)
+                if envelope:
+                    envelopes[fname] = envelope
+                    pending.extend((fname, msg) for msg in envelope)
+                elif envelope is not None:
+                    os.remove(os.path.join(my_dir, fname))
+            else:
+                legacy.append(fname)
+        # Lowest seq first: FIFO per sender
+        index.sort(key=lambda entry: entry[0])
+        self._index[agent] = (index, legacy)
+
+    def _take(self, agent, my_dir, match):
+        """Remove and return the first indexed or pending message match() accepts."""
+        index, legacy = self._index[agent]
+        pending = self._pending.setdefault(agent, [])
+        while True:
+            i = next((i for i, entry in enumerate(index) if match(entry[2])), None)
+            # pending keeps each sender's order; the first match is its oldest
+            j = next((j for j, (_, msg) in enumerate(pending) if match(msg)), None)
+            if j is not None:
+                msg = pending[j][1]
+                if i is None or (msg.get("source", ""), msg.get("seq") or 0) < index[i][0]:
+                    self._take_pending(agent, my_dir, j)
+                    return msg
+            if i is None:
+                break
+            _, fname, _ = index.pop(i)
+            msg = self._load(agent, my_dir, fname)
+            if msg is not None:
+                # Consume message
+                os.remove(os.path.join(my_dir, fname))
+                return msg
+        for fname in legacy:
+            msg = self._load(agent, my_dir, fname)
+            if msg is not None and match(msg):
+                legacy.remove(fname)
+                os.remove(os.path.join(my_dir, fname))
+                return msg
+        return None
+
+    def _take_pending(self, agent, my_dir, j):
+        """Remove pending[j] and from its envelope file on disk."""
+        fname, msg = self._pending[agent].pop(j)
+        envelopes = self._envelopes[agent]
+        remaining = envelopes[fname]
+        remaining.remove(msg)
+        if remaining:
+            self._write(my_dir, fname, {"messages": remaining})
+        else:
+            del envelopes[fname]
+            try:
+                os.remove(os.path.join(my_dir, fname))
+            except FileNotFoundError:
+                pass
+
+    def _load(self, agent, my_dir, fname):
+        """Parsed contents of a message or envelope file, or None if unreadable.
+
+        Envelopes come back as their list of messages.
+        """
+        fpath = os.path.join(my_dir, fname)
+        try:
+            with open(fpath, 'r') as f:
+                data = json.load(f)
+            if is_envelope(fname):
+                data = data["messages"]
+                if not isinstance(data, list):
+                    raise ValueError("envelope without a message list")
+            elif not isinstance(data, dict):
+                raise ValueError("message is not an object")
+            return data
+        except FileNotFoundError:
+            return None  # taken by another reader
+        except (ValueError, KeyError, TypeError, IOError) as e:
+            if parse_filename(fname) is None and not is_envelope(fname):
+                try:
+                    if time.time() - os.path.getmtime(fpath) < self.LEGACY_GRACE:
+                        return None  # maybe still being written; look again later
+                except OSError:
+                    return None
+            print(f"[{agent}] Warning: Moving unreadable message file {fname} to dead-letter: {e}")
+            dead = os.path.join(my_dir, DEAD_LETTER)
+            os.makedirs(dead, exist_ok=True)
+            try:
+                os.replace(fpath, os.path.join(dead, fname))
+            except FileNotFoundError:
+                pass
+            return None
+
+    def wait(self, agent, timeout):
+        changed = self.watcher(agent).wait(timeout)
+        if changed:
+            self._index.pop(agent, None)  # the wait took the change event
+        return changed
+
+    async def wait_async(self, agent, timeout):
+        changed = await self.watcher(agent).wait_async(timeout)
+        if changed:
+            self._index.pop(agent, None)
+        return changed
+
+    def close(self):
+        for watcher in self._watchers.values():
+            watcher.close()
+        self._watchers.clear()
+        self._index.clear()
+
+
+class SocketTransport(Transport):
+    """A Unix SOCK_SEQPACKET listener per agent at <root>/<agent>.sock.
+
+    Senders keep one connection per target, so messages from one sender
+    arrive in order. A packet carries at most PACKET bytes of a message
+    after a one-byte flag: MORE for a piece with more to follow, LAST for
+    the end of the message. The kernel caps a packet at the socket's send
+    buffer (about 208 KiB by default), so larger messages are split rather
+    than refused; the receiver joins the pieces of each connection.
+
+    A connection's kernel buffer bounds the bytes in flight: when it is full
+    the sender blocks (backpressure) for up to send_timeout, then gives up
+    with a ConnectionError. A sender whose target is not listening yet
+    retries for the same time. Messages a wait did not accept stay pending
+    in arrival order.
+    """
+
+    PACKET = 64 * 1024
+    MORE = b"+"
+    LAST = b"."
+
+    def __init__(self, root=None, send_timeout=10.0):
+        self.root = root or default_root()
+        self.send_timeout = send_timeout
+        self._listeners = {}  # agent -> listening socket
+        self._conns = {}  # agent -> accepted connections
+        self._pending = {}  # agent -> deque of received, not yet accepted messages
+        self._partial = {}  # accepted connection -> pieces of an unfinished message
+        self._peers = {}  # target -> connected socket
+
+    def address(self, agent):
+        return os.path.join(self.root, f"{agent}.sock")
+
+    def register(self, agent):
+        if agent in self._listeners:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        path = self.address(agent)
+        try:
+            os.unlink(path)  # left behind by an earlier run
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        sock.bind(path)
+        sock.listen(128)
+        sock.setblocking(False)
+        self._listeners[agent] = sock
+        self._conns[agent] = []
+        self._pending[agent] = deque()
+
+    def _undeliverable(self, target, error):
+        return ConnectionError(f"Cannot deliver to agent '{target}' at {self.address(target)}: {error}")
+
+    def _peer(self, target):
+        peer = self._peers.get(target)
+        if peer is None:
+            peer = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            try:
+                peer.connect(self.address(target))
+            except OSError:
+                peer.close()
+                raise
+            self._peers[target] = peer
+        return peer
+
+    def _drop_peer(self, target):
+        peer = self._peers.pop(target, None)
+        if peer is not None:
+            peer.close()
+
+    def packets(self, message):
+        """message as flagged packets of at most PACKET bytes each."""
+        data = json.dumps(message).encode()
+        size = self.PACKET
+        pieces = [data[i:i + size] for i in range(0, len(data), size)] or [b""]
+        return [self.MORE + piece for piece in pieces[:-1]] + [self.LAST + pieces[-1]]
+
+    def _give_up(self, target, error, sent):
+        # Piece(s) already sent would prefix the next message: drop the connection
+        if sent:
+            self._drop_peer(target)
+        return self._undeliverable(target, error)
+
+    def send(self, target, message):
+        packets = self.packets(message)
+        deadline = time.time() + self.send_timeout
+        sent = 0
+        while True:
+            try:
+                peer = self._peer(target)
+                while sent < len(packets):
+                    peer.settimeout(max(0.01, deadline - time.time()))
+                    peer.send(packets[sent])
+                    sent += 1
+                return
+            except (FileNotFoundError, ConnectionRefusedError, BlockingIOError) as e:
+                # Not listening yet, or its backlog is full
+                if time.time() >= deadline:
+                    raise self._give_up(target, e, sent) from e
+                time.sleep(0.01)
+            except socket.timeout as e:
+                # Its buffer stayed full: the receiver is not reading
+                raise self._give_up(target, "receiver did not drain its buffer in time", sent) from e
+            except (BrokenPipeError, ConnectionResetError):
+                # The receiver restarted; reconnect and send the whole message again
+                self._drop_peer(target)
+                sent = 0
+
+    async def send_async(self, target, message):
+        packets = self.packets(message)
+        deadline = time.time() + self.send_timeout
+        sent = 0
+        while True:
+            try:
+                peer = self._peer(target)
+                peer.setblocking(False)
+                while sent < len(packets):
+                    peer.send(packets[sent])
+                    sent += 1
+                return
+            except (FileNotFoundError, ConnectionRefusedError, BlockingIOError) as e:
+                # Not listening yet, or its buffer is full
+                if time.time() >= deadline:
+                    raise self._give_up(target, e, sent) from e
+                await asyncio.sleep(0.01)
+            except (BrokenPipeError, ConnectionResetError):
+                self._drop_peer(target)
+                sent = 0
+
+    def _fds(self, agent):
+        self.register(agent)
+        return [self._listeners[agent]] + self._conns[agent]
+
+    def _collect(self, agent):
+        """Accept new connections and move every queued message to pending."""
+        listener = self._listeners[agent]
+        conns = self._conns[agent]
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except BlockingIOError:
+                break
+            conn.setblocking(False)
+            conns.append(conn)
+
+        pending = self._pending[agent]
+        for conn in list(conns):
+            while True:
+                try:
+                    data = conn.recv(self.PACKET + 1)
+                except BlockingIOError:
+                    break
+                except ConnectionResetError:
+                    data = b""
+                if not data:
+                    # Sender went away; an unfinished message goes with it
+                    conns.remove(conn)
+                    self._partial.pop(conn, None)
+                    conn.close()
+                    break
+                flag, piece = data[:1], data[1:]
+                if flag == self.MORE:
+                    self._partial.setdefault(conn, []).append(piece)
+                    continue
+                pieces = self._partial.pop(conn, None)
+                if pieces:
+                    pieces.append(piece)
+                    piece = b"".join(pieces)
+                try:
+                    pending.append(json.loads(piece))
+                except ValueError as e:
+                    print(f"[{agent}] Warning: Dropped unreadable message: {e}")
+
+    def receive(self, agent, match):
+        self.register(agent)
+        self._collect(agent)
+        pending = self._pending[agent]
+        for i, msg in enumerate(pending):
+            if match(msg):
+                del pending[i]
+                return msg
+        return None
+
+    def wait(self, agent, timeout):
+        readable, _, _ = select.select(self._fds(agent), [], [], max(0, timeout))
+        return bool(readable)
+
+    async def wait_async(self, agent, timeout):
+        return await wait_readable([sock.fileno() for sock in self._fds(agent)], timeout)
+
+    def close(self):
+        for agent, listener in self._listeners.items():
+            for conn in self._conns[agent]:
+                conn.close()
+            listener.close()
+            try:
+                os.unlink(self.address(agent))
+            except FileNotFoundError:
+                pass
+        self._listeners.clear()
+        self._conns.clear()
+        self._partial.clear()
+        for target in list(self._peers):
+            self._drop_peer(target)
+
+
+DEAD_LETTER = "dead-letter"
+BATCH = "batch"
+
+
+def message_filename(message):
+    response_seq = message.get("response_seq")
+    return (f"{message.get('source', '')}.{message.get('seq') or 0}."
+            f"{'-' if response_seq is None else response_seq}.{uuid.uuid4().hex}.json")
+
+
+def envelope_filename(first):
+    return f"{first.get('source', '')}.{first.get('seq') or 0}.{BATCH}.{uuid.uuid4().hex}.json"
+
+
+def is_envelope(fname):
+    parts = fname.split(".")
+    return len(parts) == 5 and parts[2] == BATCH
+
+
+def parse_filename(fname):
+    """Header dict from a message_filename(), or None for other names."""
+    parts = fname.split(".")
+    if len(parts) != 5:
+        return None
+    source, seq, response_seq = parts[:3]
+    try:
+        return {
+            "source": source,
+            "seq": int(seq),
+            "response_seq": None if response_seq == "-" else int(response_seq),
+        }
+    except ValueError:
+        return None
+
+
+def open_transport(kind=None):
+    """Transport named by kind, defaulting to ZAI_TRANSPORT (file)."""
+    kind = (kind or get_str("ZAI_TRANSPORT", "file")).lower()
+    if kind == "file":
+        return FileTransport()
+    if kind == "socket":
+        return SocketTransport()
+    if kind == "shm":
+        from .ring import ShmTransport
+        return ShmTransport()
+    raise ValueError(f"Unknown transport '{kind}', expected one of {', '.join(TRANSPORTS)}")
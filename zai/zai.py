@@ -1,9 +1,10 @@
 import sys
 import os
 import argparse
-from zai.core.parser import get_parser
+from zai.core.ast_cache import parse_file
 from zai.core.interpreter import Interpreter
-from zai.config import get_config, get_str
+from zai.runtime.scheduler import Scheduler
+from zai.config import get_config, get_bool, get_str
 
 
 def print_env_status():
@@ -13,7 +14,12 @@ def print_env_status():
 
     # Required and optional ZAI_ variables
     required_vars = ["ZAI_API_KEY"]
-    optional_vars = ["ZAI_BASE_URL", "ZAI_MODEL", "ZAI_TEMPERATURE"]
+    optional_vars = ["ZAI_BASE_URL", "ZAI_MODEL", "ZAI_TEMPERATURE", "ZAI_IN_PROCESS", "ZAI_TRANSPORT",
+                     "ZAI_PARALLEL_PROCESS", "ZAI_AI_CONCURRENCY", "ZAI_AI_CACHE", "ZAI_STREAM",
+                     "ZAI_CONTEXT_SELECT", "ZAI_TOKEN_LOG", "ZAI_HTTP_MAX_CONNECTIONS", "ZAI_HTTP2",
+                     "ZAI_AI_TIMEOUT", "ZAI_AI_RETRIES", "ZAI_AI_RATE", "ZAI_AI_HEDGE_PERCENTILE",
+                     "ZAI_EXEC_POOL", "ZAI_EXEC_WORKERS", "ZAI_EXEC_TIMEOUT", "ZAI_EXEC_MAX_OUTPUT",
+                     "ZAI_PARALLEL_EXEC"]
 
     print("=" * 60)
     print("zai Environment Configuration")
@@ -72,6 +78,11 @@ def main():
     parser.add_argument("--skill", default="Main", help="Entry skill (default: Main)")
     parser.add_argument("--check-env", action="store_true", help="Check environment variables and exit")
     parser.add_argument("--no-env-check", action="store_true", help="Skip environment variable check")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the __zaicache__ AST cache")
+    parser.add_argument("--in-process", action="store_true", help="Run started sub-agents in this process instead of spawning one process each")
+    parser.add_argument("--parallel-process", action="store_true", help="Send consecutive independent process statements to the model concurrently")
+    parser.add_argument("--stream", action="store_true", help="Stream process responses and exec output, showing each key or line as it arrives")
+    parser.add_argument("--parallel-exec", action="store_true", help="Run the exec statements of parallel { } blocks concurrently")
 
     args = parser.parse_args()
 
@@ -99,23 +110,34 @@ def main():
             sys.exit(1)
         print()  # Empty line before execution
 
-    try:
-        with open(args.file, 'r') as f:
-            code = f.read()
-    except FileNotFoundError:
+    if not os.path.isfile(args.file):
         print(f"Error: File '{args.file}' not found.")
         sys.exit(1)
-        
-    lang_parser = get_parser()
+
+    ast_cache = False if args.no_cache else None
+    parallel_process = True if args.parallel_process else None  # None: follow ZAI_PARALLEL_PROCESS
+    stream = True if args.stream else None  # None: follow ZAI_STREAM
+    parallel_exec = True if args.parallel_exec else None  # None: follow ZAI_PARALLEL_EXEC
+    scheduler = None
+    if args.in_process or get_bool("ZAI_IN_PROCESS", False):
+        scheduler = Scheduler(ast_cache=ast_cache, parallel_process=parallel_process, stream=stream,
+                              parallel_exec=parallel_exec)
     try:
-        tree = lang_parser.parse(code, start='start')
+        if scheduler:
+            tree = scheduler.load_tree(args.file)
+        else:
+            tree = parse_file(args.file, start='start', use_cache=ast_cache)
     except Exception as e:
         print(f"Parse Error: {e}")
         sys.exit(1)
 
-    base_path = os.path.dirname(os.path.abspath(args.file))
-    interpreter = Interpreter(tree, base_path=base_path, source_file=os.path.abspath(args.file))
-    result = interpreter.run(agent_name=args.agent, entry_skill=args.skill)
+    if scheduler:
+        result = scheduler.run(args.file, agent_name=args.agent, entry_skill=args.skill)
+    else:
+        base_path = os.path.dirname(os.path.abspath(args.file))
+        interpreter = Interpreter(tree, base_path=base_path, source_file=os.path.abspath(args.file), ast_cache=ast_cache,
+                                  parallel_process=parallel_process, stream=stream, parallel_exec=parallel_exec)
+        result = interpreter.run(agent_name=args.agent, entry_skill=args.skill)
     
     if result.get("status") == "fail":
         print(f"Execution Failed: {result.get('message')} (Code: {result.get('code')})")